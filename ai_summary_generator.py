@@ -9,6 +9,7 @@ import os, json, logging, time, requests
 import pandas as pd
 from tqdm import tqdm
 from dotenv import load_dotenv
+from artifacts import ArtifactManifest
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
@@ -73,12 +74,16 @@ class AIStockAnalyzer:
     def __init__(self, data_dir='.'):
         self.data_dir = data_dir
         self.output = os.path.join(data_dir, 'ai_summaries.json')
+        self.manifest = ArtifactManifest(data_dir)
         self.gen = GeminiGenerator()
         self.news = NewsCollector()
         
-    def run(self, top_n=20):
+    def run(self, top_n=20, force=False):
         csv = os.path.join(self.data_dir, 'smart_money_picks_v2.csv')
         if not os.path.exists(csv): return
+        if not force and self.manifest.stage_fresh('ai_summary_generator'):
+            logger.info("Picks unchanged since last run, summaries are current")
+            return
         
         df = pd.read_csv(csv).head(top_n)
         results = {}
@@ -103,10 +108,13 @@ class AIStockAnalyzer:
             }
             time.sleep(1) # Rate limit
             
-        with open(self.output, 'w') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
+        self.manifest.write_json(results, self.output, stage='ai_summary_generator', ensure_ascii=False)
         logger.info(f"Saved {len(results)} summaries")
 
 if __name__ == "__main__":
+    import argparse
     from datetime import datetime
-    AIStockAnalyzer().run()
+    parser = argparse.ArgumentParser(description='AI stock summaries')
+    parser.add_argument('--force', action='store_true', help='Run even if the picks are unchanged since the last run')
+    args = parser.parse_args()
+    AIStockAnalyzer().run(force=args.force)
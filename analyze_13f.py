@@ -14,6 +14,15 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import json
 import time
+from fetch_engine import default_engine, is_throttled
+from market_data import get_provider
+from ticker_info import get_ticker_info_cache
+from universe import resolve_universe
+from artifacts import ArtifactManifest
+from scoring import apply_scorecard
+from insider_store import InsiderStore, normalize_transactions
+from sec_13f import (CusipIndex, HoldingsStore, RefreshPolicy, ThirteenFIngestor, due_quarter, edgar_mode,
+                     filing_window, position_deltas, ticker_flows)
 
 # Logging Configuration
 logging.basicConfig(
@@ -23,16 +32,36 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# Per-ticker ownership data (insider trades, short interest) is refetched
+# after this many days even when no 13F filing touched the ticker
+MAX_CACHE_AGE_DAYS = int(os.getenv('SEC_13F_MAX_AGE_DAYS', '30'))
+
+
 class SEC13FAnalyzer:
     """
     Analyze institutional holdings from SEC 13F filings
-    Note: 13F filings are quarterly, with 45-day delay after quarter end
+    Note: 13F filings are quarterly, with 45-day delay after quarter end.
+    Per-ticker results are kept in us_13f_cache.json and only refetched when
+    a filing window has closed since, a tracked holder's new filing touched
+    the ticker, or the entry is older than MAX_CACHE_AGE_DAYS.
     """
     
-    def __init__(self, data_dir: str = '.'):
+    def __init__(self, data_dir: str = '.', workers: Optional[int] = None):
         self.data_dir = data_dir
+        self.provider = get_provider()
+        self.info_cache = get_ticker_info_cache()
+        self.engine = default_engine(workers, rate_limited=self.provider.rate_limited)
         self.output_file = os.path.join(data_dir, 'us_13f_holdings.csv')
         self.cache_file = os.path.join(data_dir, 'us_13f_cache.json')
+        self.manifest = ArtifactManifest(data_dir)
+        
+        # Quarterly 13F positions of the tracked institutions (see sec_13f.py)
+        self.holdings = HoldingsStore(os.path.join(data_dir, 'holdings_13f'))
+        self.cusip_file = os.path.join(data_dir, 'cusip_tickers.csv')
+        
+        # Insider trades shared with insider_tracker.py (see insider_store.py)
+        self.insiders = InsiderStore(os.path.join(data_dir, 'insider_transactions'))
+        self.insider_fetched: Dict[str, pd.DataFrame] = {}
         
         # SEC EDGAR API base URL
         self.sec_base_url = "https://data.sec.gov"
@@ -63,117 +92,177 @@ class SEC13FAnalyzer:
             '0001273087': 'Appaloosa Management',
         }
     
-    def analyze_institutional_changes(self, tickers: List[str]) -> pd.DataFrame:
+    def analyze_ticker(self, ticker: str) -> Optional[Dict]:
+        """Ownership, insider activity and short interest for one ticker (2-3 upstream calls); scored by the caller"""
+        try:
+            # Ownership and short interest live in the daily fundamentals group of the shared info cache
+            info = self.info_cache.info(ticker, ['fundamentals'])
+            
+            # Basic ownership info
+            inst_pct = info.get('heldPercentInstitutions', 0) or 0
+            insider_pct = info.get('heldPercentInsiders', 0) or 0
+            
+            # Float and shares
+            float_shares = info.get('floatShares', 0) or 0
+            shares_outstanding = info.get('sharesOutstanding', 0) or 0
+            short_pct = info.get('shortPercentOfFloat', 0) or 0
+            
+            # Insider transactions (upserted into the insider store by the caller)
+            try:
+                self.insider_fetched[ticker] = normalize_transactions(
+                    ticker, self.provider.insider_transactions(ticker))
+            except:
+                pass
+            
+            # Institutional holders count
+            try:
+                inst_holders = self.provider.institutional_holders(ticker)
+                num_inst_holders = len(inst_holders) if inst_holders is not None else 0
+            except:
+                num_inst_holders = 0
+            
+            return {
+                'ticker': ticker,
+                'institutional_pct': round(inst_pct * 100, 2),
+                'insider_pct': round(insider_pct * 100, 2),
+                'short_pct': round(short_pct * 100, 2),
+                'float_shares_m': round(float_shares / 1e6, 2) if float_shares else 0,
+                'num_inst_holders': num_inst_holders,
+                # Raw inputs of the institutional scorecard (see scoring.py)
+                'inst_ratio': inst_pct,
+                'short_ratio': short_pct
+            }
+            
+        except Exception as e:
+            if is_throttled(e):
+                raise
+            logger.debug(f"Error analyzing {ticker}: {e}")
+            return None
+    
+    def update_holdings(self, policy: Optional[RefreshPolicy] = None) -> None:
+        """
+        Pull new 13F filings of the major institutions into the holdings store
+        (SEC_EDGAR_MODE); with a policy only the filers it says are due are checked
+        """
+        if edgar_mode() == 'off':
+            return
+        ciks = policy.filers_to_check(self.major_institutions) if policy else list(self.major_institutions)
+        if not ciks:
+            logger.info(f"⏸️ No 13F filings due (target quarter {policy.target}), skipping EDGAR")
+            return
+        try:
+            ThirteenFIngestor(self.holdings).update(ciks)
+        except Exception as e:
+            logger.warning(f"⚠️ 13F ingestion failed, using stored holdings: {e}")
+    
+    def cusip_index(self, tickers: Optional[List[str]] = None) -> CusipIndex:
+        """
+        CUSIP -> ticker index. CUSIPs missing from cusip_tickers.csv are
+        matched on the company names already in the shared info cache.
+        """
+        index = CusipIndex(self.cusip_file)
+        names = {}
+        for ticker in tickers or []:
+            if self.info_cache.is_fresh(ticker, ['profile']):
+                info = self.info_cache.info(ticker, ['profile'])
+                names[ticker] = info.get('longName') or info.get('shortName')
+        index.add_names(names)
+        return index
+    
+    def thirteenf_flows(self, index: Optional[CusipIndex] = None) -> pd.DataFrame:
+        """Latest quarter-over-quarter moves of the tracked institutions per ticker"""
+        index = index or self.cusip_index()
+        return ticker_flows(position_deltas(self.holdings.read(), self.holdings.filings()), index)
+    
+    def load_cache(self) -> Dict[str, Dict]:
+        """{ticker: {'fetched': ISO timestamp, 'data': analyze_ticker result}}"""
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get('tickers', {})
+        except (OSError, ValueError):
+            return {}
+    
+    def save_cache(self, cache: Dict[str, Dict]) -> None:
+        tmp_file = f'{self.cache_file}.{os.getpid()}.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'updated': datetime.now().isoformat(), 'tickers': cache}, f,
+                      default=lambda v: v.item() if hasattr(v, 'item') else str(v))
+        os.replace(tmp_file, self.cache_file)
+    
+    def stale_tickers(self, tickers: List[str], cache: Dict[str, Dict], index: CusipIndex,
+                      now: Optional[datetime] = None) -> List[str]:
+        """
+        Tickers whose cached ownership data must be refetched: never fetched,
+        fetched before the last filing window closed, fetched before a new
+        filing of one of its tracked holders was ingested, too old, or with
+        no insider fetch recorded in the insider store
+        """
+        now = pd.Timestamp(now or datetime.now())
+        window_closed = filing_window(due_quarter(now))[1]
+        max_age = timedelta(days=MAX_CACHE_AGE_DAYS)
+        
+        # Latest ingest among the filers holding each ticker (in any stored quarter, so exits count)
+        positions = self.holdings.read()
+        touched = {}
+        if not positions.empty:
+            positions = positions.assign(ticker=index.lookup(positions['cusip'], positions['issuer']),
+                                         ingested=positions['cik'].map(self.holdings.last_ingested()))
+            touched = positions.dropna(subset=['ticker', 'ingested']).groupby('ticker')['ingested'].max().to_dict()
+        
+        insiders_fetched = self.insiders.fetched_at()
+        stale = []
+        for ticker in tickers:
+            entry = cache.get(ticker)
+            fetched = pd.Timestamp(entry['fetched']) if entry else None
+            if (fetched is None or fetched < window_closed or now - fetched > max_age
+                    or (ticker in touched and fetched < touched[ticker]) or ticker not in insiders_fetched):
+                stale.append(ticker)
+        return stale
+    
+    def analyze_institutional_changes(self, tickers: List[str], cache: Optional[Dict[str, Dict]] = None,
+                                      refresh: Optional[List[str]] = None,
+                                      index: Optional[CusipIndex] = None) -> pd.DataFrame:
         """
         Analyze institutional ownership and recent changes
-        Uses yfinance as primary data source
+        Ownership comes from the configured market data provider (yfinance by
+        default), quarterly moves from the stored 13F filings and insider
+        activity from the insider store. With a cache, only the refresh
+        tickers are fetched (cache updated in place); the rest, and any
+        refresh that fails, use their cached result.
         """
-        import yfinance as yf
-        from tqdm import tqdm
+        refresh = list(tickers) if cache is None or refresh is None else refresh
+        self.insider_fetched = {}
+        fetched = self.engine.map(self.analyze_ticker, refresh, desc="Fetching institutional data",
+                                  cost=lambda t: 2 if self.info_cache.is_fresh(t, ['fundamentals']) else 3)
+        if self.insider_fetched:
+            self.insiders.upsert(pd.concat(self.insider_fetched.values(), ignore_index=True),
+                                 fetched=self.insider_fetched.keys())
         
-        results = []
+        results = {t: e['data'] for t, e in (cache or {}).items()}
+        now = datetime.now().isoformat()
+        for ticker, result in zip(refresh, fetched):
+            if result:
+                results[ticker] = result
+                if cache is not None:
+                    cache[ticker] = {'fetched': now, 'data': result}
         
-        for ticker in tqdm(tickers, desc="Fetching institutional data"):
-            try:
-                stock = yf.Ticker(ticker)
-                info = stock.info
-                
-                # Basic ownership info
-                inst_pct = info.get('heldPercentInstitutions', 0) or 0
-                insider_pct = info.get('heldPercentInsiders', 0) or 0
-                
-                # Float and shares
-                float_shares = info.get('floatShares', 0) or 0
-                shares_outstanding = info.get('sharesOutstanding', 0) or 0
-                short_pct = info.get('shortPercentOfFloat', 0) or 0
-                
-                # Insider transactions
-                try:
-                    insider_txns = stock.insider_transactions
-                    if insider_txns is not None and len(insider_txns) > 0:
-                        recent = insider_txns.head(10)
-                        buys = len(recent[recent['Transaction'].str.contains('Buy', na=False)])
-                        sells = len(recent[recent['Transaction'].str.contains('Sale', na=False)])
-                        insider_sentiment = 'Buying' if buys > sells else ('Selling' if sells > buys else 'Neutral')
-                    else:
-                        insider_sentiment = 'Unknown'
-                        buys = 0
-                        sells = 0
-                except:
-                    insider_sentiment = 'Unknown'
-                    buys = 0
-                    sells = 0
-                
-                # Institutional holders count
-                try:
-                    inst_holders = stock.institutional_holders
-                    num_inst_holders = len(inst_holders) if inst_holders is not None else 0
-                except:
-                    num_inst_holders = 0
-                
-                # Score calculation (0-100)
-                score = 50
-                
-                # High institutional ownership is generally positive
-                if inst_pct > 0.8:
-                    score += 15
-                elif inst_pct > 0.6:
-                    score += 10
-                elif inst_pct < 0.3:
-                    score -= 10
-                
-                # Insider activity
-                if buys > sells:
-                    score += 15
-                elif sells > buys:
-                    score -= 10
-                
-                # Low short interest is positive
-                if short_pct < 0.03:
-                    score += 5
-                elif short_pct > 0.1:
-                    score -= 10
-                elif short_pct > 0.2:
-                    score -= 20
-                
-                score = max(0, min(100, score))
-                
-                # Determine stage
-                if score >= 70:
-                    stage = "Strong Institutional Support"
-                elif score >= 55:
-                    stage = "Institutional Support"
-                elif score >= 45:
-                    stage = "Neutral"
-                elif score >= 30:
-                    stage = "Institutional Concern"
-                else:
-                    stage = "Strong Institutional Selling"
-                
-                results.append({
-                    'ticker': ticker,
-                    'institutional_pct': round(inst_pct * 100, 2),
-                    'insider_pct': round(insider_pct * 100, 2),
-                    'short_pct': round(short_pct * 100, 2),
-                    'float_shares_m': round(float_shares / 1e6, 2) if float_shares else 0,
-                    'num_inst_holders': num_inst_holders,
-                    'insider_buys': buys,
-                    'insider_sells': sells,
-                    'insider_sentiment': insider_sentiment,
-                    'institutional_score': score,
-                    'institutional_stage': stage
-                })
-                
-                time.sleep(0.1)  # Rate limiting
-                
-            except Exception as e:
-                logger.debug(f"Error analyzing {ticker}: {e}")
-                continue
-        
-        return pd.DataFrame(results)
+        df = pd.DataFrame([results[t] for t in tickers if t in results])
+        if df.empty:
+            return apply_scorecard(df, 'institutional')
+        
+        # Buys/sales among each ticker's 10 latest stored insider trades
+        activity = self.insiders.activity(df['ticker'].tolist(), last=10)
+        df = df.drop(columns=activity.columns, errors='ignore')
+        at = df.columns.get_loc('num_inst_holders') + 1
+        for offset, column in enumerate(activity.columns):
+            df.insert(at + offset, column, df['ticker'].map(activity[column]).to_numpy())
+        
+        flows = self.thirteenf_flows(index or self.cusip_index(df['ticker'].tolist()))
+        df = df.merge(flows, on='ticker', how='left')
+        return apply_scorecard(df, 'institutional')
     
-    def run(self) -> pd.DataFrame:
-        """Run institutional analysis for stocks in the data directory"""
+    def run(self, force: bool = False) -> pd.DataFrame:
+        """Run institutional analysis for stocks in the data directory (force: refetch every ticker)"""
         logger.info("🚀 Starting 13F Institutional Analysis...")
         
         # Load stock list
@@ -183,22 +272,36 @@ class SEC13FAnalyzer:
             stocks_df = pd.read_csv(stocks_file)
             tickers = stocks_df['ticker'].tolist()
         else:
-            logger.warning("Stock list not found. Using top 50 S&P 500 stocks.")
-            tickers = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'NVDA', 'META', 'TSLA', 'BRK-B',
-                      'UNH', 'JNJ', 'JPM', 'V', 'XOM', 'PG', 'MA', 'HD', 'CVX', 'MRK',
-                      'ABBV', 'LLY', 'PEP', 'KO', 'COST', 'AVGO', 'WMT', 'MCD', 'TMO',
-                      'CSCO', 'ABT', 'CRM', 'ACN', 'DHR', 'ORCL', 'NKE', 'TXN', 'PM',
-                      'NEE', 'INTC', 'AMD', 'QCOM', 'IBM', 'GS', 'CAT', 'BA', 'DIS',
-                      'NFLX', 'PYPL', 'ADBE', 'NOW', 'INTU']
+            logger.warning("Stock list not found. Using the default universe.")
+            tickers = resolve_universe()['ticker'].tolist()
         
         logger.info(f"📊 Analyzing {len(tickers)} stocks")
         
-        # Run analysis
-        results_df = self.analyze_institutional_changes(tickers)
+        # Check EDGAR only for filers the filing calendar says are due
+        policy = RefreshPolicy(self.holdings)
+        self.update_holdings(policy)
+        
+        # Refetch only tickers whose cached ownership data is out of date
+        cache = self.load_cache()
+        index = self.cusip_index(tickers)
+        stale = list(tickers) if force else self.stale_tickers(tickers, cache, index)
+        logger.info(f"♻️ Reusing cached institutional data for {len(tickers) - len(stale)} stocks, refreshing {len(stale)}")
+        results_df = self.analyze_institutional_changes(tickers, cache, refresh=stale, index=index)
+        self.save_cache(cache)
+        
+        # Until the next filing check, window boundary or cache expiry the
+        # output stays current and the pipeline can skip this stage
+        valid_until = None
+        if all(t in cache for t in tickers):
+            oldest = min((pd.Timestamp(cache[t]['fetched']) for t in tickers), default=pd.Timestamp.now())
+            edgar_due = policy.next_boundary() if edgar_mode() == 'off' else policy.valid_until(self.major_institutions)
+            valid_until = min(edgar_due, oldest + timedelta(days=MAX_CACHE_AGE_DAYS)).isoformat()
         
         # Save results
         if not results_df.empty:
-            results_df.to_csv(self.output_file, index=False)
+            self.manifest.write_csv(results_df, self.output_file, stage='analyze_13f',
+                                    inputs=[stocks_file, self.holdings.meta_file, self.cusip_file],
+                                    valid_until=valid_until)
             logger.info(f"✅ Analysis complete! Saved to {self.output_file}")
             
             # Summary
@@ -219,14 +322,16 @@ def main():
     parser = argparse.ArgumentParser(description='13F Institutional Analysis')
     parser.add_argument('--dir', default='.', help='Data directory')
     parser.add_argument('--tickers', nargs='+', help='Specific tickers to analyze')
+    parser.add_argument('--workers', type=int, default=None, help='Concurrent fetch workers (default: FETCH_WORKERS or 8)')
+    parser.add_argument('--force', action='store_true', help='Refetch every ticker, ignoring us_13f_cache.json')
     args = parser.parse_args()
     
-    analyzer = SEC13FAnalyzer(data_dir=args.dir)
+    analyzer = SEC13FAnalyzer(data_dir=args.dir, workers=args.workers)
     
     if args.tickers:
         results = analyzer.analyze_institutional_changes(args.tickers)
     else:
-        results = analyzer.run()
+        results = analyzer.run(force=args.force)
     
     if not results.empty:
         # Show top institutional support
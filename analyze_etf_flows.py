@@ -9,13 +9,18 @@ import os
 import json
 import pandas as pd
 import numpy as np
-import yfinance as yf
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List
-from tqdm import tqdm
+from typing import Dict, List, Optional
 import requests
 from dotenv import load_dotenv
+from market_data import get_provider
+from price_store import PriceStore
+from price_panel import PricePanel
+from universe import REFERENCE_ETFS
+from artifacts import ArtifactManifest
+from indicators import obv
+from scoring import apply_scorecard
 
 load_dotenv()
 
@@ -32,82 +37,30 @@ class ETFFlowsAnalyzer:
     
     def __init__(self, data_dir: str = '.'):
         self.data_dir = data_dir
+        self.provider = get_provider()
         self.output_csv = os.path.join(data_dir, 'us_etf_flows.csv')
         self.output_json = os.path.join(data_dir, 'etf_flow_analysis.json')
+        self.manifest = ArtifactManifest(data_dir)
         
-        # Major ETFs to track (24 total)
-        self.etfs = {
-            # Market Cap
-            'SPY': 'S&P 500',
-            'QQQ': 'NASDAQ 100',
-            'IWM': 'Russell 2000',
-            'DIA': 'Dow Jones',
-            
-            # Sector ETFs
-            'XLK': 'Technology',
-            'XLF': 'Financials',
-            'XLV': 'Healthcare',
-            'XLE': 'Energy',
-            'XLY': 'Consumer Discretionary',
-            'XLP': 'Consumer Staples',
-            'XLI': 'Industrials',
-            'XLB': 'Materials',
-            'XLU': 'Utilities',
-            'XLRE': 'Real Estate',
-            'XLC': 'Communication Services',
-            
-            # Thematic
-            'VTI': 'Total Market',
-            'VOO': 'S&P 500 (Vanguard)',
-            'GLD': 'Gold',
-            'SLV': 'Silver',
-            'USO': 'Oil',
-            'TLT': 'Long-Term Treasury',
-            'IEF': 'Mid-Term Treasury',
-            'HYG': 'High Yield Bonds',
-            'LQD': 'Investment Grade Bonds'
-        }
-
-        self.etf_categories = {
-            'SPY': 'Broad Market', 'QQQ': 'Broad Market', 'IWM': 'Broad Market', 'DIA': 'Broad Market', 'VTI': 'Broad Market', 'VOO': 'Broad Market',
-            'XLK': 'Sector', 'XLF': 'Sector', 'XLV': 'Sector', 'XLE': 'Sector', 'XLY': 'Sector', 'XLP': 'Sector',
-            'XLI': 'Sector', 'XLB': 'Sector', 'XLU': 'Sector', 'XLRE': 'Sector', 'XLC': 'Sector',
-            'GLD': 'Thematic', 'SLV': 'Thematic', 'USO': 'Thematic', 
-            'TLT': 'Thematic', 'IEF': 'Thematic', 'HYG': 'Thematic', 'LQD': 'Thematic'
-        }
-    
-    def download_etf_data(self, ticker: str, period: str = '3mo') -> pd.DataFrame:
-        """Download ETF price and volume data"""
-        try:
-            etf = yf.Ticker(ticker)
-            hist = etf.history(period=period)
-            return hist
-        except Exception as e:
-            logger.debug(f"Failed to download {ticker}: {e}")
-            return pd.DataFrame()
+        # Major ETFs to track (24 total), stored next to the stocks by create_us_daily_prices.py
+        self.store = PriceStore(os.path.join(data_dir, 'price_store'))
+        self.panel = PricePanel(os.path.join(data_dir, 'price_panel'))
+        self.etfs = {ticker: etf['name'] for ticker, etf in REFERENCE_ETFS.items()}
+        self.etf_categories = {ticker: etf['category'] for ticker, etf in REFERENCE_ETFS.items()}
     
     def calculate_obv(self, df: pd.DataFrame) -> float:
         """Calculate On-Balance Volume trend"""
         if len(df) < 20:
             return 0
         
-        obv = [0]
-        for i in range(1, len(df)):
-            if df['Close'].iloc[i] > df['Close'].iloc[i-1]:
-                obv.append(obv[-1] + df['Volume'].iloc[i])
-            elif df['Close'].iloc[i] < df['Close'].iloc[i-1]:
-                obv.append(obv[-1] - df['Volume'].iloc[i])
-            else:
-                obv.append(obv[-1])
-        
-        obv_series = pd.Series(obv)
+        obv_series = obv(df['Close'], df['Volume']).reset_index(drop=True)
         if len(obv_series) >= 20:
             obv_change = (obv_series.iloc[-1] - obv_series.iloc[-20]) / abs(obv_series.iloc[-20]) * 100 if obv_series.iloc[-20] != 0 else 0
             return obv_change
         return 0
     
     def calculate_flow_proxy(self, df: pd.DataFrame) -> Dict:
-        """Calculate flow proxy score based on volume and price action"""
+        """Volume and price-action flow proxies (scored for all ETFs by the etf_flow scorecard)"""
         if len(df) < 30:
             return None
         
@@ -123,56 +76,15 @@ class ETFFlowsAnalyzer:
         # OBV trend
         obv_trend = self.calculate_obv(df)
         
-        # Flow Score (0-100)
-        flow_score = 50
-        
-        # Volume contribution
-        if vol_ratio > 1.5:
-            flow_score += 20
-        elif vol_ratio > 1.2:
-            flow_score += 10
-        elif vol_ratio < 0.8:
-            flow_score -= 10
-        
-        # Price momentum contribution
-        if price_5d > 3:
-            flow_score += 15
-        elif price_5d > 1:
-            flow_score += 8
-        elif price_5d < -3:
-            flow_score -= 15
-        elif price_5d < -1:
-            flow_score -= 8
-        
-        # OBV contribution
-        if obv_trend > 10:
-            flow_score += 15
-        elif obv_trend > 0:
-            flow_score += 5
-        elif obv_trend < -10:
-            flow_score -= 15
-        
-        flow_score = max(0, min(100, flow_score))
-        
-        # Flow direction
-        if flow_score >= 65:
-            direction = "Strong Inflow"
-        elif flow_score >= 55:
-            direction = "Inflow"
-        elif flow_score >= 45:
-            direction = "Neutral"
-        elif flow_score >= 35:
-            direction = "Outflow"
-        else:
-            direction = "Strong Outflow"
-        
         return {
             'vol_ratio': round(vol_ratio, 2),
             'price_5d': round(price_5d, 2),
             'price_20d': round(price_20d, 2),
             'obv_trend': round(obv_trend, 2),
-            'flow_score': round(flow_score, 1),
-            'flow_direction': direction
+            # Raw inputs of the etf_flow scorecard (see scoring.py)
+            'volume_ratio': vol_ratio,
+            'momentum_5d': price_5d,
+            'obv_change': obv_trend
         }
     
     def analyze_all_etfs(self) -> pd.DataFrame:
@@ -181,10 +93,14 @@ class ETFFlowsAnalyzer:
         
         results = []
         
-        for ticker, name in tqdm(self.etfs.items(), desc="Analyzing ETFs"):
-            hist = self.download_etf_data(ticker, '3mo')
-            
-            if hist.empty:
+        # Shared price store copy; ETFs it does not hold yet come in one batched download
+        tickers = list(self.etfs.keys())
+        histories = self.panel.histories(self.store, tickers, '3mo', provider=self.provider)
+        
+        for ticker in tickers:
+            name = self.etfs[ticker]
+            hist = histories.get(ticker)
+            if hist is None or hist.empty:
                 continue
             
             flow_data = self.calculate_flow_proxy(hist)
@@ -201,7 +117,7 @@ class ETFFlowsAnalyzer:
                 }
                 results.append(result)
         
-        return pd.DataFrame(results)
+        return apply_scorecard(pd.DataFrame(results), 'etf_flow')
     
     def generate_ai_analysis(self, results_df: pd.DataFrame) -> None:
         """Generate AI analysis of capital flows using Gemini"""
@@ -268,8 +184,8 @@ class ETFFlowsAnalyzer:
             'ai_analysis': ai_analysis
         }
         
-        with open(self.output_json, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, ensure_ascii=False, indent=2)
+        self.manifest.write_json(output_data, self.output_json, stage='analyze_etf_flows',
+                                 inputs=[self.output_csv], ensure_ascii=False)
         
         logger.info(f"✅ AI analysis saved to {self.output_json}")
     
@@ -280,7 +196,8 @@ class ETFFlowsAnalyzer:
         
         # Save CSV
         if not results_df.empty:
-            results_df.to_csv(self.output_csv, index=False)
+            self.manifest.write_csv(results_df, self.output_csv, stage='analyze_etf_flows',
+                                    inputs=[self.store.meta_file])
             logger.info(f"✅ Saved ETF flows to {self.output_csv}")
             
             # Generate AI analysis
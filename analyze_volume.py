@@ -3,15 +3,42 @@
 """
 US Stock Supply/Demand Analysis - Volume Technical Indicators
 Calculates OBV, Accumulation/Distribution Line, Volume Surge Detection
+
+Indicator state is kept in volume_state.parquet: the last STATE_BARS bars of
+every ticker with their running OBV and A/D totals. The next run reads only
+bars newer than the state, continues the running totals from it and
+recomputes the rolling windows over the tail, which gives the same results
+as a full recompute. Tickers whose store revision, first date or row count
+no longer match the state are reloaded from the full history.
+
+With --workers N the per-ticker scoring is sharded across a process pool.
+The indicator columns are written once to memory-mapped .npy files that the
+workers map read-only, so no DataFrames are pickled to them; shards are
+contiguous ticker ranges and results are collected in shard order, so the
+output is identical to a serial run.
+
+With --history the same pass also writes every day's indicators and score
+to the volume_history/ store (see indicator_store.py): new bars are appended
+and tickers whose history was reloaded are replaced.
 """
 
 import os
+import shutil
+import tempfile
 import pandas as pd
 import numpy as np
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
+from price_store import PriceStore
+from artifacts import ArtifactManifest
+import indicators
+from indicators import group_slices, obv
+from scoring import apply_scorecard
+from indicator_store import IndicatorStore
+from universe import ETF_MARKET
 
 # Logging Configuration
 logging.basicConfig(
@@ -20,24 +47,140 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Bars kept per ticker: the newest 20-day surge count needs the 20-day volume
+# SMA 19 bars back (39 bars); MFI-14 and the 20-day OBV/A/D change need fewer
+STATE_BARS = 40
+STATE_COLUMNS = ['ticker', 'date', 'high', 'low', 'current_price', 'volume', 'obv', 'ad_line']
+
+# Columns analyze_supply_demand reads, shared with pool workers as memory maps
+ANALYSIS_COLUMNS = ['date', 'high', 'low', 'current_price', 'volume', 'obv', 'ad_line', 'mfi_14', 'volume_sma_20']
+SHARDS_PER_WORKER = 4
+
+# Per-process state of pool workers (set by _init_worker)
+_worker_arrays: Dict[str, np.ndarray] = {}
+_worker_analyzer = None
+
+
+def _init_worker(array_dir: str) -> None:
+    """Map the shared indicator columns read-only in a pool worker"""
+    global _worker_analyzer
+    for col in ANALYSIS_COLUMNS:
+        _worker_arrays[col] = np.load(os.path.join(array_dir, f'{col}.npy'), mmap_mode='r')
+    _worker_analyzer = VolumeAnalyzer()
+
+
+def _analyze_shard(shard: List[Tuple[str, int, int]]) -> List[Tuple[str, Dict]]:
+    """Score one contiguous range of tickers from the mapped columns"""
+    results = []
+    for ticker, start, stop in shard:
+        ticker_data = pd.DataFrame({col: _worker_arrays[col][start:stop] for col in ANALYSIS_COLUMNS})
+        analysis = _worker_analyzer.analyze_supply_demand(ticker_data)
+        if analysis:
+            results.append((ticker, analysis))
+    return results
+
 
 class VolumeAnalyzer:
     """Volume-based technical analysis for supply/demand detection"""
     
-    def __init__(self, data_dir: str = '.'):
+    def __init__(self, data_dir: str = '.', workers: Optional[int] = None):
         self.data_dir = data_dir
-        self.prices_file = os.path.join(data_dir, 'us_daily_prices.csv')
+        self.workers = max(1, workers or int(os.getenv('VOLUME_WORKERS', '1')))
+        self.prices_file = os.path.join(data_dir, 'us_daily_prices.csv')  # legacy, migrated once
+        self.store = PriceStore(os.path.join(data_dir, 'price_store'))
         self.output_file = os.path.join(data_dir, 'us_volume_analysis.csv')
+        self.manifest = ArtifactManifest(data_dir)
+        self.state_file = os.path.join(data_dir, 'volume_state.parquet')
+        self.history = IndicatorStore(os.path.join(data_dir, 'volume_history'))
         
     def load_prices(self) -> pd.DataFrame:
-        """Load daily price data"""
-        if not os.path.exists(self.prices_file):
-            raise FileNotFoundError(f"Price file not found: {self.prices_file}")
-        
-        logger.info(f"📂 Loading prices from {self.prices_file}")
-        df = pd.read_csv(self.prices_file)
-        df['date'] = pd.to_datetime(df['date'])
-        return df
+        """Load daily price data from the columnar store"""
+        if not self.store.exists():
+            if not os.path.exists(self.prices_file):
+                raise FileNotFoundError(f"Price store not found: {self.store.root}")
+            self.store.migrate_from_csv(self.prices_file)
+        
+        logger.info(f"📂 Loading prices from {self.store.root}")
+        return self.store.read(columns=['high', 'low', 'current_price', 'volume'])
+    
+    def load_state(self) -> pd.DataFrame:
+        """Saved per-ticker indicator tails (empty if none or unreadable)"""
+        if not os.path.exists(self.state_file):
+            return pd.DataFrame()
+        try:
+            return pd.read_parquet(self.state_file)
+        except Exception as e:
+            logger.warning(f"⚠️ Ignoring unreadable indicator state {self.state_file}: {e}")
+            return pd.DataFrame()
+    
+    def save_state(self, df: pd.DataFrame, slices: list) -> None:
+        """Keep the last STATE_BARS bars of every ticker with the store meta they were computed from"""
+        stats = self.store.ticker_stats()
+        keep = np.zeros(len(df), dtype=bool)
+        for _, start, stop in slices:
+            keep[max(start, stop - STATE_BARS):stop] = True
+        state = df.loc[keep, STATE_COLUMNS].reset_index(drop=True)
+        tickers = state['ticker'].astype(str)
+        state['ticker'] = tickers
+        state['rev'] = tickers.map(lambda t: stats.get(t, {}).get('rev', 0)).astype('int64')
+        state['first'] = pd.to_datetime(tickers.map(lambda t: stats.get(t, {}).get('first')))
+        state['rows'] = tickers.map(lambda t: stats.get(t, {}).get('rows', 0)).astype('int64')
+        
+        tmp_file = f'{self.state_file}.{os.getpid()}.tmp'
+        state.to_parquet(tmp_file, index=False)
+        os.replace(tmp_file, self.state_file)
+        logger.info(f"💾 Indicator state saved for {len(slices)} tickers")
+    
+    def load_incremental(self, full: bool = False,
+                         history_last: Optional[Dict[str, pd.Timestamp]] = None) -> pd.DataFrame:
+        """
+        Price rows to analyze, sorted by (ticker, date): saved state tails
+        (carrying their running 'obv'/'ad_line' totals) plus only the newer
+        bars, and the full history of tickers the state cannot continue.
+        history_last: latest stored indicator-history date per ticker; tickers
+        whose history is not level with the state are reloaded as well.
+        """
+        state = pd.DataFrame() if full else self.load_state()
+        stats = self.store.ticker_stats() if self.store.exists() else {}
+        if state.empty or not stats:
+            return self.load_prices()
+        
+        columns = ['high', 'low', 'current_price', 'volume']
+        head = state.groupby('ticker', sort=False).agg(
+            last=('date', 'max'), rev=('rev', 'first'), first=('first', 'first'), rows=('rows', 'first')
+        )
+        usable = [
+            t for t, m in head.iterrows()
+            if t in stats and m['rev'] == stats[t].get('rev', 0)
+            and m['first'] == pd.Timestamp(stats[t]['first']) and m['last'] <= pd.Timestamp(stats[t]['last'])
+            and (history_last is None or history_last.get(t) == m['last'])
+        ]
+        
+        # Only bars after each ticker's saved tail
+        new_rows = self.store.read(
+            tickers=usable if len(usable) < len(stats) else None,
+            start=head.loc[usable, 'last'].min() + pd.Timedelta(days=1) if usable else None,
+            columns=columns
+        ) if usable else pd.DataFrame(columns=['ticker', 'date'] + columns)
+        new_rows['ticker'] = new_rows['ticker'].astype(str)
+        new_rows = new_rows[new_rows['ticker'].isin(usable)]
+        new_rows = new_rows[new_rows['date'] > new_rows['ticker'].map(head['last'])]
+        
+        # Continuing must account for every stored bar, otherwise reload the ticker
+        counts = new_rows['ticker'].value_counts()
+        usable = [t for t in usable if head.at[t, 'rows'] + counts.get(t, 0) == stats[t]['rows']]
+        reload = sorted(set(stats) - set(usable))
+        
+        parts = [state[state['ticker'].isin(usable)][STATE_COLUMNS], new_rows[new_rows['ticker'].isin(usable)]]
+        if reload:
+            logger.info(f"🔄 Reloading full history for {len(reload)} tickers")
+            full_rows = self.store.read(tickers=reload, columns=columns)
+            full_rows['ticker'] = full_rows['ticker'].astype(str)
+            parts.append(full_rows)
+        logger.info(f"📈 Continuing indicator state for {len(usable)} tickers ({len(new_rows)} new bars)")
+        
+        df = pd.concat([p for p in parts if not p.empty], ignore_index=True)
+        return df.sort_values(['ticker', 'date'], kind='mergesort').reset_index(drop=True)
     
     def calculate_obv(self, df: pd.DataFrame) -> pd.Series:
         """
@@ -45,16 +188,11 @@ class VolumeAnalyzer:
         - Price up: Add volume
         - Price down: Subtract volume
         - Price unchanged: No change
+        Uses the precomputed universe-wide 'obv' column when present.
         """
-        obv = [0]
-        for i in range(1, len(df)):
-            if df['current_price'].iloc[i] > df['current_price'].iloc[i-1]:
-                obv.append(obv[-1] + df['volume'].iloc[i])
-            elif df['current_price'].iloc[i] < df['current_price'].iloc[i-1]:
-                obv.append(obv[-1] - df['volume'].iloc[i])
-            else:
-                obv.append(obv[-1])
-        return pd.Series(obv, index=df.index)
+        if 'obv' in df.columns:
+            return df['obv']
+        return obv(df['current_price'], df['volume'])
     
     def calculate_ad_line(self, df: pd.DataFrame) -> pd.Series:
         """
@@ -62,16 +200,15 @@ class VolumeAnalyzer:
         CLV = ((Close - Low) - (High - Close)) / (High - Low)
         A/D = Previous A/D + CLV * Volume
         """
-        high_low = df['high'] - df['low']
-        high_low = high_low.replace(0, 0.0001)  # Avoid division by zero
-        
-        clv = ((df['current_price'] - df['low']) - (df['high'] - df['current_price'])) / high_low
-        ad = (clv * df['volume']).cumsum()
-        return ad
+        if 'ad_line' in df.columns:
+            return df['ad_line']
+        return indicators.ad_line(df['high'], df['low'], df['current_price'], df['volume'])
     
     def calculate_volume_sma(self, df: pd.DataFrame, period: int = 20) -> pd.Series:
         """Calculate Volume Simple Moving Average"""
-        return df['volume'].rolling(window=period).mean()
+        if f'volume_sma_{period}' in df.columns:
+            return df[f'volume_sma_{period}']
+        return indicators.rolling_mean(df['volume'], period)
     
     def detect_volume_surge(self, df: pd.DataFrame, threshold: float = 2.0) -> pd.Series:
         """
@@ -85,18 +222,9 @@ class VolumeAnalyzer:
         """
         Calculate Money Flow Index (MFI) - Volume-weighted RSI
         """
-        typical_price = (df['high'] + df['low'] + df['current_price']) / 3
-        money_flow = typical_price * df['volume']
-        
-        delta = typical_price.diff()
-        positive_flow = money_flow.where(delta > 0, 0)
-        negative_flow = money_flow.where(delta < 0, 0)
-        
-        positive_mf = positive_flow.rolling(window=period).sum()
-        negative_mf = negative_flow.rolling(window=period).sum()
-        
-        mfi = 100 - (100 / (1 + positive_mf / negative_mf.replace(0, 0.0001)))
-        return mfi
+        if f'mfi_{period}' in df.columns:
+            return df[f'mfi_{period}']
+        return indicators.mfi(df['high'], df['low'], df['current_price'], df['volume'], period)
     
     def calculate_vwap(self, df: pd.DataFrame) -> pd.Series:
         """Calculate Volume Weighted Average Price (daily VWAP approximation)"""
@@ -106,13 +234,16 @@ class VolumeAnalyzer:
     def analyze_supply_demand(self, df: pd.DataFrame) -> Dict:
         """
         Comprehensive supply/demand analysis
-        Returns a dictionary with all indicators
+        Returns a dictionary with all indicators; the score and stage are
+        added for all tickers at once by the supply_demand scorecard
         """
         if len(df) < 30:
             return None
         
         # Calculate all indicators
-        df = df.sort_values('date').reset_index(drop=True)
+        if not df['date'].is_monotonic_increasing:
+            df = df.sort_values('date')
+        df = df.reset_index(drop=True)
         
         obv = self.calculate_obv(df)
         ad_line = self.calculate_ad_line(df)
@@ -141,57 +272,6 @@ class VolumeAnalyzer:
         # MFI current value
         mfi_current = mfi.iloc[-1] if not pd.isna(mfi.iloc[-1]) else 50
         
-        # Supply/Demand Score (0-100)
-        score = 50
-        
-        # OBV contribution
-        if obv_change > 10:
-            score += 15
-        elif obv_change > 5:
-            score += 10
-        elif obv_change < -10:
-            score -= 15
-        elif obv_change < -5:
-            score -= 10
-        
-        # A/D contribution
-        if ad_change > 10:
-            score += 15
-        elif ad_change > 5:
-            score += 10
-        elif ad_change < -10:
-            score -= 15
-        elif ad_change < -5:
-            score -= 10
-        
-        # Volume ratio contribution
-        if vol_ratio > 1.5:
-            score += 10
-        elif vol_ratio > 1.2:
-            score += 5
-        elif vol_ratio < 0.7:
-            score -= 5
-        
-        # MFI contribution
-        if mfi_current > 70:
-            score += 5  # Overbought but with buying pressure
-        elif mfi_current < 30:
-            score -= 5  # Oversold, possible capitulation
-        
-        score = max(0, min(100, score))
-        
-        # Determine stage
-        if score >= 70:
-            stage = "Strong Accumulation"
-        elif score >= 55:
-            stage = "Accumulation"
-        elif score >= 45:
-            stage = "Neutral"
-        elif score >= 30:
-            stage = "Distribution"
-        else:
-            stage = "Strong Distribution"
-        
         return {
             'date': latest['date'],
             'obv': obv.iloc[-1],
@@ -202,44 +282,172 @@ class VolumeAnalyzer:
             'vol_ratio_5d_20d': round(vol_ratio, 2),
             'surge_count_5d': int(surge_count_5d),
             'surge_count_20d': int(surge_count_20d),
-            'supply_demand_score': round(score, 1),
-            'supply_demand_stage': stage
+            # Raw inputs of the supply_demand scorecard (see scoring.py)
+            'obv_change': obv_change,
+            'ad_change': ad_change,
+            'vol_ratio': vol_ratio,
+            'mfi_value': mfi_current
         }
     
-    def run(self) -> pd.DataFrame:
-        """Run volume analysis for all stocks"""
-        logger.info("🚀 Starting Volume Analysis...")
+    def indicator_history(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        analyze_supply_demand for every bar at once: each row gets the values
+        the analyzer reports when that bar is the latest one (sorted long
+        frame with the indicator columns of run(); NaN before 30 bars).
+        """
+        groups = df['ticker'].to_numpy()
+        volume = df['volume'].to_numpy()
+        obv_now = df['obv'].to_numpy()
+        ad_now = df['ad_line'].to_numpy()
+        obv_prev = indicators.lag(obv_now, 19, groups)
+        ad_prev = indicators.lag(ad_now, 19, groups)
         
-        # Load data
-        df = self.load_prices()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            obv_change = np.where(obv_prev != 0, (obv_now - obv_prev) / np.abs(obv_prev) * 100, 0)
+            ad_change = np.where(ad_prev != 0, (ad_now - ad_prev) / np.abs(ad_prev) * 100, 0)
+            vol_5d = indicators.window_sum(volume, 5, groups) / 5
+            vol_20d = indicators.window_sum(volume, 20, groups) / 20
+            vol_ratio = np.where(vol_20d > 0, vol_5d / vol_20d, 1)
+        surge = (volume > df['volume_sma_20'].to_numpy() * 2).astype('float64')
+        mfi = df['mfi_14'].to_numpy()
         
-        # Get unique tickers
-        tickers = df['ticker'].unique()
-        logger.info(f"📊 Analyzing {len(tickers)} stocks")
+        # Positional index, so callers can mask rows by df position
+        hist = pd.DataFrame({
+            'ticker': df['ticker'].astype(str).to_numpy(),
+            'date': df['date'].to_numpy(),
+            'obv': obv_now,
+            'ad_line': ad_now,
+            'mfi': np.where(np.isnan(mfi), 50, mfi),
+            'volume_sma_20': df['volume_sma_20'].to_numpy(),
+            'obv_change_20d': obv_change,
+            'ad_change_20d': ad_change,
+            'vol_ratio_5d_20d': vol_ratio,
+            'surge_count_5d': indicators.window_sum(surge, 5, groups),
+            'surge_count_20d': indicators.window_sum(surge, 20, groups),
+        })
+        # Scorecard inputs are the unrounded values, as in analyze_supply_demand
+        for col, source in (('obv_change', 'obv_change_20d'), ('ad_change', 'ad_change_20d'),
+                            ('vol_ratio', 'vol_ratio_5d_20d'), ('mfi_value', 'mfi')):
+            hist[col] = hist[source]
+        hist = hist[indicators.group_positions(groups) >= 29]
+        return apply_scorecard(hist, 'supply_demand')
+    
+    def save_history(self, df: pd.DataFrame, fresh: np.ndarray, full: bool = False) -> None:
+        """Write the per-day rows of bars not covered by the saved state to the history store"""
+        groups = df['ticker'].to_numpy()
+        first_rows = np.r_[True, groups[1:] != groups[:-1]] if len(groups) else np.zeros(0, dtype=bool)
+        reloaded = set(groups[first_rows & fresh].astype(str))
         
-        results = []
+        rows = self.indicator_history(df)
+        rows = rows[fresh[rows.index]]
         
-        for ticker in tqdm(tickers, desc="Analyzing volume"):
-            ticker_data = df[df['ticker'] == ticker].copy()
-            
-            if len(ticker_data) < 30:
-                continue
+        if full or not self.history.exists():
+            self.history.write(rows)
+            return
+        replaced = rows['ticker'].isin(reloaded)
+        if replaced.any():
+            self.history.replace_tickers(rows[replaced])
+        if (~replaced).any():
+            self.history.append(rows[~replaced])
+        if self.history.needs_compaction():
+            self.history.compact()
+    
+    def analyze_parallel(self, df: pd.DataFrame, slices: List[Tuple[str, int, int]]) -> List[Tuple[str, Dict]]:
+        """
+        Score tickers in a process pool. The indicator columns are saved as
+        .npy files under a temp dir in data_dir and mapped by the workers;
+        only the (ticker, start, stop) ranges are sent to them.
+        """
+        array_dir = tempfile.mkdtemp(prefix='.volume_arrays-', dir=self.data_dir)
+        try:
+            for col in ANALYSIS_COLUMNS:
+                values = df[col].to_numpy()
+                if col == 'date':
+                    values = values.astype('datetime64[ns]')
+                np.save(os.path.join(array_dir, f'{col}.npy'), values)
             
-            analysis = self.analyze_supply_demand(ticker_data)
+            n_shards = min(len(slices), self.workers * SHARDS_PER_WORKER)
+            bounds = np.linspace(0, len(slices), n_shards + 1).astype(int)
+            shards = [slices[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+            logger.info(f"⚙️ Scoring {len(slices)} stocks in {len(shards)} shards on {self.workers} workers")
             
-            if analysis:
-                result = {
-                    'ticker': ticker,
-                    'name': ticker_data['name'].iloc[-1] if 'name' in ticker_data.columns else ticker,
-                    **analysis
-                }
-                results.append(result)
+            scored = []
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                     initargs=(array_dir,)) as pool:
+                # map() yields in submission order, so the output order is deterministic
+                for shard_results in tqdm(pool.map(_analyze_shard, shards), total=len(shards),
+                                          desc="Analyzing volume"):
+                    scored.extend(shard_results)
+            return scored
+        finally:
+            shutil.rmtree(array_dir, ignore_errors=True)
+    
+    def run(self, force: bool = False, full: bool = False, history: bool = False) -> pd.DataFrame:
+        """
+        Run volume analysis for all stocks (skipped if the price store is
+        unchanged since the last run). Continues the saved indicator state
+        unless full is set; history also writes the per-day indicator store.
+        """
+        if not force and not history and self.manifest.stage_fresh('analyze_volume'):
+            logger.info(f"⏭️ Price store unchanged since last run, reusing {self.output_file}")
+            return pd.read_csv(self.output_file)
+        
+        logger.info("🚀 Starting Volume Analysis...")
+        
+        # Load data
+        if history and not self.history.exists():
+            full = True
+        df = self.load_incremental(full=full, history_last=self.history.latest_dates() if history else None)
+        dimension = self.store.read_tickers()
+        names = dimension.set_index('ticker')['name'].to_dict()
+        # Reference ETFs share the store (and the indicator state) but are not stock picks
+        etfs = set(dimension.loc[dimension['market'] == ETF_MARKET, 'ticker'])
+        
+        # Cumulative and rolling indicators for the whole universe in one grouped
+        # pass (store rows are sorted by ticker, date); per-ticker code reads the columns.
+        # Running totals resume from the first saved state row of each ticker.
+        groups = df['ticker'].to_numpy()
+        first_rows = np.r_[True, groups[1:] != groups[:-1]] if len(groups) else np.zeros(0, dtype=bool)
+        fresh = df['obv'].isna().to_numpy() if 'obv' in df.columns else np.ones(len(df), dtype=bool)
+        resume = {}
+        for col in ('obv', 'ad_line'):
+            stored = df[col].to_numpy(dtype='float64') if col in df.columns else np.full(len(df), np.nan)
+            resume[col] = np.where(first_rows, stored, np.nan)
+        df['obv'] = obv(df['current_price'], df['volume'], groups, resume=resume['obv']).to_numpy()
+        df['ad_line'] = indicators.ad_line(df['high'], df['low'], df['current_price'], df['volume'],
+                                           groups, resume=resume['ad_line'])
+        df['mfi_14'] = indicators.mfi(df['high'], df['low'], df['current_price'], df['volume'], 14, groups)
+        df['volume_sma_20'] = indicators.rolling_mean(df['volume'], 20, groups)
+        
+        if history:
+            self.save_history(df, fresh, full=full)
+        
+        # Contiguous per-ticker row ranges: one pass over the frame instead of a scan per ticker
+        slices = group_slices(groups)
+        logger.info(f"📊 Analyzing {len(slices)} stocks")
+        
+        analyzed = [(ticker, start, stop) for ticker, start, stop in slices
+                    if stop - start >= 30 and ticker not in etfs]
+        if self.workers > 1 and len(analyzed) > self.workers:
+            scored = self.analyze_parallel(df, analyzed)
+        else:
+            scored = []
+            for ticker, start, stop in tqdm(analyzed, desc="Analyzing volume"):
+                analysis = self.analyze_supply_demand(df.iloc[start:stop])
+                if analysis:
+                    scored.append((ticker, analysis))
+        
+        results = [
+            {'ticker': ticker, 'name': names.get(ticker, ticker), **analysis}
+            for ticker, analysis in scored
+        ]
         
-        # Create DataFrame
-        results_df = pd.DataFrame(results)
+        # Create DataFrame and score every ticker in one vectorized step
+        results_df = apply_scorecard(pd.DataFrame(results), 'supply_demand')
+        self.save_state(df, slices)
         
         # Save results
-        results_df.to_csv(self.output_file, index=False)
+        self.manifest.write_csv(results_df, self.output_file, stage='analyze_volume')
         logger.info(f"✅ Analysis complete! Saved to {self.output_file}")
         
         # Print summary
@@ -257,10 +465,14 @@ def main():
     
     parser = argparse.ArgumentParser(description='US Stock Volume Analysis')
     parser.add_argument('--dir', default='.', help='Data directory')
+    parser.add_argument('--force', action='store_true', help='Recompute even if the price store is unchanged')
+    parser.add_argument('--full', action='store_true', help='Recompute indicators from full history (ignore saved state)')
+    parser.add_argument('--workers', type=int, default=None, help='Scoring processes (default: VOLUME_WORKERS or 1)')
+    parser.add_argument('--history', action='store_true', help='Also write daily indicators and scores to volume_history/')
     args = parser.parse_args()
     
-    analyzer = VolumeAnalyzer(data_dir=args.dir)
-    results = analyzer.run()
+    analyzer = VolumeAnalyzer(data_dir=args.dir, workers=args.workers)
+    results = analyzer.run(force=args.force, full=args.full, history=args.history)
     
     # Show top 10 accumulation stocks
     print("\n🔥 Top 10 Accumulation Stocks:")
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pipeline Artifact Manifest
+Stages write their CSV/JSON outputs through ArtifactManifest: each file is
+written atomically (temp file + rename) and _manifest.json records its
+content hash together with the hashes of the inputs it was computed from.
+
+    _manifest.json
+        {"us_volume_analysis.csv": {"sha256": "...", "size": 123, "mtime_ns": ...,
+                                    "stage": "analyze_volume",
+                                    "inputs": {"price_store/_meta.json": "...", ...},
+                                    "updated": "2025-01-02T18:00:00"}}
+
+Stages listed in STAGES are skipped when every output is intact and every
+input still hashes the same; other stages call market data or AI APIs and
+always run, unless they recorded a valid_until (e.g. 13F holdings between
+filing windows) that has not passed yet. Flask serves the hashes as ETags.
+
+ai_summary_generator is in STAGES although it calls Gemini and news: it
+only asks about picks without a stored summary, so unchanged picks would
+make no calls anyway. The trade-off is that a ticker's summary is never
+refreshed while it stays in the picks, whatever its news does. Daily
+stages (final_report_generator, whose dashboard snapshot is archived per
+date) are also rerun on the first run of each day.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+import pandas as pd
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+# Logging Configuration
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = '_manifest.json'
+
+# Deterministic stages: outputs depend only on these local inputs (paths are
+# relative to the data directory). Stages not listed here fetch live data.
+STAGES = {
+    'analyze_volume': {
+        'inputs': ['price_store/_meta.json', 'price_store/_tickers.parquet'],
+        'outputs': ['us_volume_analysis.csv'],
+    },
+    'ai_summary_generator': {
+        'inputs': ['smart_money_picks_v2.csv'],
+        'outputs': ['ai_summaries.json'],
+    },
+    'final_report_generator': {
+        'inputs': ['smart_money_picks_v2.csv', 'ai_summaries.json'],
+        'outputs': ['final_top10_report.json', 'smart_money_current.json'],
+        'daily': True,      # writes history/picks_<date>.json
+    },
+}
+
+
+def file_hash(path: str) -> str:
+    """sha256 of a file's content (streamed)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ArtifactManifest:
+    """Atomic artifact writes plus content/input hashes in <data_dir>/_manifest.json"""
+
+    def __init__(self, data_dir: str = '.'):
+        self.data_dir = data_dir
+        self.manifest_file = os.path.join(data_dir, MANIFEST_FILE)
+        self._lock = threading.Lock()
+        self._cache_key = None
+        self._cache: Dict[str, Dict] = {}
+        # (path, mtime_ns, size) -> sha256 for files hashed by this process
+        self._hashes: Dict[tuple, str] = {}
+
+    # ------------------------------------------------------------------
+    # Manifest
+    # ------------------------------------------------------------------
+    def _rel(self, path: str) -> str:
+        if not os.path.isabs(path) and not path.startswith(os.path.join(self.data_dir, '')):
+            path = os.path.join(self.data_dir, path)
+        return os.path.relpath(path, self.data_dir).replace(os.sep, '/')
+
+    def _abs(self, rel: str) -> str:
+        return os.path.join(self.data_dir, rel)
+
+    def load(self) -> Dict[str, Dict]:
+        """Manifest entries keyed by path relative to the data directory (re-read only when it changes)"""
+        try:
+            st = os.stat(self.manifest_file)
+        except OSError:
+            return {}
+        key = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            if key != self._cache_key:
+                try:
+                    with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                        self._cache = json.load(f)
+                except (OSError, ValueError):
+                    self._cache = {}
+                self._cache_key = key
+            return self._cache
+
+    def _save(self, entries: Dict[str, Dict]) -> None:
+        tmp_file = f'{self.manifest_file}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_file, self.manifest_file)
+
+    def entry(self, path: str) -> Optional[Dict]:
+        return self.load().get(self._rel(path))
+
+    # ------------------------------------------------------------------
+    # Hashes
+    # ------------------------------------------------------------------
+    def hash(self, path: str) -> Optional[str]:
+        """
+        Content hash of a file (None if missing). The manifest hash is reused
+        while the file's size and mtime still match what was recorded.
+        """
+        full = self._abs(self._rel(path))
+        try:
+            st = os.stat(full)
+        except OSError:
+            return None
+
+        recorded = self.load().get(self._rel(path))
+        if recorded and recorded.get('mtime_ns') == st.st_mtime_ns and recorded.get('size') == st.st_size:
+            return recorded['sha256']
+
+        key = (full, st.st_mtime_ns, st.st_size)
+        if key not in self._hashes:
+            self._hashes[key] = file_hash(full)
+        return self._hashes[key]
+
+    def etag(self, *paths: str, extra: str = '') -> Optional[str]:
+        """Combined content hash of the artifacts a response is built from (None if any is missing)"""
+        hashes = [self.hash(p) for p in paths]
+        if not all(hashes):
+            return None
+        return hashlib.sha256('|'.join(hashes + [extra]).encode('utf-8')).hexdigest()[:32]
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def record(self, path: str, stage: str, inputs: Optional[Iterable[str]] = None,
+               valid_until: Optional[str] = None) -> str:
+        """
+        Hash a freshly written artifact and store it with its input hashes.
+        valid_until (ISO timestamp) lets a live-data stage declare how long
+        its output stays current.
+        """
+        rel = self._rel(path)
+        full = self._abs(rel)
+        if inputs is None:
+            inputs = STAGES.get(stage, {}).get('inputs', [])
+        input_hashes = {self._rel(p): self.hash(p) for p in inputs}
+
+        st = os.stat(full)
+        digest = file_hash(full)
+        entries = dict(self.load())
+        entries[rel] = {
+            'sha256': digest,
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+            'stage': stage,
+            'inputs': input_hashes,
+            'updated': datetime.now().isoformat(),
+        }
+        if valid_until:
+            entries[rel]['valid_until'] = valid_until
+        self._save(entries)
+        return digest
+
+    def write_bytes(self, data: bytes, path: str, stage: str, inputs: Optional[Iterable[str]] = None,
+                    valid_until: Optional[str] = None) -> str:
+        """Atomically replace path with data and record it; unchanged content keeps its mtime"""
+        full = self._abs(self._rel(path))
+        if self.hash(full) == hashlib.sha256(data).hexdigest() and self.entry(full):
+            logger.info(f"⏸️ {self._rel(full)} unchanged")
+            return self.record(full, stage, inputs, valid_until)
+
+        os.makedirs(os.path.dirname(full) or '.', exist_ok=True)
+        tmp_file = f'{full}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_file, full)
+        return self.record(full, stage, inputs, valid_until)
+
+    def write_csv(self, df: pd.DataFrame, path: str, stage: str,
+                  inputs: Optional[Iterable[str]] = None, valid_until: Optional[str] = None, **kwargs) -> str:
+        kwargs.setdefault('index', False)
+        return self.write_bytes(df.to_csv(**kwargs).encode('utf-8'), path, stage, inputs, valid_until)
+
+    def write_json(self, obj: Any, path: str, stage: str,
+                   inputs: Optional[Iterable[str]] = None, valid_until: Optional[str] = None, **kwargs) -> str:
+        kwargs.setdefault('indent', 2)
+        return self.write_bytes(json.dumps(obj, **kwargs).encode('utf-8'), path, stage, inputs, valid_until)
+
+    # ------------------------------------------------------------------
+    # Freshness
+    # ------------------------------------------------------------------
+    def is_fresh(self, outputs: List[str], inputs: List[str]) -> bool:
+        """True if every output is as recorded and was computed from the current inputs"""
+        current = {self._rel(p): self.hash(p) for p in inputs}
+        for out in outputs:
+            recorded = self.entry(out)
+            if recorded is None or self.hash(out) != recorded['sha256']:
+                return False
+            if recorded.get('inputs') != current:
+                return False
+        return True
+
+    def stage_valid(self, stage: str) -> bool:
+        """
+        Whether a live-data stage's outputs are intact, built from unchanged
+        inputs and still before the valid_until every one of them recorded
+        """
+        outputs = {rel: e for rel, e in self.load().items() if e.get('stage') == stage}
+        now = datetime.now().isoformat()
+        if not outputs or any(e.get('valid_until', '') <= now for e in outputs.values()):
+            return False
+        return all(self.is_fresh([rel], list(e.get('inputs', {}))) for rel, e in outputs.items())
+
+    def stage_fresh(self, stage: str) -> bool:
+        """Whether a stage can be skipped (deterministic stages in STAGES, or a still-valid live stage)"""
+        spec = STAGES.get(stage)
+        if spec is None:
+            return self.stage_valid(stage)
+        if spec.get('daily'):
+            today = datetime.now().date().isoformat()
+            if any((self.entry(out) or {}).get('updated', '') < today for out in spec['outputs']):
+                return False
+        return self.is_fresh(spec['outputs'], spec['inputs'])
+
+
+def main():
+    """Main execution"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Pipeline artifact manifest')
+    parser.add_argument('--dir', default='.', help='Data directory')
+    parser.add_argument('--verify', action='store_true', help='Re-hash every artifact and report drift')
+    args = parser.parse_args()
+
+    manifest = ArtifactManifest(args.dir)
+    entries = manifest.load()
+    print(f"📦 {manifest.manifest_file}: {len(entries)} artifacts")
+    for rel, entry in sorted(entries.items()):
+        status = ''
+        if args.verify:
+            full = manifest._abs(rel)
+            status = 'missing' if not os.path.exists(full) else \
+                ('ok' if file_hash(full) == entry['sha256'] else 'modified')
+        print(f"   {rel:<36} {entry['sha256'][:12]} {entry.get('stage', ''):<24} {entry['updated'][:19]} {status}")
+    for stage in STAGES:
+        print(f"   stage {stage:<30} {'fresh' if manifest.stage_fresh(stage) else 'stale'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,17 +3,22 @@
 """
 US Stock Daily Prices Collection Script
 Collects daily price data for NASDAQ and S&P 500 stocks using yfinance
+(or any provider selected by MARKET_DATA_PROVIDER, see market_data.py)
 Similar to create_complete_daily_prices.py for Korean stocks
 """
 
 import os
 import pandas as pd
 import numpy as np
-import yfinance as yf
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List
-from tqdm import tqdm
+from typing import Dict, List, Optional
+from price_store import PriceStore, normalize_dates
+from price_panel import PricePanel
+from fetch_engine import default_engine, is_throttled
+from market_data import get_provider
+from market_calendar import TradingCalendar
+from universe import DEFAULT_UNIVERSE, normalize_ticker, reference_etfs, resolve_universe
 
 # Logging Configuration
 logging.basicConfig(
@@ -22,114 +27,69 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Incremental fetches re-download this many already-stored sessions; if they no
+# longer match the store (split/dividend re-adjustment upstream) the ticker's
+# full history is refetched and replaced.
+ADJUSTMENT_OVERLAP_SESSIONS = 5
+ADJUSTMENT_TOLERANCE = 5e-4  # max relative close difference on overlapping bars
+
+# Symbols per engine work item. yfinance's download() requests one symbol after
+# another, so chunks stay small: the engine's workers run them in parallel and
+# a chunk's token cost stays within the limiter's burst, i.e. close to the
+# requests it actually sends.
+DOWNLOAD_CHUNK_SIZE = 10
+
 
 class USStockDailyPricesCreator:
-    def __init__(self):
+    def __init__(self, batch_size: int = DOWNLOAD_CHUNK_SIZE, workers: Optional[int] = None,
+                 start_date: Optional[str] = None, universe: Optional[str] = None,
+                 time_budget: Optional[float] = None, overlap: int = ADJUSTMENT_OVERLAP_SESSIONS,
+                 etfs: bool = True):
         self.data_dir = os.getenv('DATA_DIR', '.')
         self.output_dir = self.data_dir
         os.makedirs(self.output_dir, exist_ok=True)
         
         # Data file paths
-        self.prices_file = os.path.join(self.output_dir, 'us_daily_prices.csv')
+        self.prices_file = os.path.join(self.output_dir, 'us_daily_prices.csv')  # legacy, migrated once
+        self.store = PriceStore(os.path.join(self.output_dir, 'price_store'))
+        self.panel = PricePanel(os.path.join(self.output_dir, 'price_panel'))
         self.stocks_list_file = os.path.join(self.output_dir, 'us_stocks_list.csv')
         
+        # Universe spec (e.g. 'sp500,nasdaq100'); None reuses the saved stock list
+        self.universe = universe
+        
+        # Reference ETFs (SPY, sector ETFs, GLD, ...) stored alongside the stocks for the
+        # ETF, heatmap and macro stages; they never enter us_stocks_list.csv
+        self.etfs = etfs
+        
         # Start date for historical data
-        self.start_date = datetime(2020, 1, 1)
-        self.end_date = datetime.now()
+        self.start_date = datetime.strptime(start_date, '%Y-%m-%d') if start_date else datetime(2020, 1, 1)
         
-    def get_sp500_tickers(self) -> List[Dict]:
-        """Get full S&P 500 tickers list"""
-        logger.info("📊 Loading full S&P 500 stocks...")
+        # NYSE sessions decide whether a new completed bar can exist
+        self.calendar = TradingCalendar()
         
-        # Full S&P 500 tickers (as of late 2024)
-        sp500_tickers = [
-            "A", "AAL", "AAPL", "ABBV", "ABNB", "ABT", "ACGL", "ACN", "ADBE", "ADI",
-            "ADM", "ADP", "ADSK", "AEE", "AEP", "AES", "AFL", "AIG", "AIZ", "AJG",
-            "AKAM", "ALB", "ALGN", "ALL", "ALLE", "AMAT", "AMCR", "AMD", "AME", "AMGN",
-            "AMP", "AMT", "AMZN", "ANET", "ANSS", "AON", "AOS", "APA", "APD", "APH",
-            "APTV", "ARE", "ATO", "AVB", "AVGO", "AVY", "AWK", "AXON", "AXP", "AZO",
-            "BA", "BAC", "BALL", "BAX", "BBWI", "BBY", "BDX", "BEN", "BF-B", "BG",
-            "BIIB", "BIO", "BK", "BKNG", "BKR", "BLDR", "BLK", "BMY", "BR", "BRK-B",
-            "BRO", "BSX", "BWA", "BX", "BXP", "C", "CAG", "CAH", "CARR", "CAT",
-            "CB", "CBOE", "CBRE", "CCI", "CCL", "CDNS", "CDW", "CE", "CEG", "CF",
-            "CFG", "CHD", "CHRW", "CHTR", "CI", "CINF", "CL", "CLX", "CMCSA", "CME",
-            "CMG", "CMI", "CMS", "CNC", "CNP", "COF", "COO", "COP", "COR", "COST",
-            "CPAY", "CPB", "CPRT", "CPT", "CRL", "CRM", "CSCO", "CSGP", "CSX", "CTAS",
-            "CTLT", "CTRA", "CTSH", "CTVA", "CVS", "CVX", "CZR", "D", "DAL", "DAY",
-            "DD", "DE", "DECK", "DFS", "DG", "DGX", "DHI", "DHR", "DIS", "DLR",
-            "DLTR", "DOC", "DOV", "DOW", "DPZ", "DRI", "DTE", "DUK", "DVA", "DVN",
-            "DXCM", "EA", "EBAY", "ECL", "ED", "EFX", "EG", "EIX", "EL", "ELV",
-            "EMN", "EMR", "ENPH", "EOG", "EPAM", "EQIX", "EQR", "EQT", "ES", "ESS",
-            "ETN", "ETR", "ETSY", "EVRG", "EW", "EXC", "EXPD", "EXPE", "EXR", "F",
-            "FANG", "FAST", "FCX", "FDS", "FDX", "FE", "FFIV", "FI", "FICO", "FIS",
-            "FITB", "FLT", "FMC", "FOX", "FOXA", "FRT", "FSLR", "FTNT", "FTV", "GD",
-            "GDDY", "GE", "GEHC", "GEN", "GEV", "GILD", "GIS", "GL", "GLW", "GM",
-            "GNRC", "GOOG", "GOOGL", "GPC", "GPN", "GRMN", "GS", "GWW", "HAL", "HAS",
-            "HBAN", "HCA", "HD", "HES", "HIG", "HII", "HLT", "HOLX", "HON", "HPE",
-            "HPQ", "HRL", "HSIC", "HST", "HSY", "HUBB", "HUM", "HWM", "IBM", "ICE",
-            "IDXX", "IEX", "IFF", "ILMN", "INCY", "INTC", "INTU", "INVH", "IP", "IPG",
-            "IQV", "IR", "IRM", "ISRG", "IT", "ITW", "IVZ", "J", "JBHT", "JBL",
-            "JCI", "JKHY", "JNJ", "JNPR", "JPM", "K", "KDP", "KEY", "KEYS", "KHC",
-            "KIM", "KKR", "KLAC", "KMB", "KMI", "KMX", "KO", "KR", "KVUE", "L",
-            "LDOS", "LEN", "LH", "LHX", "LIN", "LKQ", "LLY", "LMT", "LNT", "LOW",
-            "LRCX", "LULU", "LUV", "LVS", "LW", "LYB", "LYV", "MA", "MAA", "MAR",
-            "MAS", "MCD", "MCHP", "MCK", "MCO", "MDLZ", "MDT", "MET", "META", "MGM",
-            "MHK", "MKC", "MKTX", "MLM", "MMC", "MMM", "MNST", "MO", "MOH", "MOS",
-            "MPC", "MPWR", "MRK", "MRNA", "MRO", "MS", "MSCI", "MSFT", "MSI", "MTB",
-            "MTCH", "MTD", "MU", "NCLH", "NDAQ", "NDSN", "NEE", "NEM", "NFLX", "NI",
-            "NKE", "NOC", "NOW", "NRG", "NSC", "NTAP", "NTRS", "NUE", "NVDA", "NVR",
-            "NWS", "NWSA", "NXPI", "O", "ODFL", "OKE", "OMC", "ON", "ORCL", "ORLY",
-            "OTIS", "OXY", "PANW", "PARA", "PAYC", "PAYX", "PCAR", "PCG", "PEG", "PEP",
-            "PFE", "PFG", "PG", "PGR", "PH", "PHM", "PKG", "PLD", "PM", "PNC",
-            "PNR", "PNW", "PODD", "POOL", "PPG", "PPL", "PRU", "PSA", "PSX", "PTC",
-            "PWR", "PYPL", "QCOM", "QRVO", "RCL", "REG", "REGN", "RF", "RJF", "RL",
-            "RMD", "ROK", "ROL", "ROP", "ROST", "RSG", "RTX", "RVTY", "SBAC", "SBUX",
-            "SCHW", "SHW", "SJM", "SLB", "SMCI", "SNA", "SNPS", "SO", "SOLV", "SPG",
-            "SPGI", "SRE", "STE", "STLD", "STT", "STX", "STZ", "SWK", "SWKS", "SYF",
-            "SYK", "SYY", "T", "TAP", "TDG", "TDY", "TECH", "TEL", "TER", "TFC",
-            "TFX", "TGT", "TJX", "TMO", "TMUS", "TPR", "TRGP", "TRMB", "TROW", "TRV",
-            "TSCO", "TSLA", "TSN", "TT", "TTWO", "TXN", "TXT", "TYL", "UAL", "UBER",
-            "UDR", "UHS", "ULTA", "UNH", "UNP", "UPS", "URI", "USB", "V", "VICI",
-            "VLO", "VLTO", "VMC", "VRSK", "VRSN", "VRTX", "VST", "VTR", "VTRS", "VZ",
-            "WAB", "WAT", "WBA", "WBD", "WDC", "WEC", "WELL", "WFC", "WM", "WMB",
-            "WMT", "WRB", "WST", "WTW", "WY", "WYNN", "XEL", "XOM", "XYL", "YUM",
-            "ZBH", "ZBRA", "ZTS"
-        ]
+        # Max symbols per download() call (one engine work item)
+        self.batch_size = batch_size
         
-        stocks = []
-        for ticker in sp500_tickers:
-            stocks.append({
-                'ticker': ticker,
-                'name': ticker,  # Will be fetched from yfinance
-                'sector': 'N/A',
-                'industry': 'N/A',
-                'market': 'S&P500'
-            })
+        # Stored sessions re-fetched on incremental runs to detect re-adjusted history
+        self.overlap = overlap
+        
+        # Market data source (MARKET_DATA_PROVIDER) and shared concurrent fetch engine (bounded workers + adaptive rate limit)
+        self.provider = get_provider()
+        self.engine = default_engine(workers, rate_limited=self.provider.rate_limited,
+                                     time_budget=time_budget)
         
-        logger.info(f"✅ Loaded {len(stocks)} S&P 500 stocks")
-        return stocks
-    
-    def get_nasdaq100_tickers(self) -> List[Dict]:
-        """Skip NASDAQ - already covered in S&P 500"""
-        logger.info("📊 Skipping NASDAQ 100 (covered in S&P 500)...")
-        return []
-    
     def load_or_create_stock_list(self) -> pd.DataFrame:
-        """Load existing stock list or create new one"""
-        if os.path.exists(self.stocks_list_file):
+        """Load existing stock list, or build it from the universe registry"""
+        if self.universe is None and os.path.exists(self.stocks_list_file):
             logger.info(f"📂 Loading existing stock list: {self.stocks_list_file}")
-            return pd.read_csv(self.stocks_list_file)
+            stocks_df = pd.read_csv(self.stocks_list_file)
+            stocks_df['ticker'] = stocks_df['ticker'].map(normalize_ticker)
+            return stocks_df.drop_duplicates(subset=['ticker'], keep='first')
         
-        # Create new stock list
-        logger.info("📝 Creating new US stock list...")
-        
-        sp500_stocks = self.get_sp500_tickers()
-        nasdaq_stocks = self.get_nasdaq100_tickers()
-        
-        # Combine and remove duplicates
-        all_stocks = sp500_stocks + nasdaq_stocks
-        stocks_df = pd.DataFrame(all_stocks)
-        stocks_df = stocks_df.drop_duplicates(subset=['ticker'], keep='first')
+        # Create new stock list (versioned universe files, normalized + de-duplicated)
+        logger.info(f"📝 Creating US stock list from universe: {self.universe or DEFAULT_UNIVERSE}")
+        stocks_df = resolve_universe(self.universe)
         
         # Save stock list
         stocks_df.to_csv(self.stocks_list_file, index=False)
@@ -137,59 +97,136 @@ class USStockDailyPricesCreator:
         
         return stocks_df
     
+    def migrate_legacy_csv(self) -> None:
+        """One-time migration of us_daily_prices.csv into the columnar store"""
+        if not self.store.exists() and os.path.exists(self.prices_file):
+            self.store.migrate_from_csv(self.prices_file)
+    
     def load_existing_prices(self) -> pd.DataFrame:
-        """Load existing price data"""
-        if os.path.exists(self.prices_file):
-            logger.info(f"📂 Loading existing prices: {self.prices_file}")
-            df = pd.read_csv(self.prices_file)
-            df['date'] = pd.to_datetime(df['date'])
-            return df
+        """Load existing price data (migrates the legacy CSV on first run)"""
+        self.migrate_legacy_csv()
+        
+        if self.store.exists():
+            logger.info(f"📂 Loading existing prices: {self.store.root}")
+            return self.store.read()
         return pd.DataFrame()
     
-    def get_latest_dates(self, df: pd.DataFrame) -> Dict[str, datetime]:
-        """Get latest date for each ticker"""
-        if df.empty:
-            return {}
-        return df.groupby('ticker')['date'].max().to_dict()
+    def get_latest_dates(self) -> Dict[str, datetime]:
+        """Get latest date for each ticker (store metadata, no history scan)"""
+        self.migrate_legacy_csv()
+        return self.store.latest_dates()
+    
+    def _format_history(self, ticker: str, hist: pd.DataFrame) -> pd.DataFrame:
+        """Convert a yfinance OHLCV frame to the price store format"""
+        hist = hist.dropna(subset=['Close'])
+        if hist.empty:
+            return pd.DataFrame()
+        
+        hist = hist.reset_index()
+        hist['ticker'] = ticker
+        
+        # Rename columns to match Korean stock format
+        hist = hist.rename(columns={
+            'Date': 'date',
+            'Open': 'open',
+            'High': 'high',
+            'Low': 'low',
+            'Close': 'current_price',
+            'Volume': 'volume'
+        })
+        hist['date'] = normalize_dates(hist['date'])
+        
+        # Calculate change and change_rate
+        hist['change'] = hist['current_price'].diff()
+        hist['change_rate'] = hist['current_price'].pct_change() * 100
+        
+        # Select required columns
+        cols = ['ticker', 'date', 'open', 'high', 'low', 'current_price', 'volume', 'change', 'change_rate']
+        return hist[cols]
     
     def download_stock_data(self, ticker: str, start_date: datetime, end_date: datetime) -> pd.DataFrame:
         """Download daily price data for a single stock"""
         try:
-            stock = yf.Ticker(ticker)
-            hist = stock.history(start=start_date, end=end_date)
+            hist = self.provider.history(ticker, start=start_date, end=end_date)
             
             if hist.empty:
                 return pd.DataFrame()
             
-            hist = hist.reset_index()
-            hist['ticker'] = ticker
-            
-            # Rename columns to match Korean stock format
-            hist = hist.rename(columns={
-                'Date': 'date',
-                'Open': 'open',
-                'High': 'high',
-                'Low': 'low',
-                'Close': 'current_price',
-                'Volume': 'volume'
-            })
-            
-            # Calculate change and change_rate
-            hist['change'] = hist['current_price'].diff()
-            hist['change_rate'] = hist['current_price'].pct_change() * 100
-            
-            # Select required columns
-            cols = ['ticker', 'date', 'open', 'high', 'low', 'current_price', 'volume', 'change', 'change_rate']
-            hist = hist[cols]
-            
-            return hist
+            return self._format_history(ticker, hist)
             
         except Exception as e:
+            if is_throttled(e):
+                raise
             logger.debug(f"⚠️ Failed to download {ticker}: {e}")
             return pd.DataFrame()
     
-    def run(self, full_refresh: bool = False) -> bool:
-        """Run data collection (incremental by default)"""
+    def download_batch(self, tickers: List[str], start_date: datetime, end_date: datetime) -> Dict[str, pd.DataFrame]:
+        """Download daily prices for several tickers sharing a start date in one request"""
+        try:
+            # Concurrency is bounded by the fetch engine, not by the provider
+            data = self.provider.download(tickers, start=start_date, end=end_date, group_by='ticker',
+                                          threads=False)
+        except Exception as e:
+            if is_throttled(e):
+                raise
+            logger.debug(f"⚠️ Failed to download batch {tickers[:3]}...: {e}")
+            return {}
+        
+        if data is None or data.empty:
+            return {}
+        
+        results = {}
+        for ticker in tickers:
+            if isinstance(data.columns, pd.MultiIndex):
+                if ticker not in data.columns.get_level_values(0):
+                    continue
+                hist = data[ticker]
+            else:
+                hist = data
+            
+            formatted = self._format_history(ticker, hist)
+            if not formatted.empty:
+                results[ticker] = formatted
+        return results
+    
+    def detect_adjustments(self, new_df: pd.DataFrame, latest_dates: Dict[str, pd.Timestamp]) -> Dict[str, float]:
+        """
+        Compare re-fetched overlap bars with the stored ones. Returns
+        {ticker: median fresh/stored close ratio} for tickers whose history was
+        re-adjusted upstream (ratio 0.5 after a 2:1 split, ~0.99 after a dividend).
+        """
+        last = pd.to_datetime(new_df['ticker'].map(latest_dates))
+        overlap = new_df[last.notna() & (new_df['date'] <= last)]
+        if overlap.empty:
+            return {}
+        
+        stored = self.store.read(tickers=overlap['ticker'].unique(), start=overlap['date'].min(),
+                                 end=overlap['date'].max(), columns=['current_price'])
+        merged = overlap[['ticker', 'date', 'current_price']].merge(
+            stored.astype({'ticker': str}), on=['ticker', 'date'], suffixes=('', '_stored')
+        )
+        merged = merged[merged['current_price_stored'] > 0]
+        ratio = merged['current_price'] / merged['current_price_stored'].astype('float64')
+        moved = (ratio - 1).abs() > ADJUSTMENT_TOLERANCE
+        
+        return {
+            t: float(r) for t, r in ratio[moved].groupby(merged.loc[moved, 'ticker']).median().items()
+        }
+    
+    def refetch_history(self, tickers: List[str], end_date: datetime) -> pd.DataFrame:
+        """Download the complete history (from the first stored bar) of re-adjusted tickers"""
+        stats = self.store.ticker_stats()
+        def fetch(ticker):
+            first = stats.get(ticker, {}).get('first')
+            start = datetime.strptime(first, '%Y-%m-%d') if first else self.start_date
+            return self.download_stock_data(ticker, start, end_date)
+        
+        frames = self.engine.map(fetch, tickers, desc="Refetching re-adjusted tickers")
+        frames = [f for f in frames if f is not None and not f.empty]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    
+    def run(self, full_refresh: bool = False, compact: bool = False) -> bool:
+        """Run data collection (incremental by default, append-only)"""
         logger.info("🚀 US Stock Daily Prices Collection Started...")
         
         try:
@@ -199,66 +236,146 @@ class USStockDailyPricesCreator:
                 logger.error("❌ No stocks to process")
                 return False
             
-            # 2. Load existing data
-            existing_df = pd.DataFrame() if full_refresh else self.load_existing_prices()
-            latest_dates = self.get_latest_dates(existing_df)
+            # Reference ETFs share the batched requests of the stocks
+            etfs_df = reference_etfs() if self.etfs else pd.DataFrame(columns=['ticker', 'name', 'market'])
+            etfs_df = etfs_df[~etfs_df['ticker'].isin(stocks_df['ticker'])]
+            tickers = stocks_df['ticker'].tolist() + etfs_df['ticker'].tolist()
             
-            # 3. Determine target end date
-            now = datetime.now()
-            target_end_date = now
+            # 2. Latest stored date per ticker
+            latest_dates = {} if full_refresh else self.get_latest_dates()
             
-            # 4. Collect data
-            all_new_data = []
-            failed_tickers = []
+            # 3. Determine target end date: the last completed NYSE session.
+            #    End is exclusive upstream, so today's partial bar is never stored.
+            last_session = self.calendar.last_completed_session()
+            target_end_date = (last_session + timedelta(days=1)).to_pydatetime()
             
-            for idx, row in tqdm(stocks_df.iterrows(), desc="Downloading US stocks", total=len(stocks_df)):
-                ticker = row['ticker']
-                
-                # Determine start date
+            # 4. Group tickers by required start date (most share the same latest date)
+            groups: Dict[datetime, List[str]] = {}
+            for ticker in tickers:
                 if ticker in latest_dates:
-                    start_date = latest_dates[ticker] + timedelta(days=1)
+                    # Skip if no completed session is newer than the stored bar
+                    if latest_dates[ticker] >= last_session:
+                        continue
+                    # Re-fetch a few stored sessions to detect split/dividend re-adjustment
+                    if self.overlap > 0:
+                        start_date = self.calendar.previous_session(latest_dates[ticker],
+                                                                    self.overlap - 1).to_pydatetime()
+                    else:
+                        start_date = latest_dates[ticker].to_pydatetime() + timedelta(days=1)
                 else:
                     start_date = self.start_date
-                
-                # Skip if already up to date
-                if start_date >= target_end_date:
+                groups.setdefault(start_date, []).append(ticker)
+            
+            batches = [
+                (start_date, tickers[i:i + self.batch_size])
+                for start_date, tickers in sorted(groups.items())
+                for i in range(0, len(tickers), self.batch_size)
+            ]
+            requested = sum(len(batch) for _, batch in batches)
+            if not batches:
+                logger.info(f"⏸️ Store is current through {last_session.date()} "
+                            f"(next close {self.calendar.next_close().strftime('%Y-%m-%d %H:%M %Z')}), "
+                            f"no download needed")
+            # download() still sends one history request per symbol; grouping shares
+            # the start date and work item, not round trips
+            logger.info(f"📦 {requested} tickers in {len(groups)} start-date groups → {len(batches)} download calls "
+                        f"({requested} symbol requests)")
+            
+            # 5. Collect data (name/market go to the ticker dimension, not every row)
+            self.store.write_tickers(pd.concat([stocks_df, etfs_df], ignore_index=True))
+            all_new_data = []
+            failed_tickers = []
+            
+            downloaded_batches = self.engine.map(
+                lambda b: self.download_batch(b[1], b[0], target_end_date),
+                batches, desc="Downloading US stocks", cost=lambda b: len(b[1])
+            )
+            
+            # Batches cut off by the time budget are picked up by the next run
+            skipped = set(self.engine.skipped)
+            deferred_tickers = []
+            missing = []
+            for idx, ((start_date, batch), downloaded) in enumerate(zip(batches, downloaded_batches)):
+                if idx in skipped:
+                    deferred_tickers.extend(batch)
                     continue
-                
-                # Download data
-                new_data = self.download_stock_data(ticker, start_date, target_end_date)
-                
-                if not new_data.empty:
-                    # Add name from stock list
-                    new_data['name'] = row['name']
-                    new_data['market'] = row['market']
-                    all_new_data.append(new_data)
-                else:
-                    failed_tickers.append(ticker)
+                for ticker in batch:
+                    new_data = (downloaded or {}).get(ticker)
+                    if new_data is not None:
+                        all_new_data.append(new_data)
+                    else:
+                        missing.append((start_date, ticker))
+            # Provider requests actually sent (work cut off by the time budget sent none)
+            sent, retries, refetches = requested - len(deferred_tickers), 0, 0
+            
+            # download() swallows per-symbol errors (rate limits included) into an empty
+            # result, so symbols it did not return are retried one by one: there a
+            # throttle raises into the engine, which backs off and retries with jitter
+            if missing:
+                logger.info(f"🔁 Retrying {len(missing)} tickers missing from batched results individually")
+                retried = self.engine.map(lambda m: self.download_stock_data(m[1], m[0], target_end_date),
+                                          missing, desc="Retrying missing tickers")
+                skipped = set(self.engine.skipped)
+                retries = len(missing) - len(skipped)
+                for idx, ((start_date, ticker), new_data) in enumerate(zip(missing, retried)):
+                    if idx in skipped:
+                        deferred_tickers.append(ticker)
+                    elif new_data is not None and not new_data.empty:
+                        all_new_data.append(new_data)
+                    else:
+                        failed_tickers.append(ticker)
             
-            # 5. Combine and save
+            # 6. Save (full refresh rewrites, incremental appends only the new bars)
+            adjusted = {}
             if all_new_data:
                 new_df = pd.concat(all_new_data, ignore_index=True)
                 
-                if not existing_df.empty:
-                    final_df = pd.concat([existing_df, new_df])
-                    final_df = final_df.drop_duplicates(subset=['ticker', 'date'], keep='last')
+                if full_refresh:
+                    self.store.write(new_df)
+                    saved = len(new_df)
                 else:
-                    final_df = new_df
+                    # Re-adjusted tickers get their history replaced instead of mixing factors
+                    adjusted = self.detect_adjustments(new_df, latest_dates)
+                    if adjusted:
+                        logger.info(f"✂️ Adjustment change detected for {len(adjusted)} tickers: " +
+                                    ', '.join(f"{t} x{r:.4f}" for t, r in sorted(adjusted.items())[:10]))
+                        refetched = self.refetch_history(sorted(adjusted), target_end_date)
+                        refetches = len(adjusted) - len(self.engine.skipped)
+                        if not refetched.empty:
+                            self.store.replace_tickers(refetched)
+                        refetch_failed = set(adjusted) - set(refetched['ticker'] if not refetched.empty else [])
+                        if refetch_failed:
+                            # Left as-is; the overlap check flags them again next run
+                            logger.warning(f"⚠️ Refetch failed for {len(refetch_failed)} re-adjusted tickers: "
+                                           f"{sorted(refetch_failed)[:10]}")
+                        new_df = new_df[~new_df['ticker'].isin(list(adjusted))]
+                    saved = self.store.append(new_df)
                 
-                # Sort and save
-                final_df = final_df.sort_values(['ticker', 'date']).reset_index(drop=True)
-                final_df.to_csv(self.prices_file, index=False)
-                
-                logger.info(f"✅ Saved {len(new_df)} new records to {self.prices_file}")
-                logger.info(f"📊 Total records: {len(final_df)}")
+                logger.info(f"✅ Saved {saved} new records to {self.store.root}")
+                logger.info(f"📊 Total records: {self.store.total_rows()}")
             else:
                 logger.info("✨ All data is up to date!")
             
-            # 6. Summary
+            # Periodic compaction keeps the segment count bounded
+            if compact or self.store.needs_compaction():
+                self.store.compact()
+            
+            # Dense memory-mapped panel for analyzers (incremental unless full refresh)
+            if all_new_data or full_refresh or not self.panel.exists():
+                self.panel.build(self.store, full=full_refresh)
+            
+            # 7. Summary
             logger.info(f"\n📊 Collection Summary:")
-            logger.info(f"   Total stocks: {len(stocks_df)}")
-            logger.info(f"   Success: {len(stocks_df) - len(failed_tickers)}")
+            logger.info(f"   Total stocks: {len(stocks_df)} (+{len(etfs_df)} reference ETFs)")
+            logger.info(f"   Success: {len(tickers) - len(failed_tickers) - len(deferred_tickers)}")
             logger.info(f"   Failed: {len(failed_tickers)}")
+            if deferred_tickers:
+                logger.info(f"   Deferred (time budget): {len(deferred_tickers)}")
+            if adjusted:
+                logger.info(f"   Re-adjusted (history replaced): {len(adjusted)}")
+            logger.info(f"   Provider requests: {sent + retries + refetches} "
+                        f"({sent} in download calls, {retries} individual retries, "
+                        f"{refetches} re-adjustment refetches)")
             
             if failed_tickers[:10]:
                 logger.warning(f"   Failed samples: {failed_tickers[:10]}")
@@ -276,14 +393,29 @@ def main():
     
     parser = argparse.ArgumentParser(description='US Stock Daily Prices Collector')
     parser.add_argument('--full', action='store_true', help='Full refresh (ignore existing data)')
+    parser.add_argument('--compact', action='store_true', help='Merge append-only segments after the update')
+    parser.add_argument('--batch-size', type=int, default=DOWNLOAD_CHUNK_SIZE,
+                        help='Tickers per download call (one concurrent work item)')
+    parser.add_argument('--workers', type=int, default=None, help='Concurrent download workers (default: FETCH_WORKERS or 8)')
+    parser.add_argument('--start', default=None, help='History start date for new tickers, YYYY-MM-DD (default: 2020-01-01)')
+    parser.add_argument('--universe', default=None,
+                        help='Universe spec, e.g. sp500,nasdaq100 or russell1000 (default: reuse us_stocks_list.csv)')
+    parser.add_argument('--time-budget', type=float, default=None,
+                        help='Seconds allowed for downloads; the rest is picked up next run (default: FETCH_TIME_BUDGET)')
+    parser.add_argument('--overlap', type=int, default=ADJUSTMENT_OVERLAP_SESSIONS,
+                        help='Stored sessions re-fetched to detect split/dividend re-adjustment (0 disables)')
+    parser.add_argument('--no-etfs', action='store_true',
+                        help='Do not collect the reference ETFs (SPY, sector ETFs, ...) into the store')
     args = parser.parse_args()
     
-    creator = USStockDailyPricesCreator()
-    success = creator.run(full_refresh=args.full)
+    creator = USStockDailyPricesCreator(batch_size=args.batch_size, workers=args.workers, start_date=args.start,
+                                        universe=args.universe, time_budget=args.time_budget, overlap=args.overlap,
+                                        etfs=not args.no_etfs)
+    success = creator.run(full_refresh=args.full, compact=args.compact)
     
     if success:
         print("\n🎉 US Stock Daily Prices collection completed!")
-        print(f"📁 File location: ./us_daily_prices.csv")
+        print(f"📁 Store location: {creator.store.root}")
     else:
         print("\n❌ Collection failed.")
 
@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 import pandas as pd
 from io import StringIO
 from dotenv import load_dotenv
+from artifacts import ArtifactManifest
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
@@ -11,6 +12,7 @@ logging.basicConfig(level=logging.INFO)
 class EconomicCalendar:
     def __init__(self, data_dir='.'):
         self.output = os.path.join(data_dir, 'weekly_calendar.json')
+        self.manifest = ArtifactManifest(data_dir)
         
     def get_events(self):
         # Scrape Yahoo Finance Calendar (Simplified)
@@ -77,8 +79,7 @@ class EconomicCalendar:
             'events': events,
             'week_start': datetime.now().strftime('%Y-%m-%d')
         }
-        with open(self.output, 'w') as f:
-            json.dump(output, f, indent=2)
+        self.manifest.write_json(output, self.output, stage='economic_calendar', inputs=[])
         logging.info("Saved economic calendar")
 
 if __name__ == "__main__":
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Concurrent Fetch Engine
+Bounded thread pool + adaptive token-bucket rate limiter shared by every
+stage that talks to Yahoo Finance (price collector, ETF flows, screener)
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from tqdm import tqdm
+
+# Logging Configuration
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class ThrottledError(Exception):
+    """Raised when the upstream signals throttling (HTTP 429 / rate limit)"""
+
+
+class TimeBudgetExceeded(Exception):
+    """Raised for items not started (or retried) before the map's time budget ran out"""
+
+
+def is_throttled(exc: BaseException) -> bool:
+    """Detect throttling responses regardless of which layer raised them"""
+    if isinstance(exc, ThrottledError) or type(exc).__name__ == 'YFRateLimitError':
+        return True
+    text = str(exc).lower()
+    return '429' in text or 'too many requests' in text or 'rate limit' in text
+
+
+class RateLimiter:
+    """
+    Token bucket with multiplicative backoff on throttling and
+    additive recovery on success (AIMD)
+    """
+
+    def __init__(self, rate: float = 8.0, burst: int = 16, min_rate: float = 0.5):
+        self.target_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, cost: float = 1.0) -> None:
+        """
+        Block until the request may proceed. Costs larger than the bucket
+        (e.g. a 100-symbol batch) are allowed to run the bucket into debt,
+        which keeps the long-run request rate at `rate`.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.paused_until - now
+                if wait <= 0 and self.tokens >= min(cost, self.capacity):
+                    self.tokens -= cost
+                    return
+                if wait <= 0:
+                    wait = (min(cost, self.capacity) - self.tokens) / self.rate
+            time.sleep(min(max(wait, 0.01), 5.0))
+
+    def backoff(self, pause: float) -> None:
+        """Halve the rate and pause everyone after a throttling response"""
+        with self.lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return  # concurrent workers hit the same throttling window
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.paused_until = now + pause
+        logger.warning(f"⏳ Throttled - rate lowered to {self.rate:.2f}/s, pausing {pause:.1f}s")
+
+    def recover(self) -> None:
+        """Creep back toward the target rate after a success"""
+        with self.lock:
+            if self.rate < self.target_rate:
+                self.rate = min(self.target_rate, self.rate + 0.1)
+
+
+class FetchEngine:
+    """Run fetch functions on a bounded thread pool with rate limiting and jittered retries"""
+
+    def __init__(self, workers: int = 8, rate: Optional[float] = 8.0, burst: int = 16,
+                 max_retries: int = 4, base_delay: float = 2.0, max_delay: float = 60.0,
+                 time_budget: Optional[float] = None):
+        self.workers = max(1, workers)
+        # Seconds each map() may run; unfinished items are skipped, not waited on
+        self.time_budget = time_budget
+        self.skipped: List[int] = []
+        # rate=None disables throttling (local sources: synthetic provider, cache replay)
+        self.limiter = RateLimiter(rate=rate, burst=burst) if rate else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failures: Dict[int, str] = {}
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, fn: Callable[..., Any], *args, cost: float = 1.0,
+             deadline: Optional[float] = None, **kwargs) -> Any:
+        """Call fn under the rate limiter, retrying throttled and transient failures"""
+        for attempt in range(self.max_retries + 1):
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeBudgetExceeded(f"time budget of {self.time_budget:.0f}s exhausted")
+            if self.limiter:
+                self.limiter.acquire(cost)
+            try:
+                result = fn(*args, **kwargs)
+                if self.limiter:
+                    self.limiter.recover()
+                return result
+            except Exception as e:
+                # Offline replay misses are deterministic, retrying cannot help
+                if attempt == self.max_retries or type(e).__name__ == 'CacheMissError':
+                    raise
+                delay = self._backoff_delay(attempt)
+                if is_throttled(e) and self.limiter:
+                    self.limiter.backoff(max(delay, self.base_delay))
+                else:
+                    logger.debug(f"Retrying after error ({attempt + 1}/{self.max_retries}): {e}")
+                    time.sleep(delay)
+
+    def map(self, fn: Callable[[Any], Any], items: Sequence[Any], desc: Optional[str] = None,
+            cost: Optional[Callable[[Any], float]] = None) -> List[Any]:
+        """
+        Apply fn to every item concurrently. Results keep the input order;
+        items that still fail after retries yield None and are recorded in
+        self.failures (index -> error). With a time budget, items not done
+        in time also yield None and their indices are listed in self.skipped.
+        """
+        self.failures = {}
+        self.skipped = []
+        results: List[Any] = [None] * len(items)
+        deadline = time.monotonic() + self.time_budget if self.time_budget else None
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {
+                pool.submit(self.call, fn, item, cost=cost(item) if cost else 1.0, deadline=deadline): idx
+                for idx, item in enumerate(items)
+            }
+            for future in tqdm(as_completed(futures), total=len(futures), desc=desc, disable=desc is None):
+                idx = futures[future]
+                try:
+                    results[idx] = future.result()
+                except TimeBudgetExceeded as e:
+                    self.failures[idx] = str(e)
+                    self.skipped.append(idx)
+                except Exception as e:
+                    self.failures[idx] = str(e)
+                    logger.debug(f"⚠️ Giving up on item {idx}: {e}")
+
+        if self.skipped:
+            self.skipped.sort()
+            logger.warning(f"⏱️ Time budget of {self.time_budget:.0f}s reached - "
+                           f"{len(self.skipped)}/{len(items)} items skipped")
+        return results
+
+
+def default_engine(workers: Optional[int] = None, rate_limited: bool = True,
+                   time_budget: Optional[float] = None) -> FetchEngine:
+    """
+    Engine configured from FETCH_WORKERS / FETCH_RATE / FETCH_TIME_BUDGET
+    (CLI --workers / --time-budget override). rate_limited=False skips the
+    token bucket for sources that never hit the network.
+    """
+    budget = time_budget or os.getenv('FETCH_TIME_BUDGET')
+    return FetchEngine(
+        workers=workers or int(os.getenv('FETCH_WORKERS', '8')),
+        rate=float(os.getenv('FETCH_RATE', '8')) if rate_limited else None,
+        time_budget=float(budget) if budget else None
+    )
@@ -2,17 +2,23 @@
 import os, json, logging
 import pandas as pd
 from datetime import datetime
+from artifacts import ArtifactManifest
 
 logging.basicConfig(level=logging.INFO)
 
 class FinalReportGenerator:
     def __init__(self, data_dir='.'):
         self.data_dir = data_dir
+        self.manifest = ArtifactManifest(data_dir)
         
-    def run(self, top_n=10):
+    def run(self, top_n=10, force=False):
         # Load Quant Data
         stats_path = os.path.join(self.data_dir, 'smart_money_picks_v2.csv')
         if not os.path.exists(stats_path): return
+        # Not fresh on a new day either, so today's history snapshot is always written
+        if not force and self.manifest.stage_fresh('final_report_generator'):
+            print("Picks and AI summaries unchanged, today's report is current")
+            return
         df = pd.read_csv(stats_path)
         
         # Load AI Data
@@ -60,8 +66,9 @@ class FinalReportGenerator:
         for i, p in enumerate(top_picks, 1): p['rank'] = i
         
         # Save Report
-        with open(os.path.join(self.data_dir, 'final_top10_report.json'), 'w', encoding='utf-8') as f:
-            json.dump({'top_picks': top_picks}, f, indent=2, ensure_ascii=False)
+        stage = 'final_report_generator'
+        self.manifest.write_json({'top_picks': top_picks}, os.path.join(self.data_dir, 'final_top10_report.json'),
+                                 stage=stage, ensure_ascii=False)
             
         # Save for Dashboard with timestamp
         now = datetime.now()
@@ -73,18 +80,21 @@ class FinalReportGenerator:
             'picks': top_picks
         }
         
-        with open(os.path.join(self.data_dir, 'smart_money_current.json'), 'w', encoding='utf-8') as f:
-            json.dump(dashboard_data, f, indent=2, ensure_ascii=False)
+        self.manifest.write_json(dashboard_data, os.path.join(self.data_dir, 'smart_money_current.json'),
+                                 stage=stage, ensure_ascii=False)
         
         # Save to history directory for date picker
         history_dir = os.path.join(self.data_dir, 'history')
         os.makedirs(history_dir, exist_ok=True)
         
         history_file = os.path.join(history_dir, f'picks_{date_str}.json')
-        with open(history_file, 'w', encoding='utf-8') as f:
-            json.dump(dashboard_data, f, indent=2, ensure_ascii=False)
+        self.manifest.write_json(dashboard_data, history_file, stage=stage, ensure_ascii=False)
             
         print(f"Generated Final Report for {len(top_picks)} stocks")
 
 if __name__ == "__main__":
-    FinalReportGenerator().run()
+    import argparse
+    parser = argparse.ArgumentParser(description='Final top picks report')
+    parser.add_argument('--force', action='store_true', help='Rebuild even if picks and summaries are unchanged')
+    args = parser.parse_args()
+    FinalReportGenerator().run(force=args.force)
@@ -1,19 +1,109 @@
 import os
 import json
 import threading
+import time
 import pandas as pd
 import numpy as np
-import yfinance as yf
 import subprocess
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, make_response
 import traceback
 from datetime import datetime
+from market_data import get_provider
+from ticker_info import get_ticker_info_cache
+from market_calendar import TradingCalendar
+from artifacts import ArtifactManifest
+from price_store import MARKET_TZ, PriceStore
+from price_panel import PricePanel
 
 app = Flask(__name__)
 
 # Data Directory Configuration
 DATA_DIR = os.getenv('DATA_DIR', '.')
 
+# Market data source (MARKET_DATA_PROVIDER=yfinance|synthetic)
+provider = get_provider()
+
+# Provider info dicts shared with the pipeline (per-field-group TTLs, see ticker_info.py)
+info_cache = get_ticker_info_cache()
+
+# NYSE calendar decides how long fetched market data can be reused
+market_calendar = TradingCalendar()
+
+# Daily bars of the universe and reference ETFs collected by the pipeline
+price_store = PriceStore(os.path.join(DATA_DIR, 'price_store'))
+
+# Memory-mapped copy of the stored bars; pages are shared by every worker process
+price_panel = PricePanel(os.path.join(DATA_DIR, 'price_panel'))
+
+# Content hashes of pipeline outputs, served as ETags
+artifacts = ArtifactManifest(DATA_DIR)
+
+# Cache TTLs (seconds) while the market is open; when closed, data is kept
+# until the next open (quotes are capped since crypto/FX/futures keep trading)
+QUOTE_TTL = 60
+QUOTE_CLOSED_MAX_TTL = 900
+REALTIME_TTL = 15
+BARS_TTL = 300
+
+# In-process market data cache: key -> (expires_at, value)
+_market_cache = {}
+_market_cache_lock = threading.Lock()
+
+def cached_market_data(key, fetch, open_ttl, closed_max=None):
+    """Serve provider responses from memory until the calendar says they may have changed"""
+    now = time.time()
+    with _market_cache_lock:
+        hit = _market_cache.get(key)
+        if hit and hit[0] > now:
+            return hit[1]
+    
+    value = fetch()
+    if value is not None and not getattr(value, 'empty', False):
+        ttl = market_calendar.cache_ttl(open_ttl, closed_max)
+        with _market_cache_lock:
+            if len(_market_cache) > 4096:
+                for k in [k for k, (expires, _) in _market_cache.items() if expires <= now]:
+                    del _market_cache[k]
+            _market_cache[key] = (now + ttl, value)
+    return value
+
+def cached_history(ticker, period):
+    """Daily bars for a ticker (short periods are live quotes, longer ones charts)"""
+    if period in ('1d', '5d'):
+        open_ttl, closed_max = QUOTE_TTL, QUOTE_CLOSED_MAX_TTL
+    else:
+        open_ttl, closed_max = BARS_TTL, None
+    
+    def fetch():
+        # Outside the session the store's completed bars are what the provider
+        # would return; stored tickers (and reference ETFs) are not refetched
+        if not market_calendar.is_open():
+            stored = price_panel.histories(price_store, [ticker], period).get(ticker)
+            if stored is not None:
+                return stored.tz_localize(MARKET_TZ)
+        return provider.history(ticker, period=period)
+    return cached_market_data(('history', ticker, period), fetch, open_ttl, closed_max)
+
+def artifact_response(names, build, extra=''):
+    """
+    Conditional response for endpoints built only from pipeline artifacts:
+    the ETag is the artifacts' content hash, so clients revalidate with 304
+    until a stage actually changes one of the files
+    """
+    etag = artifacts.etag(*[os.path.join(DATA_DIR, n) for n in names], extra=extra)
+    if etag and request.if_none_match.contains(etag):
+        response = make_response('', 304)
+        response.set_etag(etag)
+        return response
+    response = make_response(build())
+    if etag and response.status_code == 200:
+        response.set_etag(etag)
+    return response
+
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
 # Sector mapping for major US stocks (S&P 500 + popular stocks)
 SECTOR_MAP = {
     # Technology
@@ -84,48 +174,23 @@ SECTOR_MAP = {
     'EPAM': 'Tech', 'ALGN': 'Health',
 }
 
-# Persistent sector cache file
-SECTOR_CACHE_FILE = os.path.join(DATA_DIR, 'sector_cache.json')
-
-def _load_sector_cache() -> dict:
-    """Load sector cache from file"""
-    try:
-        if os.path.exists(SECTOR_CACHE_FILE):
-            with open(SECTOR_CACHE_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-    except:
-        pass
-    return {}
-
-def _save_sector_cache(cache: dict):
-    """Save sector cache to file"""
-    try:
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(SECTOR_CACHE_FILE) or '.', exist_ok=True)
-        with open(SECTOR_CACHE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(cache, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"Error saving sector cache: {e}")
-
-# Load cache at startup
-_sector_cache = _load_sector_cache()
+# Sectors resolved by this worker; the shared ticker info cache (ticker_info.db)
+# persists them across workers and restarts
+_sector_cache = {}
 
 def get_sector(ticker: str) -> str:
-    """Get sector for a ticker, auto-fetch from yfinance if not in SECTOR_MAP"""
-    global _sector_cache
-    
+    """Get sector for a ticker, from the shared info cache if not in SECTOR_MAP"""
     # Check static map first
     if ticker in SECTOR_MAP:
         return SECTOR_MAP[ticker]
     
-    # Check persistent cache
+    # Check this worker's cache
     if ticker in _sector_cache:
         return _sector_cache[ticker]
     
-    # Fetch from yfinance and save to file
+    # Profile fields (months-long TTL) from the shared info cache
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
+        info = info_cache.info(ticker, ['profile'])
         sector = info.get('sector', '')
         
         # Map sector to short code
@@ -151,16 +216,12 @@ def get_sector(ticker: str) -> str:
         
         short_sector = sector_short_map.get(sector, sector[:5] if sector else '-')
         
-        # Save to cache and persist to file
         _sector_cache[ticker] = short_sector
-        _save_sector_cache(_sector_cache)
-        print(f"✅ Cached sector for {ticker}: {short_sector}")
         
         return short_sector
     except Exception as e:
         print(f"Error fetching sector for {ticker}: {e}")
         _sector_cache[ticker] = '-'
-        _save_sector_cache(_sector_cache)
         return '-'
 
 
@@ -210,8 +271,7 @@ def get_us_portfolio_data():
         # Fetch each ticker individually with error handling
         for ticker, name in indices_map.items():
             try:
-                stock = yf.Ticker(ticker)
-                hist = stock.history(period='5d')
+                hist = cached_history(ticker, '5d')
                 
                 if not hist.empty and len(hist) >= 2:
                     current_val = float(hist['Close'].iloc[-1])
@@ -267,8 +327,7 @@ def get_us_smart_money():
             # Fetch prices individually for better reliability
             for ticker in tickers:
                 try:
-                    stock = yf.Ticker(ticker)
-                    hist = stock.history(period='5d')
+                    hist = cached_history(ticker, '5d')
                     if not hist.empty:
                         current_prices[ticker] = round(float(hist['Close'].dropna().iloc[-1]), 2)
                 except Exception as e:
@@ -327,7 +386,9 @@ def get_us_smart_money():
         
         try:
             import math
-            price_data = yf.download(tickers, period='1d', progress=False)
+            price_data = cached_market_data(('download', tuple(tickers), '1d'),
+                                            lambda: provider.download(tickers, period='1d'),
+                                            QUOTE_TTL, QUOTE_CLOSED_MAX_TTL)
             if not price_data.empty:
                 closes = price_data['Close']
                 for ticker in tickers:
@@ -381,6 +442,41 @@ def get_us_smart_money():
         print(f"Error getting smart money picks: {e}")
         return jsonify({'error': str(e)}), 500
 
+def build_etf_flows(csv_path):
+    """ETF flow payload (sentiment, sector flows, top in/outflows, AI analysis)"""
+    df = pd.read_csv(csv_path)
+    
+    # Calculate market sentiment
+    broad_market = df[df['category'] == 'Broad Market']
+    broad_score = round(broad_market['flow_score'].mean(), 1) if not broad_market.empty else 50
+    
+    # Sector summary
+    sector_flows = df[df['category'] == 'Sector'].to_dict(orient='records')
+    
+    # Top inflows and outflows
+    top_inflows = df.nlargest(5, 'flow_score').to_dict(orient='records')
+    top_outflows = df.nsmallest(5, 'flow_score').to_dict(orient='records')
+    
+    # Load AI analysis
+    ai_analysis_text = ""
+    ai_path = os.path.join(DATA_DIR, 'etf_flow_analysis.json')
+    if os.path.exists(ai_path):
+        try:
+            with open(ai_path, 'r', encoding='utf-8') as f:
+                ai_data = json.load(f)
+                ai_analysis_text = ai_data.get('ai_analysis', '')
+        except Exception as e:
+            print(f"Error loading ETF AI analysis: {e}")
+
+    return jsonify({
+        'market_sentiment_score': broad_score,
+        'sector_flows': sector_flows,
+        'top_inflows': top_inflows,
+        'top_outflows': top_outflows,
+        'all_etfs': df.to_dict(orient='records'),
+        'ai_analysis': ai_analysis_text
+    })
+
 @app.route('/api/us/etf-flows')
 def get_us_etf_flows():
     """Get ETF Fund Flow Analysis"""
@@ -390,38 +486,7 @@ def get_us_etf_flows():
         if not os.path.exists(csv_path):
             return jsonify({'error': 'ETF flows not found. Run analyze_etf_flows.py first.'}), 404
         
-        df = pd.read_csv(csv_path)
-        
-        # Calculate market sentiment
-        broad_market = df[df['category'] == 'Broad Market']
-        broad_score = round(broad_market['flow_score'].mean(), 1) if not broad_market.empty else 50
-        
-        # Sector summary
-        sector_flows = df[df['category'] == 'Sector'].to_dict(orient='records')
-        
-        # Top inflows and outflows
-        top_inflows = df.nlargest(5, 'flow_score').to_dict(orient='records')
-        top_outflows = df.nsmallest(5, 'flow_score').to_dict(orient='records')
-        
-        # Load AI analysis
-        ai_analysis_text = ""
-        ai_path = os.path.join(DATA_DIR, 'etf_flow_analysis.json')
-        if os.path.exists(ai_path):
-            try:
-                with open(ai_path, 'r', encoding='utf-8') as f:
-                    ai_data = json.load(f)
-                    ai_analysis_text = ai_data.get('ai_analysis', '')
-            except Exception as e:
-                print(f"Error loading ETF AI analysis: {e}")
-
-        return jsonify({
-            'market_sentiment_score': broad_score,
-            'sector_flows': sector_flows,
-            'top_inflows': top_inflows,
-            'top_outflows': top_outflows,
-            'all_etfs': df.to_dict(orient='records'),
-            'ai_analysis': ai_analysis_text
-        })
+        return artifact_response(['us_etf_flows.csv', 'etf_flow_analysis.json'], lambda: build_etf_flows(csv_path))
         
     except Exception as e:
         print(f"Error getting ETF flows: {e}")
@@ -437,8 +502,7 @@ def get_us_stock_chart(ticker):
         if period not in valid_periods:
             period = '1y'
         
-        stock = yf.Ticker(ticker)
-        hist = stock.history(period=period)
+        hist = cached_history(ticker, period)
         
         if hist.empty:
             return jsonify({'error': f'No data found for {ticker}'}), 404
@@ -508,8 +572,7 @@ def get_us_history_by_date(date):
         
         for ticker in tickers:
             try:
-                stock = yf.Ticker(ticker)
-                hist = stock.history(period='5d')
+                hist = cached_history(ticker, '5d')
                 if not hist.empty:
                     current_prices[ticker] = round(float(hist['Close'].dropna().iloc[-1]), 2)
             except Exception as e:
@@ -606,8 +669,7 @@ def get_us_macro_analysis():
             import time as t
             for name, ticker in live_tickers.items():
                 try:
-                    stock = yf.Ticker(ticker)
-                    hist = stock.history(period='5d')
+                    hist = cached_history(ticker, '5d')
                     
                     if not hist.empty and len(hist) >= 2:
                         current = float(hist['Close'].iloc[-1])
@@ -645,10 +707,7 @@ def get_us_sector_heatmap():
         if not os.path.exists(heatmap_path):
             return jsonify({'series': []})
         
-        with open(heatmap_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        return jsonify(data)
+        return artifact_response(['sector_heatmap.json'], lambda: jsonify(load_json(heatmap_path)))
         
     except Exception as e:
         print(f"Error getting sector heatmap: {e}")
@@ -663,10 +722,7 @@ def get_us_options_flow():
         if not os.path.exists(flow_path):
             return jsonify({'error': 'Options flow data not found.'}), 404
         
-        with open(flow_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        return jsonify(data)
+        return artifact_response(['options_flow.json'], lambda: jsonify(load_json(flow_path)))
         
     except Exception as e:
         print(f"Error getting options flow: {e}")
@@ -682,26 +738,28 @@ def get_us_ai_summary(ticker):
         if not os.path.exists(summary_path):
              return jsonify({'error': 'AI summaries not found.'}), 404
         
-        with open(summary_path, 'r', encoding='utf-8') as f:
-            summaries = json.load(f)
-        
-        if ticker not in summaries:
-            return jsonify({'error': f'Summary not found for {ticker}'}), 404
-        
-        summary_data = summaries[ticker]
-        
-        if lang == 'en':
-            summary = summary_data.get('summary_en', summary_data.get('summary', ''))
-        else:
-            summary = summary_data.get('summary_ko', summary_data.get('summary', ''))
+        def build():
+            summaries = load_json(summary_path)
+            
+            if ticker not in summaries:
+                return jsonify({'error': f'Summary not found for {ticker}'}), 404
+            
+            summary_data = summaries[ticker]
+            
+            if lang == 'en':
+                summary = summary_data.get('summary_en', summary_data.get('summary', ''))
+            else:
+                summary = summary_data.get('summary_ko', summary_data.get('summary', ''))
+            
+            return jsonify({
+                'ticker': ticker,
+                'summary': summary,
+                'lang': lang,
+                'news_count': summary_data.get('news_count', 0),
+                'updated': summary_data.get('updated', '')
+            })
         
-        return jsonify({
-            'ticker': ticker,
-            'summary': summary,
-            'lang': lang,
-            'news_count': summary_data.get('news_count', 0),
-            'updated': summary_data.get('updated', '')
-        })
+        return artifact_response(['ai_summaries.json'], build, extra=f'{ticker}|{lang}')
         
     except Exception as e:
         print(f"Error getting AI summary for {ticker}: {e}")
@@ -725,7 +783,9 @@ def get_realtime_prices():
             
         print(f"DEBUG: Requesting {len(yf_tickers)} tickers from yfinance...")
         
-        df = yf.download(yf_tickers, period='1d', interval='1m', progress=False, threads=True)
+        df = cached_market_data(('download', tuple(yf_tickers), '1m'),
+                                lambda: provider.download(yf_tickers, period='1d', interval='1m'),
+                                REALTIME_TTL, QUOTE_CLOSED_MAX_TTL)
         
         prices = {}
         if not df.empty:
@@ -778,6 +838,14 @@ def get_realtime_prices():
         print(f"Error fetching realtime prices: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/us/market-status')
+def get_us_market_status():
+    """NYSE session status (open/closed, last completed session, next open/close)"""
+    try:
+        return jsonify(market_calendar.status())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/us/calendar')
 def get_us_calendar():
     """Get Weekly Economic Calendar"""
@@ -800,8 +868,7 @@ def get_technical_indicators(ticker):
         from ta.volatility import BollingerBands
         
         period = request.args.get('period', '1y')
-        stock = yf.Ticker(ticker)
-        hist = stock.history(period=period)
+        hist = cached_history(ticker, period)
         
         if hist.empty:
             return jsonify({'error': f'No data found for {ticker}'}), 404
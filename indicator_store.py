@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Volume Indicator History Store
+Per-ticker, per-day supply/demand indicators and scores written by
+`analyze_volume.py --history`, in the same year-partitioned Parquet layout
+as the price store:
+
+    volume_history/
+        _meta.json                      per-ticker first/last date, row count, rev
+        year=2024/part-00000.parquet    rows sorted by (ticker, date)
+        year=2024/seg-<timestamp>.parquet  daily appends (merged by compact())
+
+Every row is point-in-time: it holds exactly what the analyzer would have
+reported for that ticker had it run on that date (rows start once a ticker
+has 30 bars), so backtests read history instead of recomputing it.
+"""
+
+import os
+import logging
+import pandas as pd
+from typing import Iterable, List, Optional
+from price_store import PriceStore, DateLike
+
+# Logging Configuration
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+HISTORY_COLUMNS = [
+    'ticker', 'date', 'obv', 'ad_line', 'mfi', 'volume_sma_20',
+    'obv_change_20d', 'ad_change_20d', 'vol_ratio_5d_20d',
+    'surge_count_5d', 'surge_count_20d', 'supply_demand_score', 'supply_demand_stage'
+]
+HISTORY_DTYPES = {
+    'obv': 'int64',
+    'ad_line': 'float64',
+    'mfi': 'float64',
+    'volume_sma_20': 'float64',
+    'obv_change_20d': 'float64',
+    'ad_change_20d': 'float64',
+    'vol_ratio_5d_20d': 'float64',
+    'surge_count_5d': 'int8',
+    'surge_count_20d': 'int8',
+    'supply_demand_score': 'float32',
+    'supply_demand_stage': 'string',
+}
+
+
+class IndicatorStore(PriceStore):
+    """Year-partitioned store of daily volume indicators (read/append/replace API of PriceStore)"""
+
+    COLUMNS = HISTORY_COLUMNS
+    DTYPES = HISTORY_DTYPES
+
+    def snapshot(self, as_of: DateLike, tickers: Optional[Iterable[str]] = None,
+                 columns: Optional[List[str]] = None, lookback_days: int = 14) -> pd.DataFrame:
+        """
+        Latest row per ticker on or before as_of (what the analyzer reported
+        that day). Tickers without a row in the lookback_days before as_of
+        are left out.
+        """
+        as_of = pd.Timestamp(as_of).normalize()
+        df = self.read(tickers=tickers, start=as_of - pd.Timedelta(days=lookback_days), end=as_of, columns=columns)
+        if df.empty:
+            return df
+        return df.groupby('ticker', observed=True, sort=True).tail(1).reset_index(drop=True)
+
+
+def main():
+    """Main execution"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Volume indicator history')
+    parser.add_argument('--dir', default=os.getenv('DATA_DIR', '.'), help='Data directory')
+    parser.add_argument('--date', default=None, help='Point-in-time snapshot date (default: latest)')
+    parser.add_argument('--tickers', nargs='+', help='Only these tickers')
+    parser.add_argument('--compact', action='store_true', help='Merge daily segments into part files')
+    args = parser.parse_args()
+
+    store = IndicatorStore(os.path.join(args.dir, 'volume_history'))
+    if not store.exists():
+        print(f"❌ No indicator history at {store.root} (run: python analyze_volume.py --history)")
+        return
+    if args.compact:
+        store.compact()
+
+    stats = store.ticker_stats()
+    as_of = args.date or max(m['last'] for m in stats.values())
+    snap = store.snapshot(as_of, tickers=args.tickers)
+    print(f"📚 {store.root}: {store.total_rows()} rows, {len(stats)} tickers, {store.segment_count()} segments")
+    print(f"\n🔥 Top 10 Accumulation Stocks as of {pd.Timestamp(as_of).date()}:")
+    for _, row in snap.nlargest(10, 'supply_demand_score').iterrows():
+        print(f"   {row['ticker']}: Score {row['supply_demand_score']:.0f} - {row['supply_demand_stage']}")
+
+
+if __name__ == "__main__":
+    main()
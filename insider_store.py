@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Insider Transaction Store
+Every insider trade the provider has reported for the tracked tickers, in
+the year-partitioned Parquet layout of the price store:
+
+    insider_transactions/
+        _meta.json                      per-ticker first/last date, row count, rev,
+                                        and when each ticker was last fetched
+        year=2024/part-00000.parquet    rows sorted by (ticker, date, insider, shares, kind)
+
+A trade is identified by (ticker, date, insider, shares, kind); the kind
+keeps same-day filings of equal size apart (an option exercise and the
+sale of the exercised shares are one Form 4, two rows). Providers return
+each ticker's full recent list on every call, so upsert() keeps only the
+keys not stored yet and rewrites just the partitions of tickers that gained
+rows. The 13F analyzer and the insider tracker both fetch through here and
+answer their questions with vectorized queries over the whole universe.
+"""
+
+import os
+import logging
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from price_store import PriceStore, DateLike
+
+# Logging Configuration
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# A ticker's transactions are refetched once its last fetch is this old
+REFRESH_HOURS = float(os.getenv('INSIDER_REFRESH_HOURS', '24'))
+
+INSIDER_COLUMNS = [
+    'ticker', 'date', 'insider', 'shares', 'position', 'kind', 'value', 'ownership', 'text'
+]
+INSIDER_DTYPES = {
+    'insider': 'string',
+    'shares': 'int64',
+    'position': 'string',
+    'kind': 'string',       # buy / sale / other
+    'value': 'float64',
+    'ownership': 'string',
+    'text': 'string',
+}
+
+
+def normalize_transactions(ticker: str, raw: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Provider insider_transactions frame -> store rows. The trade date is the
+    'Start Date' column (yfinance) or the index; the kind comes from
+    'Transaction' and, where that is blank, from the filing text.
+    """
+    if raw is None or raw.empty:
+        return pd.DataFrame(columns=INSIDER_COLUMNS)
+
+    def column(name: str, default='') -> pd.Series:
+        if name in raw.columns:
+            return raw[name].reset_index(drop=True)
+        return pd.Series(default, index=range(len(raw)))
+
+    dates = column('Start Date') if 'Start Date' in raw.columns else pd.Series(raw.index)
+    transaction = column('Transaction').fillna('').astype(str).str.strip().str.lower()
+    text = column('Text').fillna('').astype(str)
+    source = transaction.where(transaction != '', text.str.lower())
+
+    df = pd.DataFrame({
+        'ticker': ticker,
+        'date': pd.to_datetime(dates, errors='coerce'),
+        'insider': column('Insider').fillna('N/A').astype(str),
+        'shares': pd.to_numeric(column('Shares', 0), errors='coerce').fillna(0).astype('int64'),
+        'position': column('Position').fillna('').astype(str),
+        'kind': np.select([source.str.contains('purchase|buy'), source.str.contains('sale|sell')],
+                          ['buy', 'sale'], 'other'),
+        'value': pd.to_numeric(column('Value', np.nan), errors='coerce'),
+        'ownership': column('Ownership').fillna('').astype(str),
+        'text': text,
+    })
+    return df.dropna(subset=['date'])
+
+
+class InsiderStore(PriceStore):
+    """Deduplicated, incrementally upserted insider transactions (read API of PriceStore)"""
+
+    COLUMNS = INSIDER_COLUMNS
+    DTYPES = INSIDER_DTYPES
+    KEY = ['ticker', 'date', 'insider', 'shares', 'kind']
+
+    # ------------------------------------------------------------------
+    # Fetch bookkeeping
+    # ------------------------------------------------------------------
+    def fetched_at(self) -> Dict[str, pd.Timestamp]:
+        """When each ticker's transactions were last fetched (including fetches that found none)"""
+        return {t: pd.Timestamp(ts) for t, ts in self._load_meta().get('fetched', {}).items()}
+
+    def stale(self, tickers: Iterable[str], max_age_hours: float = REFRESH_HOURS,
+              now: Optional[datetime] = None) -> List[str]:
+        """Tickers never fetched or last fetched more than max_age_hours ago"""
+        now = pd.Timestamp(now or datetime.now())
+        fetched = self.fetched_at()
+        max_age = timedelta(hours=max_age_hours)
+        return [t for t in tickers if t not in fetched or now - fetched[t] > max_age]
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def upsert(self, df: pd.DataFrame, fetched: Optional[Iterable[str]] = None) -> int:
+        """
+        Insert the transactions in df whose key is not stored yet and record
+        the fetched tickers (default: those in df); returns rows added.
+        """
+        fetched = list(fetched if fetched is not None else df['ticker'].unique())
+        df = self._prepare(df) if not df.empty else df
+        added = 0
+        if not df.empty:
+            stored = self.read(tickers=df['ticker'].unique(), columns=self.KEY)
+            new = df.merge(stored[self.KEY], on=self.KEY, how='left', indicator=True)
+            new = new[new['_merge'] == 'left_only'].drop(columns='_merge')
+            added = len(new)
+            if added:
+                # Whole history of the touched tickers, so their partitions are rewritten once
+                touched = sorted(new['ticker'].unique())
+                self.replace_tickers(pd.concat([self.read(tickers=touched), new], ignore_index=True))
+
+        meta = self._load_meta()
+        now = datetime.now().isoformat()
+        meta.setdefault('fetched', {}).update({t: now for t in fetched})
+        self._save_meta(meta)
+        logger.info(f"🧾 Insider store: {added} new transactions from {len(fetched)} tickers")
+        return added
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def transactions(self, tickers: Optional[Iterable[str]] = None, days: Optional[int] = None,
+                     kind: Optional[str] = None, min_value: Optional[float] = None,
+                     as_of: Optional[DateLike] = None) -> pd.DataFrame:
+        """
+        Stored transactions, newest first within each ticker
+        - days: only trades in the last N days before as_of (default: today)
+        - kind: 'buy', 'sale' or 'other'
+        - min_value: only trades whose value exceeds this
+        """
+        start = None
+        if days is not None:
+            start = pd.Timestamp(as_of or datetime.now()).normalize() - pd.Timedelta(days=days)
+        df = self.read(tickers=tickers, start=start, end=as_of)
+        if df.empty:
+            return df
+        mask = np.ones(len(df), dtype=bool)
+        if kind is not None:
+            mask &= (df['kind'] == kind).to_numpy(dtype=bool, na_value=False)
+        if min_value is not None:
+            mask &= (df['value'] > min_value).to_numpy(dtype=bool, na_value=False)
+        df = df[mask]
+        return df.sort_values(['ticker', 'date'], ascending=[True, False], kind='mergesort').reset_index(drop=True)
+
+    def buys(self, min_value: float = 100_000, days: int = 180,
+             tickers: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Purchases above min_value in the last days (e.g. the universe's $100k+ buys over 6 months)"""
+        return self.transactions(tickers, days=days, kind='buy', min_value=min_value)
+
+    def activity(self, tickers: Iterable[str], last: int = 10) -> pd.DataFrame:
+        """
+        Buy and sale counts among each ticker's latest `last` transactions and
+        the resulting sentiment (Buying / Selling / Neutral; Unknown when
+        nothing is stored), indexed by ticker
+        """
+        tickers = list(tickers)
+        recent = self.transactions(tickers)
+        if not recent.empty:
+            recent = recent.groupby('ticker', observed=True, sort=False).head(last)
+        counts = pd.DataFrame({
+            'insider_buys': (recent['kind'] == 'buy').groupby(recent['ticker']).sum(),
+            'insider_sells': (recent['kind'] == 'sale').groupby(recent['ticker']).sum(),
+        }).reindex(tickers)
+        known = counts['insider_buys'].notna()
+        counts = counts.fillna(0).astype(int)
+        counts['insider_sentiment'] = np.select(
+            [~known, counts['insider_buys'] > counts['insider_sells'], counts['insider_sells'] > counts['insider_buys']],
+            ['Unknown', 'Buying', 'Selling'], 'Neutral')
+        return counts
+
+
+def main():
+    """Main execution"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Insider transaction store')
+    parser.add_argument('--dir', default=os.getenv('DATA_DIR', '.'), help='Data directory')
+    parser.add_argument('--tickers', nargs='+', help='Only these tickers')
+    parser.add_argument('--min-value', type=float, default=100_000, help='Minimum purchase value')
+    parser.add_argument('--days', type=int, default=180, help='Lookback in days')
+    args = parser.parse_args()
+
+    store = InsiderStore(os.path.join(args.dir, 'insider_transactions'))
+    if not store.exists():
+        print(f"❌ No insider transactions at {store.root} (run: python insider_tracker.py)")
+        return
+
+    buys = store.buys(args.min_value, args.days, args.tickers)
+    print(f"🧾 {store.root}: {store.total_rows()} transactions, {len(store.tickers())} tickers")
+    print(f"\n💰 Purchases over ${args.min_value:,.0f} in the last {args.days} days: {len(buys)}")
+    for _, row in buys.sort_values('value', ascending=False).head(20).iterrows():
+        print(f"   {row['ticker']:<6} {row['date'].date()}  {row['insider']:<30} ${row['value']:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
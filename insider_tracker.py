@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 import os, json, logging
 import pandas as pd
-import yfinance as yf
+from market_data import get_provider
+from artifacts import ArtifactManifest
+from fetch_engine import default_engine
+from insider_store import InsiderStore, normalize_transactions
 from datetime import datetime
 
 logging.basicConfig(level=logging.INFO)
@@ -10,42 +13,51 @@ logger = logging.getLogger(__name__)
 class InsiderTracker:
     def __init__(self, data_dir: str = '.'):
         self.output_file = os.path.join(data_dir, 'insider_moves.json')
-        
+        self.manifest = ArtifactManifest(data_dir)
+        self.provider = get_provider()
+        # Shared with analyze_13f.py; tickers fetched there within INSIDER_REFRESH_HOURS are not refetched
+        self.store = InsiderStore(os.path.join(data_dir, 'insider_transactions'))
+
+    def refresh(self, tickers):
+        """Fetch transactions of tickers not fetched recently and upsert them into the store"""
+        stale = self.store.stale(tickers)
+        if not stale: return
+        engine = default_engine(rate_limited=self.provider.rate_limited)
+        frames = engine.map(lambda t: normalize_transactions(t, self.provider.insider_transactions(t)),
+                            stale, desc="Fetching insider transactions")
+        fetched = [t for t, f in zip(stale, frames) if f is not None]
+        frames = [f for f in frames if f is not None and not f.empty]
+        self.store.upsert(pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['ticker']),
+                          fetched=fetched)
+
+    @staticmethod
+    def _records(df: pd.DataFrame):
+        return [{
+            'date': str(row.date.date()),
+            'insider': row.insider,
+            'value': float(0 if pd.isna(row.value) else row.value),
+            'shares': int(row.shares)
+        } for row in df.itertuples()]
+
     def get_insider_activity(self, ticker: str):
-        try:
-            stock = yf.Ticker(ticker)
-            df = stock.insider_transactions
-            if df is None or df.empty: return []
-            
-            # Filter buys in last 6 months
-            cutoff = pd.Timestamp.now() - pd.Timedelta(days=180)
-            df = df.sort_index(ascending=False)
-            
-            recent_buys = []
-            for date, row in df.iterrows():
-                if date < cutoff: continue
-                text = str(row.get('Text', '')).lower()
-                if 'purchase' not in text and 'buy' not in text: continue
-                
-                recent_buys.append({
-                    'date': str(date.date()),
-                    'insider': row.get('Insider', 'N/A'),
-                    'value': float(row.get('Value', 0) or 0),
-                    'shares': int(row.get('Shares', 0) or 0)
-                })
-            return recent_buys
-        except: return []
+        # Buys in last 6 months, newest first
+        self.refresh([ticker])
+        return self._records(self.store.transactions([ticker], days=180, kind='buy'))
 
     def analyze_tickers(self, tickers):
+        self.refresh(tickers)
+        buys = self.store.transactions(tickers, days=180, kind='buy')
+
         results = {}
-        for t in tickers:
-            activities = self.get_insider_activity(t)
-            if activities:
-                score = sum(10 for a in activities if a['value'] > 100000)
-                results[t] = {'score': score, 'transactions': activities[:5]}
-        
-        with open(self.output_file, 'w') as f:
-            json.dump({'details': results}, f, indent=2)
+        if not buys.empty:
+            scores = (buys['value'] > 100000).groupby(buys['ticker'], observed=True).sum() * 10
+            top = buys.groupby('ticker', observed=True, sort=False).head(5)
+            for t, g in top.groupby('ticker', observed=True, sort=False):
+                results[t] = {'score': int(scores[t]), 'transactions': self._records(g)}
+        results = {t: results[t] for t in tickers if t in results}
+
+        self.manifest.write_json({'details': results}, self.output_file, stage='insider_tracker',
+                                 inputs=[self.store.meta_file])
         logger.info("Saved insider_moves.json")
 
 if __name__ == "__main__":
@@ -9,11 +9,14 @@ Macro Market Analyzer
 import os
 import json
 import requests
-import yfinance as yf
 import logging
 from datetime import datetime
 from typing import Dict, List, Optional
 from dotenv import load_dotenv
+from market_data import get_provider
+from price_store import PriceStore
+from price_panel import PricePanel
+from artifacts import ArtifactManifest
 
 # Load .env
 load_dotenv()
@@ -26,7 +29,11 @@ logger = logging.getLogger(__name__)
 class MacroDataCollector:
     """Collect macro market data from various sources"""
     
-    def __init__(self):
+    def __init__(self, data_dir='.'):
+        self.provider = get_provider()
+        # SPY/QQQ are read from the shared price store; indices, futures and crypto are downloaded
+        self.store = PriceStore(os.path.join(data_dir, 'price_store'))
+        self.panel = PricePanel(os.path.join(data_dir, 'price_panel'))
         self.macro_tickers = {
             'VIX': '^VIX', 'DXY': 'DX-Y.NYB',
             '2Y_Yield': '^IRX', '10Y_Yield': '^TNX',
@@ -38,13 +45,15 @@ class MacroDataCollector:
         logger.info("📊 Fetching macro data...")
         macro_data = {}
         try:
+            # One year of bars serves both the latest change and the 52w high (one batched request)
             tickers = list(self.macro_tickers.values())
-            data = yf.download(tickers, period='5d', progress=False)
+            histories = self.panel.histories(self.store, tickers, '1y', provider=self.provider)
             
             for name, ticker in self.macro_tickers.items():
                 try:
-                    if ticker not in data['Close'].columns: continue
-                    hist = data['Close'][ticker].dropna()
+                    if ticker not in histories: continue
+                    full_hist = histories[ticker]
+                    hist = full_hist['Close'].dropna()
                     if len(hist) < 2: continue
                     
                     val = hist.iloc[-1]
@@ -52,7 +61,6 @@ class MacroDataCollector:
                     change = ((val / prev) - 1) * 100
                     
                     # 52w High/Low
-                    full_hist = yf.Ticker(ticker).history(period='1y')
                     high = full_hist['High'].max() if not full_hist.empty else 0
                     pct_high = ((val / high) - 1) * 100 if high > 0 else 0
                     
@@ -203,9 +211,10 @@ Request: 1. Summary 2. Opportunity 3. Risks 4. Strategy."""
 class MultiModelAnalyzer:
     def __init__(self, data_dir='.'):
         self.data_dir = data_dir
-        self.collector = MacroDataCollector()
+        self.collector = MacroDataCollector(data_dir)
         self.gemini = MacroAIAnalyzer()
         self.gpt = GPTAnalyzer()
+        self.manifest = ArtifactManifest(data_dir)
     
     def run(self):
         data = self.collector.get_current_macro_data()
@@ -217,19 +226,17 @@ class MultiModelAnalyzer:
         gpt_en = self.gpt.analyze(data, news, patterns, 'en')
 
         # Save GPT immediately
-        with open(os.path.join(self.data_dir, 'macro_analysis_gpt.json'), 'w', encoding='utf-8') as f:
-            json.dump({
-                'timestamp': datetime.now().isoformat(),
-                'macro_indicators': data,
-                'ai_analysis': gpt_ko
-            }, f, indent=2, ensure_ascii=False)
+        self.manifest.write_json({
+            'timestamp': datetime.now().isoformat(),
+            'macro_indicators': data,
+            'ai_analysis': gpt_ko
+        }, os.path.join(self.data_dir, 'macro_analysis_gpt.json'), stage='macro_analyzer', inputs=[], ensure_ascii=False)
             
-        with open(os.path.join(self.data_dir, 'macro_analysis_gpt_en.json'), 'w', encoding='utf-8') as f:
-            json.dump({
-                'timestamp': datetime.now().isoformat(),
-                'macro_indicators': data,
-                'ai_analysis': gpt_en
-            }, f, indent=2)
+        self.manifest.write_json({
+            'timestamp': datetime.now().isoformat(),
+            'macro_indicators': data,
+            'ai_analysis': gpt_en
+        }, os.path.join(self.data_dir, 'macro_analysis_gpt_en.json'), stage='macro_analyzer', inputs=[])
             
         logger.info("Saved GPT analysis")
 
@@ -238,12 +245,11 @@ class MultiModelAnalyzer:
         # gemini_en = self.gemini.analyze(data, news, patterns, 'en') # Skip to save limits
         
         # Save Gemini (Default)
-        with open(os.path.join(self.data_dir, 'macro_analysis.json'), 'w', encoding='utf-8') as f:
-            json.dump({
-                'timestamp': datetime.now().isoformat(),
-                'macro_indicators': data,
-                'ai_analysis': gemini_ko
-            }, f, indent=2, ensure_ascii=False)
+        self.manifest.write_json({
+            'timestamp': datetime.now().isoformat(),
+            'macro_indicators': data,
+            'ai_analysis': gemini_ko
+        }, os.path.join(self.data_dir, 'macro_analysis.json'), stage='macro_analyzer', inputs=[], ensure_ascii=False)
 
         logger.info("Saved Gemini analysis")
 
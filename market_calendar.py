@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+NYSE Trading Calendar
+Sessions, holidays and early closes, used to decide whether a new completed
+daily bar can exist (price collector) and how long market data stays valid
+(Flask caches). Holiday rules follow NYSE practice; one-off closures are
+listed explicitly.
+"""
+
+import logging
+import pandas as pd
+from datetime import datetime, time, timedelta
+from typing import Optional
+from pandas.tseries.holiday import (
+    AbstractHolidayCalendar, GoodFriday, Holiday, USLaborDay, USMartinLutherKingJr,
+    USMemorialDay, USPresidentsDay, USThanksgivingDay, nearest_workday, sunday_to_monday
+)
+from pandas.tseries.offsets import CustomBusinessDay
+
+# Logging Configuration
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+MARKET_TZ = 'America/New_York'
+REGULAR_OPEN = time(9, 30)
+REGULAR_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+
+# Unscheduled full-day closures
+SPECIAL_CLOSURES = pd.to_datetime([
+    '2001-09-11', '2001-09-12', '2001-09-13', '2001-09-14',  # September 11
+    '2004-06-11',  # Reagan funeral
+    '2007-01-02',  # Ford funeral
+    '2012-10-29', '2012-10-30',  # Hurricane Sandy
+    '2018-12-05',  # G.H.W. Bush funeral
+    '2025-01-09',  # Carter funeral
+])
+
+
+class NYSEHolidayCalendar(AbstractHolidayCalendar):
+    """Scheduled NYSE holidays (New Year's Day is not moved back onto a Friday Dec 31)"""
+
+    rules = [
+        Holiday('New Years Day', month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday('Juneteenth', month=6, day=19, start_date='2022-01-01', observance=nearest_workday),
+        Holiday('Independence Day', month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday('Christmas', month=12, day=25, observance=nearest_workday),
+    ]
+
+
+class TradingCalendar:
+    """NYSE sessions with early closes; all public methods take/return exchange-local times"""
+
+    def __init__(self, settle_minutes: int = 20):
+        # Daily bars are treated as final this long after the close
+        self.settle = timedelta(minutes=settle_minutes)
+        self._holidays = NYSEHolidayCalendar().holidays(start='1990-01-01', end='2100-12-31')
+        self._holidays = self._holidays.union(SPECIAL_CLOSURES)
+        self._session_offset = CustomBusinessDay(holidays=self._holidays)
+
+    # ------------------------------------------------------------------
+    # Sessions
+    # ------------------------------------------------------------------
+    def now(self) -> pd.Timestamp:
+        return pd.Timestamp.now(tz=MARKET_TZ)
+
+    def _local(self, ts=None) -> pd.Timestamp:
+        """Exchange-local timestamp (naive input is taken as exchange-local)"""
+        if ts is None:
+            return self.now()
+        ts = pd.Timestamp(ts)
+        return ts.tz_localize(MARKET_TZ) if ts.tzinfo is None else ts.tz_convert(MARKET_TZ)
+
+    def holidays(self, start=None, end=None) -> pd.DatetimeIndex:
+        hol = self._holidays
+        if start is not None:
+            hol = hol[hol >= pd.Timestamp(start)]
+        if end is not None:
+            hol = hol[hol <= pd.Timestamp(end)]
+        return hol
+
+    def is_session(self, day) -> bool:
+        day = pd.Timestamp(day).normalize()
+        if day.tzinfo is not None:
+            day = day.tz_localize(None)
+        return day.weekday() < 5 and day not in self._holidays
+
+    def sessions(self, start, end) -> pd.DatetimeIndex:
+        """Session dates (naive, midnight) between start and end inclusive"""
+        return pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(),
+                             freq=self._session_offset)
+
+    def is_early_close(self, day) -> bool:
+        """Independence Day eve, day after Thanksgiving and Christmas Eve close at 13:00"""
+        day = pd.Timestamp(day).normalize()
+        if not self.is_session(day):
+            return False
+        if day.month == 7 and day.day == 3:
+            return True
+        if day.month == 12 and day.day == 24:
+            return True
+        # Day after Thanksgiving (fourth Thursday of November)
+        return day.month == 11 and day.weekday() == 4 and 23 <= day.day <= 29
+
+    def open_time(self, day) -> pd.Timestamp:
+        return pd.Timestamp.combine(pd.Timestamp(day).date(), REGULAR_OPEN).tz_localize(MARKET_TZ)
+
+    def close_time(self, day) -> pd.Timestamp:
+        close = EARLY_CLOSE if self.is_early_close(day) else REGULAR_CLOSE
+        return pd.Timestamp.combine(pd.Timestamp(day).date(), close).tz_localize(MARKET_TZ)
+
+    def previous_session(self, day, n: int = 1) -> pd.Timestamp:
+        """The n-th session before day"""
+        return (pd.Timestamp(day).normalize() - n * self._session_offset)
+
+    def next_session(self, day) -> pd.Timestamp:
+        return (pd.Timestamp(day).normalize() + self._session_offset)
+
+    # ------------------------------------------------------------------
+    # Freshness
+    # ------------------------------------------------------------------
+    def last_completed_session(self, now=None) -> pd.Timestamp:
+        """Latest session whose daily bar is final at `now` (naive session date)"""
+        now = self._local(now)
+        today = now.tz_localize(None).normalize()
+        if self.is_session(today) and now >= self.close_time(today) + self.settle:
+            return today
+        return self.previous_session(today)
+
+    def has_new_bar(self, last_date, now=None) -> bool:
+        """Whether a completed session newer than last_date exists"""
+        if last_date is None:
+            return True
+        return self.last_completed_session(now) > pd.Timestamp(last_date).normalize()
+
+    def is_open(self, now=None) -> bool:
+        now = self._local(now)
+        today = now.tz_localize(None).normalize()
+        return self.is_session(today) and self.open_time(today) <= now < self.close_time(today)
+
+    def next_open(self, now=None) -> pd.Timestamp:
+        now = self._local(now)
+        today = now.tz_localize(None).normalize()
+        if self.is_session(today) and now < self.open_time(today):
+            return self.open_time(today)
+        return self.open_time(self.next_session(today))
+
+    def next_close(self, now=None) -> pd.Timestamp:
+        now = self._local(now)
+        today = now.tz_localize(None).normalize()
+        if self.is_session(today) and now < self.close_time(today):
+            return self.close_time(today)
+        return self.close_time(self.next_session(today))
+
+    def cache_ttl(self, open_ttl: float, closed_max: Optional[float] = None, now=None) -> float:
+        """
+        Seconds market data stays valid: open_ttl during the session,
+        otherwise until the next open (capped at closed_max, e.g. for
+        instruments that also trade outside NYSE hours)
+        """
+        now = self._local(now)
+        if self.is_open(now):
+            return float(open_ttl)
+        ttl = max(float(open_ttl), (self.next_open(now) - now).total_seconds())
+        return min(ttl, closed_max) if closed_max is not None else ttl
+
+    def status(self, now=None) -> dict:
+        now = self._local(now)
+        return {
+            'now': now.isoformat(),
+            'is_open': self.is_open(now),
+            'is_early_close': self.is_early_close(now.tz_localize(None)),
+            'last_completed_session': self.last_completed_session(now).strftime('%Y-%m-%d'),
+            'next_open': self.next_open(now).isoformat(),
+            'next_close': self.next_close(now).isoformat(),
+        }
+
+
+def main():
+    """Main execution"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='NYSE trading calendar')
+    parser.add_argument('--year', type=int, default=datetime.now().year, help='List holidays and early closes for a year')
+    args = parser.parse_args()
+
+    cal = TradingCalendar()
+    for key, value in cal.status().items():
+        print(f"{key:<24} {value}")
+
+    print(f"\n📅 NYSE {args.year}")
+    for day in cal.holidays(f'{args.year}-01-01', f'{args.year}-12-31'):
+        print(f"   {day.date()} closed")
+    for day in cal.sessions(f'{args.year}-01-01', f'{args.year}-12-31'):
+        if cal.is_early_close(day):
+            print(f"   {day.date()} early close {EARLY_CLOSE.strftime('%H:%M')}")
+
+
+if __name__ == "__main__":
+    main()
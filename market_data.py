@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Market Data Providers
+Single seam between the analyzers and their data source. Every provider
+returns yfinance-shaped frames/dicts so callers do not care where data
+comes from.
+
+Providers (MARKET_DATA_PROVIDER):
+    yfinance   - Yahoo Finance through the record/replay cache (default)
+    synthetic  - deterministic correlated GBM universe of any size, no network
+
+Synthetic settings: SYNTHETIC_SEED, SYNTHETIC_START, SYNTHETIC_END (pin the
+last session for reproducible benchmarks)
+"""
+
+import os
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+from collections import namedtuple
+from datetime import timedelta
+from typing import Dict, Optional, Sequence, Tuple
+from fetch_engine import ThrottledError, is_throttled
+from market_calendar import TradingCalendar
+
+# Logging Configuration
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+MARKET_TZ = 'America/New_York'
+OHLCV = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+OptionChain = namedtuple('OptionChain', ['calls', 'puts', 'underlying'])
+
+PERIOD_DAYS = {
+    '1d': 1, '5d': 5, '1mo': 31, '3mo': 92, '6mo': 183,
+    '1y': 366, '2y': 731, '5y': 1827, '10y': 3653,
+}
+
+
+class MarketDataProvider:
+    """Interface implemented by every market data source"""
+
+    name = 'base'
+
+    @property
+    def rate_limited(self) -> bool:
+        """Whether requests reach a remote service that throttles (fetch engine rate limit)"""
+        return True
+
+    def history(self, ticker: str, period: Optional[str] = None, start=None, end=None,
+                interval: str = '1d') -> pd.DataFrame:
+        """Daily OHLCV bars indexed by a tz-aware 'Date' index (empty frame when unknown)"""
+        raise NotImplementedError
+
+    def download(self, tickers: Sequence[str], period: Optional[str] = None, start=None, end=None,
+                 interval: str = '1d', group_by: str = 'column', threads: bool = True) -> pd.DataFrame:
+        """
+        Multi-ticker OHLCV frame with (field, ticker) or (ticker, field) columns.
+        threads=False asks the provider not to parallelize internally (callers
+        running under the fetch engine already bound concurrency).
+        """
+        raise NotImplementedError
+
+    def info(self, ticker: str) -> Dict:
+        """Quote summary / fundamentals dict (yfinance `info` keys)"""
+        raise NotImplementedError
+
+    def options(self, ticker: str) -> Tuple[str, ...]:
+        """Listed option expirations (YYYY-MM-DD)"""
+        raise NotImplementedError
+
+    def option_chain(self, ticker: str, expiration: Optional[str] = None) -> OptionChain:
+        raise NotImplementedError
+
+    def insider_transactions(self, ticker: str) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def institutional_holders(self, ticker: str) -> pd.DataFrame:
+        raise NotImplementedError
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Yahoo Finance via yfinance (recorded/replayed by yf_cache, see YF_CACHE_MODE)"""
+
+    name = 'yfinance'
+
+    def __init__(self):
+        import yf_cache
+        self.yf = yf_cache
+
+    @property
+    def rate_limited(self):
+        return self.yf.cache_mode() != 'replay'
+
+    def history(self, ticker, period=None, start=None, end=None, interval='1d'):
+        kwargs = {'interval': interval}
+        if start is not None or end is not None:
+            kwargs.update(start=start, end=end)
+        else:
+            kwargs['period'] = period or '1mo'
+        return self.yf.Ticker(ticker).history(**kwargs)
+
+    def download(self, tickers, period=None, start=None, end=None, interval='1d', group_by='column',
+                 threads=True):
+        kwargs = {'interval': interval, 'group_by': group_by, 'auto_adjust': True, 'progress': False,
+                  'threads': threads}
+        if start is not None or end is not None:
+            kwargs.update(start=start, end=end)
+        else:
+            kwargs['period'] = period or '1mo'
+        data = self.yf.download(list(tickers), **kwargs)
+
+        # yf.download records per-symbol errors instead of raising them
+        errors = getattr(self.yf.shared, '_ERRORS', {}) or {}
+        throttled = [t for t in tickers if t in errors and is_throttled(Exception(errors[t]))]
+        if throttled:
+            raise ThrottledError(f"{len(throttled)} symbols rate limited")
+        return data
+
+    def info(self, ticker):
+        return self.yf.Ticker(ticker).info or {}
+
+    def options(self, ticker):
+        return tuple(self.yf.Ticker(ticker).options)
+
+    def option_chain(self, ticker, expiration=None):
+        chain = self.yf.Ticker(ticker).option_chain(expiration)
+        return OptionChain(chain.calls, chain.puts, chain.underlying)
+
+    def insider_transactions(self, ticker):
+        return self.yf.Ticker(ticker).insider_transactions
+
+    def institutional_holders(self, ticker):
+        return self.yf.Ticker(ticker).institutional_holders
+
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    Deterministic synthetic market for scale tests (no network).
+
+    Log returns follow a one-market + one-sector factor model
+        r = beta * market + loading * sector + idio_vol * eps
+    so tickers in the same sector are correlated. Each series depends only on
+    (seed, ticker), never on which other tickers were requested, and draws are
+    prefix-stable so extending SYNTHETIC_END never rewrites history.
+    """
+
+    name = 'synthetic'
+    rate_limited = False
+
+    SECTORS = [
+        'Technology', 'Healthcare', 'Financial Services', 'Consumer Cyclical',
+        'Communication Services', 'Industrials', 'Consumer Defensive', 'Energy',
+        'Utilities', 'Real Estate', 'Basic Materials',
+    ]
+    HOLDERS = [
+        'Vanguard Group Inc', 'Blackrock Inc.', 'State Street Corporation', 'FMR, LLC',
+        'Geode Capital Management, LLC', 'Morgan Stanley', 'JPMorgan Chase & Co',
+        'Price (T.Rowe) Associates Inc', 'Northern Trust Corporation', 'Bank of America Corporation',
+    ]
+
+    def __init__(self, seed: Optional[int] = None, start: Optional[str] = None, end: Optional[str] = None):
+        self.seed = int(seed if seed is not None else os.getenv('SYNTHETIC_SEED', '42'))
+        calendar = TradingCalendar()
+        start = start or os.getenv('SYNTHETIC_START', '2005-01-03')
+        end = end or os.getenv('SYNTHETIC_END') or calendar.last_completed_session()
+        self.sessions = calendar.sessions(start, end).rename('Date')
+        n = len(self.sessions)
+        self.market = np.random.default_rng([self.seed, 0]).standard_normal(n) * 0.011 + 0.0003
+        self.sector_factors = np.stack([
+            np.random.default_rng([self.seed, 1, k]).standard_normal(n) * 0.008
+            for k in range(len(self.SECTORS))
+        ])
+        self._bars: Dict[str, pd.DataFrame] = {}
+
+    # ------------------------------------------------------------------
+    # Per-ticker generation
+    # ------------------------------------------------------------------
+    def _ticker_seed(self, ticker: str) -> int:
+        return int(hashlib.sha256(f'{self.seed}:{ticker}'.encode('utf-8')).hexdigest()[:12], 16)
+
+    def _profile(self, ticker: str) -> Dict:
+        """Static per-ticker parameters (sector, beta, volatility, size, listing date)"""
+        rng = np.random.default_rng([self._ticker_seed(ticker), 0])
+        # Listing offset in sessions; independent of the calendar length so history stays prefix-stable
+        listed = 0 if rng.random() < 0.8 else int(rng.integers(0, 5000))
+        return {
+            'sector': int(rng.integers(0, len(self.SECTORS))),
+            'beta': rng.uniform(0.6, 1.6),
+            'loading': rng.uniform(0.3, 1.0),
+            'idio_vol': rng.uniform(0.008, 0.03),
+            'drift': rng.normal(0.0001, 0.00008),
+            'price0': float(np.exp(rng.normal(np.log(30), 0.6))),
+            'volume0': float(np.exp(rng.normal(np.log(2e6), 1.0))),
+            'shares': float(np.exp(rng.normal(np.log(3e8), 1.0))),
+            'listed': listed,
+        }
+
+    def _daily(self, ticker: str) -> pd.DataFrame:
+        """Full daily OHLCV history for one ticker (memoized)"""
+        if ticker in self._bars:
+            return self._bars[ticker]
+
+        p = self._profile(ticker)
+        n = len(self.sessions)
+        seed = self._ticker_seed(ticker)
+        # One generator per stream keeps every stream prefix-stable in n
+        eps, gap, wick_hi, wick_lo, vol_noise = (
+            np.random.default_rng([seed, 1, k]).standard_normal(n) for k in range(5)
+        )
+
+        r = p['drift'] + p['beta'] * self.market + p['loading'] * self.sector_factors[p['sector']] \
+            + p['idio_vol'] * eps
+        close = p['price0'] * np.exp(np.cumsum(r))
+        prev = np.concatenate([[p['price0']], close[:-1]])
+        open_ = prev * np.exp(gap * p['idio_vol'] * 0.3)
+        high = np.maximum(open_, close) * (1 + np.abs(wick_hi) * p['idio_vol'] * 0.5)
+        low = np.minimum(open_, close) * (1 - np.abs(wick_lo) * p['idio_vol'] * 0.5)
+        volume = p['volume0'] * np.exp(0.35 * vol_noise) * (1 + 25 * np.abs(r))
+
+        df = pd.DataFrame({
+            'Open': open_, 'High': high, 'Low': low, 'Close': close,
+            'Volume': volume.astype('int64'), 'Dividends': 0.0, 'Stock Splits': 0.0,
+        }, index=self.sessions.tz_localize(MARKET_TZ))
+        df = df.iloc[min(p['listed'], max(0, n - 60)):]
+        if len(self._bars) < 256:  # ~300 KB per 20-year ticker
+            self._bars[ticker] = df
+        return df
+
+    def _window(self, df: pd.DataFrame, period=None, start=None, end=None) -> pd.DataFrame:
+        if start is not None or end is not None:
+            if start is not None:
+                df = df[df.index >= pd.Timestamp(start).tz_localize(None).tz_localize(MARKET_TZ)]
+            if end is not None:
+                # yfinance treats end as exclusive
+                df = df[df.index < pd.Timestamp(end).tz_localize(None).tz_localize(MARKET_TZ)]
+            return df
+        period = period or '1mo'
+        if period == 'max' or df.empty:
+            return df
+        last = df.index[-1]
+        if period == 'ytd':
+            return df[df.index.year == last.year]
+        if period.endswith('d'):
+            return df.iloc[-int(period[:-1]):]
+        return df[df.index > last - timedelta(days=PERIOD_DAYS[period])]
+
+    # ------------------------------------------------------------------
+    # Provider API
+    # ------------------------------------------------------------------
+    def history(self, ticker, period=None, start=None, end=None, interval='1d'):
+        df = self._window(self._daily(ticker), period, start, end)
+        # Intraday intervals collapse to the latest daily bar
+        return df if interval.endswith(('d', 'wk', 'mo')) else df.iloc[-1:]
+
+    def download(self, tickers, period=None, start=None, end=None, interval='1d', group_by='column',
+                 threads=True):
+        frames = {t: self.history(t, period, start, end, interval)[OHLCV] for t in tickers}
+        frames = {t: f for t, f in frames.items() if not f.empty}
+        if not frames:
+            return pd.DataFrame()
+        data = pd.concat(frames, axis=1)
+        if group_by != 'ticker':
+            data = data.swaplevel(0, 1, axis=1).sort_index(axis=1)
+        return data
+
+    def info(self, ticker):
+        p = self._profile(ticker)
+        bars = self._daily(ticker)
+        rng = np.random.default_rng([self._ticker_seed(ticker), 2])
+        price = float(bars['Close'].iloc[-1])
+        year_ago = float(bars['Close'].iloc[max(0, len(bars) - 252)])
+        eps = price / rng.uniform(8, 60)
+        upside = rng.normal(0.08, 0.12)
+        recommendation = ('strong_buy' if upside > 0.25 else 'buy' if upside > 0.1
+                          else 'hold' if upside > -0.05 else 'sell')
+        float_shares = p['shares'] * rng.uniform(0.7, 0.98)
+        return {
+            'symbol': ticker,
+            'shortName': f'{ticker} Corp',
+            'longName': f'{ticker} Corporation',
+            'sector': self.SECTORS[p['sector']],
+            'industry': f"{self.SECTORS[p['sector']]} - General",
+            'currentPrice': round(price, 2),
+            'regularMarketPrice': round(price, 2),
+            'marketCap': int(price * p['shares']),
+            'sharesOutstanding': int(p['shares']),
+            'floatShares': int(float_shares),
+            'beta': round(p['beta'], 2),
+            'trailingPE': round(price / eps, 2),
+            'forwardPE': round(price / (eps * rng.uniform(0.9, 1.3)), 2),
+            'pegRatio': round(rng.uniform(0.5, 3.0), 2),
+            'priceToBook': round(rng.uniform(0.8, 12.0), 2),
+            'returnOnEquity': round(rng.normal(0.15, 0.12), 4),
+            'revenueGrowth': round(rng.normal(0.07, 0.12), 4),
+            'earningsGrowth': round(rng.normal(0.08, 0.25), 4),
+            'profitMargins': round(rng.normal(0.12, 0.08), 4),
+            'debtToEquity': round(rng.uniform(0, 250), 2),
+            'dividendYield': round(max(0.0, rng.normal(0.015, 0.015)), 4),
+            'heldPercentInstitutions': round(rng.uniform(0.3, 0.95), 4),
+            'heldPercentInsiders': round(rng.uniform(0.0, 0.15), 4),
+            'shortPercentOfFloat': round(rng.uniform(0.005, 0.15), 4),
+            'targetMeanPrice': round(price * (1 + upside), 2),
+            'recommendationKey': recommendation,
+            'numberOfAnalystOpinions': int(rng.integers(0, 45)),
+            'fiftyTwoWeekChange': round(price / year_ago - 1, 4),
+        }
+
+    def options(self, ticker):
+        last = self.sessions[-1]
+        first_friday = last + timedelta(days=(4 - last.weekday()) % 7 or 7)
+        return tuple((first_friday + timedelta(weeks=w)).strftime('%Y-%m-%d') for w in range(4))
+
+    def option_chain(self, ticker, expiration=None):
+        expiration = expiration or self.options(ticker)[0]
+        price = float(self._daily(ticker)['Close'].iloc[-1])
+        rng = np.random.default_rng([self._ticker_seed(ticker), 3, int(expiration.replace('-', ''))])
+        strikes = np.round(price * np.linspace(0.7, 1.3, 25), 2)
+        base_iv = self._profile(ticker)['idio_vol'] * np.sqrt(252) + 0.1
+
+        def side(kind: str) -> pd.DataFrame:
+            moneyness = (price - strikes) / price if kind == 'C' else (strikes - price) / price
+            intrinsic = np.maximum(moneyness * price, 0)
+            last_price = intrinsic + price * base_iv * 0.1 * np.exp(-np.abs(moneyness) * 5)
+            volume = np.floor(np.exp(rng.normal(6, 1.5, len(strikes))) * np.exp(-np.abs(moneyness) * 4))
+            return pd.DataFrame({
+                'contractSymbol': [f"{ticker}{expiration.replace('-', '')[2:]}{kind}{int(s * 1000):08d}" for s in strikes],
+                'strike': strikes,
+                'lastPrice': np.round(last_price, 2),
+                'bid': np.round(last_price * 0.97, 2),
+                'ask': np.round(last_price * 1.03, 2),
+                'volume': volume,
+                'openInterest': np.floor(volume * rng.uniform(2, 20, len(strikes))),
+                'impliedVolatility': np.round(base_iv * (1 + np.abs(moneyness)), 4),
+                'inTheMoney': moneyness > 0,
+                'contractSize': 'REGULAR',
+                'currency': 'USD',
+            })
+
+        return OptionChain(side('C'), side('P'), {'symbol': ticker, 'regularMarketPrice': price})
+
+    def insider_transactions(self, ticker):
+        rng = np.random.default_rng([self._ticker_seed(ticker), 4])
+        bars = self._daily(ticker)
+        n = int(rng.integers(0, 13))
+        if n == 0 or bars.empty:
+            return pd.DataFrame(columns=['Shares', 'Value', 'URL', 'Text', 'Insider', 'Position',
+                                         'Transaction', 'Start Date', 'Ownership'])
+        idx = np.sort(rng.integers(max(0, len(bars) - 252), len(bars), n))[::-1]
+        buys = rng.random(n) < 0.3
+        shares = rng.integers(500, 200_000, n)
+        prices = bars['Close'].to_numpy()[idx]
+        return pd.DataFrame({
+            'Shares': shares,
+            'Value': np.round(shares * prices, 0),
+            'URL': '',
+            'Text': [f"{'Purchase' if b else 'Sale'} at price {p:.2f} per share." for b, p in zip(buys, prices)],
+            'Insider': [f'INSIDER {ticker} {i % 5 + 1}' for i in range(n)],
+            'Position': rng.choice(['Director', 'Chief Executive Officer', 'Chief Financial Officer', 'Officer'], n),
+            'Transaction': np.where(buys, 'Buy', 'Sale'),
+            'Start Date': bars.index[idx].tz_localize(None),
+            'Ownership': 'D',
+        })
+
+    def institutional_holders(self, ticker):
+        rng = np.random.default_rng([self._ticker_seed(ticker), 5])
+        p = self._profile(ticker)
+        price = float(self._daily(ticker)['Close'].iloc[-1])
+        pct = np.sort(rng.uniform(0.005, 0.09, len(self.HOLDERS)))[::-1]
+        reported = (self.sessions[-1] - pd.offsets.QuarterEnd(1)).normalize()
+        return pd.DataFrame({
+            'Date Reported': reported,
+            'Holder': self.HOLDERS,
+            'pctHeld': np.round(pct, 4),
+            'Shares': (pct * p['shares']).astype('int64'),
+            'Value': np.round(pct * p['shares'] * price, 0),
+            'pctChange': np.round(rng.normal(0, 0.05, len(self.HOLDERS)), 4),
+        })
+
+    # ------------------------------------------------------------------
+    # Universe
+    # ------------------------------------------------------------------
+    def universe(self, size: int) -> pd.DataFrame:
+        """Stock list in the us_stocks_list.csv format"""
+        tickers = [_synthetic_symbol(i) for i in range(size)]
+        return pd.DataFrame({
+            'ticker': tickers,
+            'name': [f'{t} Corporation' for t in tickers],
+            'sector': [self.SECTORS[self._profile(t)['sector']] for t in tickers],
+            'industry': 'N/A',
+            'market': 'SYNTHETIC',
+        })
+
+
+def _synthetic_symbol(i: int) -> str:
+    """0 -> 'ZAAAA', 1 -> 'ZAAAB', ... (Z prefix keeps clear of most real symbols)"""
+    letters = []
+    for _ in range(4):
+        i, rem = divmod(i, 26)
+        letters.append(chr(ord('A') + rem))
+    return 'Z' + ''.join(reversed(letters))
+
+
+PROVIDERS = {
+    YFinanceProvider.name: YFinanceProvider,
+    SyntheticProvider.name: SyntheticProvider,
+}
+
+_provider: Optional[MarketDataProvider] = None
+
+
+def get_provider(name: Optional[str] = None) -> MarketDataProvider:
+    """Provider selected by MARKET_DATA_PROVIDER (shared per process)"""
+    global _provider
+    name = (name or os.getenv('MARKET_DATA_PROVIDER', 'yfinance')).lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown MARKET_DATA_PROVIDER {name!r} (choose from {sorted(PROVIDERS)})")
+    if _provider is None or _provider.name != name:
+        _provider = PROVIDERS[name]()
+        logger.info(f"📡 Market data provider: {name}")
+    return _provider
+
+
+def main():
+    """Main execution"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Market data providers')
+    parser.add_argument('--synthetic-universe', type=int, metavar='N',
+                        help='Write a synthetic us_stocks_list.csv with N tickers')
+    parser.add_argument('--dir', default=os.getenv('DATA_DIR', '.'), help='Data directory')
+    parser.add_argument('--seed', type=int, default=None, help='Synthetic seed (default: SYNTHETIC_SEED or 42)')
+    args = parser.parse_args()
+
+    if args.synthetic_universe:
+        provider = SyntheticProvider(seed=args.seed)
+        stocks = provider.universe(args.synthetic_universe)
+        path = os.path.join(args.dir, 'us_stocks_list.csv')
+        stocks.to_csv(path, index=False)
+        print(f"🧪 Wrote {len(stocks)} synthetic tickers to {path}")
+        print(f"   Run the pipeline with MARKET_DATA_PROVIDER=synthetic SYNTHETIC_SEED={provider.seed}")
+        return
+
+    provider = get_provider()
+    print(f"📡 Provider: {provider.name}")
+
+
+if __name__ == "__main__":
+    main()
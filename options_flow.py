@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 import os, json, logging
-import yfinance as yf
+from market_data import get_provider
+from universe import load_universe
+from artifacts import ArtifactManifest
 from datetime import datetime
 
 logging.basicConfig(level=logging.INFO)
@@ -9,15 +11,15 @@ logger = logging.getLogger(__name__)
 
 class OptionsFlowAnalyzer:
     def __init__(self):
-        self.watchlist = ['AAPL', 'NVDA', 'TSLA', 'MSFT', 'AMZN', 'META', 'GOOGL', 'SPY', 'QQQ', 'AMD']
+        self.provider = get_provider()
+        self.watchlist = load_universe('watchlist')['ticker'].tolist()
     
     def get_options_summary(self, ticker: str):
         try:
-            stock = yf.Ticker(ticker)
-            exps = stock.options
+            exps = self.provider.options(ticker)
             if not exps: return {'error': 'No options'}
             
-            opt = stock.option_chain(exps[0])
+            opt = self.provider.option_chain(ticker, exps[0])
             calls, puts = opt.calls, opt.puts
             
             call_vol, put_vol = calls['volume'].sum(), puts['volume'].sum()
@@ -48,8 +50,7 @@ class OptionsFlowAnalyzer:
             res = self.get_options_summary(t)
             if 'error' not in res: results.append(res)
         
-        with open('options_flow.json', 'w') as f:
-            json.dump({'options_flow': results}, f, indent=2)
+        ArtifactManifest().write_json({'options_flow': results}, 'options_flow.json', stage='options_flow', inputs=[])
         logger.info("Saved options_flow.json")
 
 if __name__ == "__main__":
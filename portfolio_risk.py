@@ -2,14 +2,18 @@
 import os, json, logging
 import pandas as pd
 import numpy as np
-import yfinance as yf
+from market_data import get_provider
+from artifacts import ArtifactManifest
 
 logging.basicConfig(level=logging.INFO)
 
 class PortfolioRiskAnalyzer:
+    def __init__(self):
+        self.provider = get_provider()
+
     def analyze_portfolio(self, tickers):
         try:
-            data = yf.download(tickers, period='6mo', progress=False)['Close']
+            data = self.provider.download(tickers, period='6mo')['Close']
             returns = data.pct_change().dropna()
             
             # Correlation
@@ -33,8 +37,7 @@ class PortfolioRiskAnalyzer:
                 'matrix': corr.round(2).to_dict()
             }
             
-            with open('portfolio_risk.json', 'w') as f:
-                json.dump(result, f, indent=2)
+            ArtifactManifest().write_json(result, 'portfolio_risk.json', stage='portfolio_risk', inputs=[])
             logging.info(f"Risk Analysis: Volatility {vol*100:.1f}%")
             
         except Exception as e:
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Dense (ticker x date) Price Panel
+Materializes the price store as one memory-mapped .npy array per field so
+any stage (or gunicorn worker) can map it read-only with zero copies.
+histories() is PriceStore.histories() served from those arrays; Flask and
+the stages that chart or window daily bars read through it.
+
+Layout:
+    price_panel/
+        meta.json            shape, fields and per-ticker last date / store revision
+        tickers.npy          ticker axis (row order is stable across rebuilds)
+        dates.npy            session date axis (datetime64[D])
+        current_price.npy    float32 [n_tickers, n_dates], NaN where no bar
+        ...
+"""
+
+import os
+import json
+import shutil
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from market_calendar import TradingCalendar
+from price_store import PriceStore, PROVIDER_COLUMNS
+
+# Logging Configuration
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+PANEL_FIELDS = {
+    'open': 'float32',
+    'high': 'float32',
+    'low': 'float32',
+    'current_price': 'float32',
+    'volume': 'float64',  # float so missing bars can be NaN; exact for any real volume
+}
+
+
+class PricePanel:
+    """Read-only memory-mapped view of the price store as dense arrays"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.meta_file = os.path.join(root, 'meta.json')
+        self.tickers: Optional[np.ndarray] = None
+        self.dates: Optional[np.ndarray] = None
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._index: Dict[str, int] = {}
+        self._meta: Dict = {}
+        self._opened_mtime: Optional[int] = None
+        self._lock = threading.Lock()
+        self._calendar: Optional[TradingCalendar] = None
+
+    # ------------------------------------------------------------------
+    # Read API
+    # ------------------------------------------------------------------
+    def exists(self) -> bool:
+        return os.path.exists(self.meta_file)
+
+    def open(self) -> 'PricePanel':
+        """Map all arrays read-only (near-zero load time, pages shared between processes)"""
+        if not self.exists():
+            raise FileNotFoundError(f"Price panel not found: {self.root}")
+        self._opened_mtime = os.stat(self.meta_file).st_mtime_ns
+        self._meta = self._load_meta()
+        self.tickers = np.load(os.path.join(self.root, 'tickers.npy'))
+        self.dates = np.load(os.path.join(self.root, 'dates.npy'))
+        self._arrays = {
+            field: np.load(os.path.join(self.root, f'{field}.npy'), mmap_mode='r')
+            for field in PANEL_FIELDS
+        }
+        self._index = {t: i for i, t in enumerate(self.tickers.tolist())}
+        return self
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self._arrays[field]
+
+    def row(self, ticker: str) -> int:
+        """Row index of a ticker on the panel"""
+        return self._index[ticker]
+
+    def frame(self, ticker: str, fields: Optional[List[str]] = None) -> pd.DataFrame:
+        """Long-format frame for one ticker (only dates with a bar)"""
+        i = self.row(ticker)
+        fields = fields or list(PANEL_FIELDS)
+        close = self._arrays['current_price'][i]
+        mask = ~np.isnan(close)
+        data = {'date': self.dates[mask].astype('datetime64[ns]')}
+        for field in fields:
+            data[field] = np.asarray(self._arrays[field][i][mask])
+        return pd.DataFrame(data)
+
+    def histories(self, store: PriceStore, tickers: Iterable[str], period: str,
+                  provider=None) -> Dict[str, pd.DataFrame]:
+        """
+        PriceStore.histories() with the stored bars sliced from the mapped
+        arrays: tickers the panel holds exactly as stored (same last date, row
+        count and rev) through the last completed session come from here, the
+        rest (panel missing, behind the store, or not stored) from the store.
+        A rebuilt panel is remapped on the next call.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        out = {}
+        with self._lock:
+            try:
+                if self._opened_mtime != os.stat(self.meta_file).st_mtime_ns:
+                    self.open()
+            except (OSError, ValueError):
+                self._opened_mtime = None
+            else:
+                index, dates, arrays, held = self._index, self.dates, self._arrays, self._meta['tickers']
+        if self._opened_mtime is not None:
+            stats = store.ticker_stats() if store.exists() else {}
+            if self._calendar is None:
+                self._calendar = TradingCalendar()
+            last_session = self._calendar.last_completed_session()
+            current = [
+                t for t in tickers if t in index and t in stats and held.get(t) == {
+                    'last': stats[t]['last'], 'rows': stats[t]['rows'], 'rev': stats[t].get('rev', 0)}
+                and pd.Timestamp(stats[t]['last']) >= last_session
+            ]
+            if current:
+                start = store.period_start(period, max(stats[t]['last'] for t in current))
+                lo = np.searchsorted(dates, np.datetime64(start.date(), 'D')) if start is not None else 0
+                index_dates = dates[lo:].astype('datetime64[ns]')
+                for ticker in current:
+                    i = index[ticker]
+                    # Volume is NaN exactly where the store has no bar
+                    mask = ~np.isnan(arrays['volume'][i, lo:])
+                    out[ticker] = pd.DataFrame(
+                        {name: np.asarray(arrays[field][i, lo:][mask]).astype('float64' if name != 'Volume' else 'int64')
+                         for field, name in PROVIDER_COLUMNS.items()},
+                        index=pd.DatetimeIndex(index_dates[mask], name='Date')
+                    )
+
+        rest = [t for t in tickers if t not in out]
+        if rest:
+            out.update(store.histories(rest, period, provider=provider))
+        return {t: out[t] for t in tickers if t in out}
+
+    # ------------------------------------------------------------------
+    # Build
+    # ------------------------------------------------------------------
+    def build(self, store: PriceStore, full: bool = False) -> None:
+        """
+        Rebuild from the store. Incremental by default: only bars newer than
+        the panel's last date (and tickers new to the panel or whose stored
+        history changed) are read; the existing block is copied over.
+        """
+        store_meta = store.ticker_stats()
+        if not store_meta:
+            logger.warning("⚠️ Price store is empty, panel not built")
+            return
+
+        old_meta = self._load_meta() if (self.exists() and not full) else {}
+        old_stats = old_meta.get('tickers', {})
+        old_tickers = list(np.load(os.path.join(self.root, 'tickers.npy'))) if old_meta else []
+        old_dates = np.load(os.path.join(self.root, 'dates.npy')) if old_meta else np.array([], dtype='datetime64[D]')
+
+        # Ticker axis: keep existing row order, append new tickers
+        new_tickers = sorted(set(store_meta) - set(old_tickers))
+        tickers = old_tickers + new_tickers
+
+        last_date = pd.Timestamp(old_dates[-1]) if len(old_dates) else None
+
+        # Tickers whose stored history no longer matches what the panel holds:
+        # rewritten (rev bumped), or grown by bars the date-window read below
+        # cannot see (a ticker deferred or failed in an earlier run catching up
+        # to dates at or before the panel's last date)
+        def changed(t: str) -> bool:
+            old, now = old_stats.get(t, {}), store_meta[t]
+            if 'last' not in old or now.get('rev', 0) != old.get('rev', 0):
+                return True
+            rows_changed = 'rows' in old and now['rows'] != old['rows']
+            if pd.Timestamp(old['last']) < last_date:
+                return now['last'] != old['last'] or rows_changed
+            # Current at the last build: only bars after last_date are expected
+            return now['last'] == old['last'] and rows_changed
+
+        stale = [t for t in old_tickers if t in store_meta and changed(t)]
+        reload = new_tickers + stale
+
+        parts = []
+        if last_date is not None:
+            parts.append(store.read(start=last_date + pd.Timedelta(days=1), columns=list(PANEL_FIELDS)))
+        if reload or last_date is None:
+            parts.append(store.read(tickers=reload if last_date is not None else None, columns=list(PANEL_FIELDS)))
+        nonempty = [p for p in parts if not p.empty]
+        new_rows = pd.concat(nonempty, ignore_index=True) if nonempty \
+            else pd.DataFrame(columns=['ticker', 'date'] + list(PANEL_FIELDS))
+        if not new_rows.empty:
+            new_rows = new_rows.drop_duplicates(subset=['ticker', 'date'], keep='last')
+        elif old_meta and not reload:
+            logger.info(f"🧱 Panel {len(old_tickers)} x {len(old_dates)} is current, nothing to rebuild")
+            return
+
+        # Date axis: existing sessions + any new ones
+        new_dates = new_rows['date'].values.astype('datetime64[D]') if not new_rows.empty else old_dates
+        dates = np.union1d(old_dates, new_dates)
+
+        tmp_root = self.root + '.tmp'
+        if os.path.exists(tmp_root):
+            shutil.rmtree(tmp_root)
+        os.makedirs(tmp_root)
+        np.save(os.path.join(tmp_root, 'tickers.npy'), np.array(tickers, dtype=str))
+        np.save(os.path.join(tmp_root, 'dates.npy'), dates)
+
+        # Positions of the new rows on the panel axes
+        if not new_rows.empty:
+            t_pos = pd.Categorical(new_rows['ticker'].astype(str), categories=tickers).codes
+            d_pos = np.searchsorted(dates, new_rows['date'].values.astype('datetime64[D]'))
+        stale_rows = [tickers.index(t) for t in stale]
+
+        for field, dtype in PANEL_FIELDS.items():
+            arr = np.lib.format.open_memmap(
+                os.path.join(tmp_root, f'{field}.npy'), mode='w+', dtype=dtype,
+                shape=(len(tickers), len(dates))
+            )
+            arr[:] = np.nan
+            if old_meta:
+                old = np.load(os.path.join(self.root, f'{field}.npy'), mmap_mode='r')
+                old_cols = np.searchsorted(dates, old_dates)
+                arr[:len(old_tickers), old_cols] = old
+                if stale_rows:
+                    arr[stale_rows, :] = np.nan
+            if not new_rows.empty:
+                arr[t_pos, d_pos] = new_rows[field].to_numpy(dtype=dtype)
+            arr.flush()
+            del arr
+
+        meta = {
+            'shape': [len(tickers), len(dates)],
+            'fields': list(PANEL_FIELDS),
+            'tickers': {t: {'last': m['last'], 'rows': m['rows'], 'rev': m.get('rev', 0)}
+                        for t, m in store_meta.items()},
+            'updated': datetime.now().isoformat()
+        }
+        with open(os.path.join(tmp_root, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+
+        old_root = self.root + '.old'
+        if os.path.exists(self.root):
+            if os.path.exists(old_root):
+                shutil.rmtree(old_root)
+            os.rename(self.root, old_root)
+        os.rename(tmp_root, self.root)
+        if os.path.exists(old_root):
+            shutil.rmtree(old_root)
+
+        logger.info(f"🧱 Panel {len(tickers)} x {len(dates)} built from {len(new_rows)} new rows "
+                    f"({len(reload)} tickers reloaded)")
+
+    def _load_meta(self) -> Dict:
+        with open(self.meta_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+
+def main():
+    """Main execution"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Dense memory-mapped price panel')
+    parser.add_argument('--dir', default=os.getenv('DATA_DIR', '.'), help='Data directory')
+    parser.add_argument('--full', action='store_true', help='Rebuild from scratch')
+    args = parser.parse_args()
+
+    store = PriceStore(os.path.join(args.dir, 'price_store'))
+    panel = PricePanel(os.path.join(args.dir, 'price_panel'))
+    panel.build(store, full=args.full)
+
+    panel.open()
+    print(f"📊 Panel: {panel.root} | {len(panel.tickers)} tickers x {len(panel.dates)} dates")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,749 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+US Stock Columnar Price Store
+Year-partitioned Parquet storage for daily prices (replaces us_daily_prices.csv)
+
+Layout:
+    price_store/
+        _meta.json                      per-ticker first/last date and row count
+        _tickers.parquet                dimension table: ticker_id, ticker, name, market
+        year=2024/part-00000.parquet    compacted rows sorted by (ticker, date)
+        year=2024/seg-<timestamp>.parquet  append-only segments (merged by compact())
+
+Per-ticker meta carries a revision counter ('rev') that is bumped whenever a
+ticker's stored history is rewritten (replace_tickers), so derived data such
+as the price panel knows to reload it.
+"""
+
+import os
+import re
+import json
+import shutil
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Union
+from market_calendar import TradingCalendar
+from market_data import PERIOD_DAYS
+
+# Logging Configuration
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+MARKET_TZ = 'America/New_York'
+
+# Canonical compact schema. name/market are not repeated per row; they live
+# in the _tickers dimension table keyed by ticker.
+PRICE_COLUMNS = [
+    'ticker', 'date', 'open', 'high', 'low', 'current_price',
+    'volume', 'change', 'change_rate'
+]
+PRICE_DTYPES = {
+    'open': 'float32',
+    'high': 'float32',
+    'low': 'float32',
+    'current_price': 'float32',
+    'volume': 'int64',
+    'change': 'float32',
+    'change_rate': 'float32',
+}
+DIMENSION_COLUMNS = ['ticker', 'name', 'market']
+
+# Working-memory cap (above the interpreter baseline) for the streaming CSV
+# migration. Raw CSV rows are sized from a sample; the multiplier covers the
+# parsed chunk, date parsing, schema-cast copies and Arrow/Parquet buffers.
+MIGRATION_MEMORY_MB = int(os.getenv('PRICE_MIGRATION_MEMORY_MB', '256'))
+MIGRATION_COPIES = 24
+
+DateLike = Union[str, datetime, pd.Timestamp]
+
+# Provider-shaped OHLCV columns (yfinance history/download) <- store columns
+PROVIDER_COLUMNS = {'open': 'Open', 'high': 'High', 'low': 'Low', 'current_price': 'Close', 'volume': 'Volume'}
+
+
+def normalize_dates(values) -> pd.Series:
+    """Convert yfinance/CSV dates (tz-aware or offset strings) to naive session dates"""
+    s = pd.Series(values)
+    if not pd.api.types.is_datetime64_any_dtype(s):
+        sample = str(s.iloc[0]) if len(s) else ''
+        has_offset = bool(re.search(r'[+-]\d{2}:?\d{2}$', sample))
+        s = pd.to_datetime(s, utc=has_offset)
+    if s.dt.tz is not None:
+        s = s.dt.tz_convert(MARKET_TZ).dt.tz_localize(None)
+    return s.dt.normalize().astype('datetime64[ns]')
+
+
+def enforce_schema(df: pd.DataFrame, dtypes: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """Cast a price frame to the compact schema (float32 prices, int64 volume, categorical ticker)"""
+    df = df.copy()
+    for col, dtype in (dtypes or PRICE_DTYPES).items():
+        if col not in df.columns:
+            continue
+        if dtype == 'int64':
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(dtype)
+        else:
+            df[col] = df[col].astype(dtype)
+    if 'date' in df.columns and df['date'].dtype != 'datetime64[ns]':
+        df['date'] = normalize_dates(df['date'])
+    if 'ticker' in df.columns:
+        df['ticker'] = df['ticker'].astype(str).astype('category')
+    return df
+
+
+def memory_report(df: pd.DataFrame, dimension: Optional[pd.DataFrame] = None) -> Dict[str, float]:
+    """Compare RAM of the legacy layout (float64, object strings, name/market per row) with the compact one"""
+    legacy = df.copy()
+    if dimension is not None and not dimension.empty:
+        legacy = legacy.merge(dimension[DIMENSION_COLUMNS], on='ticker', how='left')
+    for col in PRICE_DTYPES:
+        if col in legacy.columns:
+            legacy[col] = legacy[col].astype('float64')
+    for col in DIMENSION_COLUMNS:
+        if col in legacy.columns:
+            legacy[col] = legacy[col].astype(object)
+
+    compact = enforce_schema(df[[c for c in PRICE_COLUMNS if c in df.columns]])
+    legacy_mb = legacy.memory_usage(deep=True).sum() / 1e6
+    compact_mb = compact.memory_usage(deep=True).sum() / 1e6
+    return {
+        'rows': len(df),
+        'legacy_mb': round(legacy_mb, 1),
+        'compact_mb': round(compact_mb, 1),
+        'saved_pct': round((1 - compact_mb / legacy_mb) * 100, 1) if legacy_mb else 0.0
+    }
+
+
+def arrow_type(dtype: str) -> pa.DataType:
+    """Arrow type of a schema dtype ('string' or a numpy dtype name)"""
+    return pa.string() if dtype == 'string' else pa.from_numpy_dtype(np.dtype(dtype))
+
+
+class PriceStore:
+    """Partitioned columnar store with column projection and ticker/date filtering"""
+
+    # Stored schema; subclasses (e.g. IndicatorStore) swap in their own columns
+    COLUMNS = PRICE_COLUMNS
+    DTYPES = PRICE_DTYPES
+    # Row identity: duplicates on these columns keep the last row written
+    KEY = ['ticker', 'date']
+
+    def __init__(self, root: str):
+        self.root = root
+        self.meta_file = os.path.join(root, '_meta.json')
+        self.tickers_file = os.path.join(root, '_tickers.parquet')
+        self._calendar: Optional[TradingCalendar] = None
+
+    # ------------------------------------------------------------------
+    # Read API
+    # ------------------------------------------------------------------
+    def exists(self) -> bool:
+        """True if the store holds at least one partition"""
+        return os.path.exists(self.meta_file) and bool(self._partition_dirs())
+
+    def read(self, tickers: Optional[Iterable[str]] = None,
+             start: Optional[DateLike] = None,
+             end: Optional[DateLike] = None,
+             columns: Optional[List[str]] = None,
+             lookback: Optional[int] = None) -> pd.DataFrame:
+        """
+        Read prices as a long DataFrame sorted by (ticker, date)
+        - tickers: only these tickers (None = all)
+        - start/end: inclusive date range, pruned by year partition
+        - columns: projection (ticker and date are always returned)
+        - lookback: only the last N sessions up to end (default: the latest
+          stored date); turned into a start date so it is pushed down too
+        Results follow the compact schema (see enforce_schema).
+        """
+        if not self.exists():
+            return pd.DataFrame(columns=columns or self.COLUMNS)
+        if lookback is not None and start is None:
+            start = self.window_start(lookback, end)
+
+        dataset = self._dataset()
+        available = [c for c in dataset.schema.names if c in self.COLUMNS]
+
+        if columns:
+            cols = ['ticker', 'date'] + [c for c in columns if c not in ('ticker', 'date')]
+            cols = [c for c in cols if c in available]
+        else:
+            cols = available
+
+        expr = None
+        if tickers is not None:
+            expr = self._and(expr, ds.field('ticker').isin(list(tickers)))
+        if start is not None:
+            start_ts = pd.Timestamp(start).normalize()
+            expr = self._and(expr, ds.field('year') >= start_ts.year)
+            expr = self._and(expr, ds.field('date') >= start_ts.to_pydatetime())
+        if end is not None:
+            end_ts = pd.Timestamp(end).normalize()
+            expr = self._and(expr, ds.field('year') <= end_ts.year)
+            expr = self._and(expr, ds.field('date') <= end_ts.to_pydatetime())
+
+        table = dataset.to_table(columns=cols, filter=expr)
+        df = enforce_schema(table.to_pandas(), self.DTYPES)
+        if df.empty:
+            return df
+        return df.sort_values(['ticker', 'date'], kind='mergesort').reset_index(drop=True)
+
+    def window_start(self, bars: int, end: Optional[DateLike] = None) -> pd.Timestamp:
+        """First date of the last `bars` NYSE sessions ending at end (default: latest stored date)"""
+        if self._calendar is None:
+            self._calendar = TradingCalendar()
+        if end is None:
+            end = max(m['last'] for m in self.ticker_stats().values())
+        end = pd.Timestamp(end).normalize()
+        sessions_back = bars - 1 if self._calendar.is_session(end) else bars
+        return self._calendar.previous_session(end, sessions_back) if sessions_back > 0 else end
+
+    def period_start(self, period: str, end: Optional[DateLike] = None) -> Optional[pd.Timestamp]:
+        """
+        First date of a provider period string ending at end (default: latest
+        stored date), windowed the way providers do: '5d' is the last 5
+        sessions, '3mo' / '1y' the days after end minus PERIOD_DAYS, 'ytd'
+        starts on Jan 1 and 'max' is unbounded (None)
+        """
+        if end is None:
+            end = max(m['last'] for m in self.ticker_stats().values())
+        end = pd.Timestamp(end).normalize()
+        if period == 'max':
+            return None
+        if period == 'ytd':
+            return pd.Timestamp(end.year, 1, 1)
+        if period not in PERIOD_DAYS:
+            raise ValueError(f"Unsupported period: {period}")
+        if period.endswith('d'):
+            return self.window_start(PERIOD_DAYS[period], end)
+        return end - pd.Timedelta(days=PERIOD_DAYS[period] - 1)
+
+    def histories(self, tickers: Iterable[str], period: str, provider=None) -> Dict[str, pd.DataFrame]:
+        """
+        Daily bars per ticker over a provider period string, shaped like the
+        provider's history() (Date index; Open, High, Low, Close, Volume).
+        Tickers stored through the last completed session come from one
+        windowed read; with a provider, the others (not stored, stale, or
+        non-equity symbols like ^VIX) are fetched in one batched download.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        stats = self.ticker_stats() if self.exists() else {}
+        if self._calendar is None:
+            self._calendar = TradingCalendar()
+        last_session = self._calendar.last_completed_session()
+        current = [t for t in tickers if t in stats and pd.Timestamp(stats[t]['last']) >= last_session]
+
+        out = {}
+        if current:
+            end = max(stats[t]['last'] for t in current)
+            df = self.read(tickers=current, start=self.period_start(period, end), columns=list(PROVIDER_COLUMNS))
+            for ticker, g in df.groupby('ticker', observed=True, sort=False):
+                out[str(ticker)] = pd.DataFrame(
+                    {name: g[col].to_numpy(dtype='float64' if name != 'Volume' else 'int64')
+                     for col, name in PROVIDER_COLUMNS.items()},
+                    index=pd.DatetimeIndex(g['date'], name='Date')
+                )
+
+        missing = [t for t in tickers if t not in out]
+        if missing and provider is not None:
+            out.update(_download_histories(provider, missing, period))
+        return {t: out[t] for t in tickers if t in out}
+
+    def read_tickers(self) -> pd.DataFrame:
+        """Ticker dimension table (ticker_id, ticker, name, market)"""
+        if not os.path.exists(self.tickers_file):
+            return pd.DataFrame(columns=['ticker_id'] + DIMENSION_COLUMNS)
+        return pd.read_parquet(self.tickers_file)
+
+    def latest_dates(self) -> Dict[str, pd.Timestamp]:
+        """Latest stored date per ticker (from metadata, no data scan)"""
+        meta = self._load_meta()
+        return {t: pd.Timestamp(m['last']) for t, m in meta.get('tickers', {}).items()}
+
+    def ticker_stats(self) -> Dict[str, Dict]:
+        """Per-ticker first/last date and row count (from metadata)"""
+        return self._load_meta().get('tickers', {})
+
+    def tickers(self) -> List[str]:
+        """All tickers present in the store"""
+        return sorted(self._load_meta().get('tickers', {}).keys())
+
+    def total_rows(self) -> int:
+        """Total stored rows (from metadata)"""
+        return sum(m['rows'] for m in self._load_meta().get('tickers', {}).values())
+
+    # ------------------------------------------------------------------
+    # Write API
+    # ------------------------------------------------------------------
+    def write(self, df: pd.DataFrame) -> None:
+        """Replace the whole store with df (written to a temp dir, then swapped in)"""
+        df = self._prepare(df)
+        tmp_root = self.root + '.tmp'
+        if os.path.exists(tmp_root):
+            shutil.rmtree(tmp_root)
+        os.makedirs(tmp_root)
+
+        for year, part in df.groupby(df['date'].dt.year, sort=True):
+            self._write_file(part, os.path.join(tmp_root, f'year={year}', 'part-00000.parquet'))
+
+        self._swap_in(tmp_root, self._ticker_stats(df))
+        logger.info(f"💾 Wrote {len(df)} rows for {df['ticker'].nunique()} tickers to {self.root}")
+
+    def write_tickers(self, stocks_df: pd.DataFrame) -> None:
+        """Upsert the ticker dimension table (ids of existing tickers are kept stable)"""
+        incoming = stocks_df.copy()
+        for col in ('name', 'market'):
+            if col not in incoming.columns:
+                incoming[col] = incoming['ticker'] if col == 'name' else 'N/A'
+        incoming = incoming[DIMENSION_COLUMNS].drop_duplicates('ticker', keep='last')
+
+        existing = self.read_tickers()
+        ids = dict(zip(existing['ticker'], existing['ticker_id']))
+        next_id = int(existing['ticker_id'].max()) + 1 if not existing.empty else 0
+        for ticker in incoming['ticker']:
+            if ticker not in ids:
+                ids[ticker] = next_id
+                next_id += 1
+
+        merged = pd.concat([existing[DIMENSION_COLUMNS], incoming]).drop_duplicates('ticker', keep='last')
+        merged.insert(0, 'ticker_id', merged['ticker'].map(ids).astype('int32'))
+        merged = merged.sort_values('ticker_id').reset_index(drop=True)
+
+        os.makedirs(self.root, exist_ok=True)
+        tmp_file = self.tickers_file + '.tmp'
+        merged.to_parquet(tmp_file, index=False)
+        os.replace(tmp_file, self.tickers_file)
+
+    def append(self, df: pd.DataFrame) -> int:
+        """
+        Persist only new bars as an append-only segment per touched year.
+        Rows at or before a ticker's latest stored date are dropped, so segments
+        never overlap and the cost is O(new rows) regardless of stored history.
+        """
+        df = self._prepare(df)
+        meta = self._load_meta()
+        stats = meta.setdefault('tickers', {})
+
+        last = df['ticker'].map(lambda t: stats[t]['last'] if t in stats else None)
+        last = pd.to_datetime(last)
+        df = df[last.isna() | (df['date'] > last)]
+        if df.empty:
+            return 0
+
+        seg_name = f"seg-{datetime.now().strftime('%Y%m%d%H%M%S%f')}.parquet"
+        for year, part in df.groupby(df['date'].dt.year, sort=True):
+            self._write_file(part, os.path.join(self.root, f'year={year}', seg_name))
+
+        self._merge_stats(stats, self._ticker_stats(df))
+        meta['updated'] = datetime.now().isoformat()
+        self._save_meta(meta)
+
+        logger.info(f"➕ Appended {len(df)} rows as {seg_name}")
+        return len(df)
+
+    def segment_count(self) -> int:
+        """Number of uncompacted segments across all partitions"""
+        return sum(len(self._segment_files(d)) for d in self._partition_dirs())
+
+    def needs_compaction(self, max_segments: int = 20) -> bool:
+        """True once segments have piled up past max_segments"""
+        return self.segment_count() > max_segments
+
+    def compact(self) -> int:
+        """Merge segments into the partition's part file (only partitions with segments)"""
+        compacted = 0
+        for part_dir in self._partition_dirs():
+            segments = self._segment_files(part_dir)
+            if not segments:
+                continue
+            self._rewrite_partition(part_dir)
+            compacted += len(segments)
+            logger.info(f"🗜️ Compacted {len(segments)} segments in {part_dir}")
+        return compacted
+
+    def replace_tickers(self, df: pd.DataFrame) -> int:
+        """
+        Replace the complete stored history of every ticker in df, e.g. after a
+        split or dividend changed the adjustment factor of all past bars.
+        Only the year partitions those tickers occupy (before or after) are
+        rewritten, and each ticker's 'rev' is bumped so derived data reloads it.
+        """
+        df = self._prepare(df)
+        if df.empty:
+            return 0
+        tickers = sorted(df['ticker'].unique())
+        meta = self._load_meta()
+        stats = meta.setdefault('tickers', {})
+
+        years = set(df['date'].dt.year.unique())
+        for t in tickers:
+            if t in stats:
+                years.update(range(int(stats[t]['first'][:4]), int(stats[t]['last'][:4]) + 1))
+
+        for year in sorted(years):
+            self._rewrite_partition(f'year={year}', df[df['date'].dt.year == year], drop_tickers=tickers)
+
+        for ticker, new in self._ticker_stats(df).items():
+            new['rev'] = stats.get(ticker, {}).get('rev', 0) + 1
+            stats[ticker] = new
+        meta['updated'] = datetime.now().isoformat()
+        self._save_meta(meta)
+
+        logger.info(f"♻️ Replaced history of {len(tickers)} tickers ({len(df)} rows, {len(years)} partitions)")
+        return len(df)
+
+    def migrate_from_csv(self, csv_path: str, memory_mb: int = MIGRATION_MEMORY_MB,
+                         chunk_rows: Optional[int] = None) -> int:
+        """
+        One-time streaming migration from the legacy us_daily_prices.csv.
+        Peak memory stays near memory_mb regardless of file size:
+        - pass 1 reads fixed-size chunks and spills each year's rows to a spill file
+        - pass 2 sorts and de-duplicates every year in ticker batches of bounded size
+          and streams them into part-00000.parquet
+        Row counts are validated before the new store is swapped in; on a
+        mismatch ValueError is raised and the existing store is left untouched.
+        Returns the number of rows stored.
+        """
+        chunk_rows = chunk_rows or self._chunk_rows(csv_path, memory_mb)
+        logger.info(f"🔄 Migrating {csv_path} to columnar store {self.root} "
+                    f"({chunk_rows} rows/chunk, cap {memory_mb} MB)")
+
+        tmp_root = self.root + '.tmp'
+        if os.path.exists(tmp_root):
+            shutil.rmtree(tmp_root)
+        spill_dir = os.path.join(tmp_root, '_spill')
+        os.makedirs(spill_dir)
+
+        try:
+            spilled, dimension, rows_read, rows_invalid = self._spill_csv(csv_path, spill_dir, chunk_rows)
+            rows_spilled = sum(sum(c.values()) for c in spilled.values())
+            if rows_read != rows_spilled + rows_invalid:
+                raise ValueError(f"Row count mismatch: read {rows_read}, spilled {rows_spilled} + invalid {rows_invalid}")
+
+            stats: Dict[str, Dict] = {}
+            rows_written = 0
+            for year in sorted(spilled):
+                year_stats = self._merge_spill(
+                    os.path.join(spill_dir, f'{year}.parquet'),
+                    os.path.join(tmp_root, f'year={year}', 'part-00000.parquet'),
+                    spilled[year], chunk_rows
+                )
+                self._merge_stats(stats, year_stats)
+                rows_written += sum(m['rows'] for m in year_stats.values())
+            shutil.rmtree(spill_dir)
+
+            on_disk = sum(pq.ParquetFile(os.path.join(tmp_root, d, 'part-00000.parquet')).metadata.num_rows
+                          for d in os.listdir(tmp_root) if d.startswith('year='))
+            if on_disk != rows_written or sum(m['rows'] for m in stats.values()) != rows_written:
+                raise ValueError(f"Row count mismatch: wrote {rows_written}, found {on_disk} on disk")
+        except Exception:
+            shutil.rmtree(tmp_root, ignore_errors=True)
+            raise
+
+        self._swap_in(tmp_root, stats)
+        if dimension:
+            self.write_tickers(pd.DataFrame(
+                [(t, n, m) for t, (n, m) in dimension.items()], columns=DIMENSION_COLUMNS
+            ))
+
+        logger.info(f"✅ Migrated {rows_read} CSV rows: {rows_written} stored, "
+                    f"{rows_spilled - rows_written} duplicates, {rows_invalid} invalid, {len(stats)} tickers")
+        return rows_written
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _dataset(self) -> ds.Dataset:
+        files = [
+            os.path.join(self.root, d, f)
+            for d in self._partition_dirs()
+            for f in sorted(os.listdir(os.path.join(self.root, d)))
+            if f.endswith('.parquet')
+        ]
+        return ds.dataset(files, format='parquet', partitioning='hive',
+                          partition_base_dir=self.root, schema=self._schema())
+
+    @classmethod
+    def _schema(cls) -> pa.Schema:
+        return pa.schema([
+            ('ticker', pa.string()),
+            ('date', pa.timestamp('ns')),
+            *[(c, arrow_type(t)) for c, t in cls.DTYPES.items()],
+            ('year', pa.int32()),
+        ])
+
+    @staticmethod
+    def _and(expr, other):
+        return other if expr is None else expr & other
+
+    def _partition_dirs(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root) if d.startswith('year='))
+
+    def _segment_files(self, part_dir: str) -> List[str]:
+        dir_path = os.path.join(self.root, part_dir)
+        return sorted(f for f in os.listdir(dir_path) if f.startswith('seg-') and f.endswith('.parquet'))
+
+    def _load_meta(self) -> Dict:
+        if not os.path.exists(self.meta_file):
+            return {}
+        with open(self.meta_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_meta(self, meta: Dict) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        tmp_file = self.meta_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_file, self.meta_file)
+
+    def _rewrite_partition(self, part_dir: str, extra: Optional[pd.DataFrame] = None,
+                           drop_tickers: Optional[List[str]] = None) -> None:
+        """Merge all files of a partition (minus drop_tickers, plus extra rows) into one part file"""
+        dir_path = os.path.join(self.root, part_dir)
+        os.makedirs(dir_path, exist_ok=True)
+        files = sorted(f for f in os.listdir(dir_path) if f.endswith('.parquet'))
+        keep = ~pc.field('ticker').isin(drop_tickers) if drop_tickers else None
+
+        frames = [pq.read_table(os.path.join(dir_path, f), filters=keep).to_pandas() for f in files]
+        if extra is not None and not extra.empty:
+            frames.append(extra)
+        frames = [f for f in frames if not f.empty]
+
+        # The merged file replaces part-00000 before the other segments go, so a
+        # failure part-way never leaves the partition without its rows
+        target = 'part-00000.parquet'
+        if frames:
+            tmp_path = os.path.join(dir_path, f'{target}.tmp')
+            self._write_file(self._prepare(pd.concat(frames, ignore_index=True)), tmp_path)
+            os.replace(tmp_path, os.path.join(dir_path, target))
+        for f in files:
+            if not (frames and f == target):
+                os.remove(os.path.join(dir_path, f))
+        if not frames:
+            os.rmdir(dir_path)
+
+    def _swap_in(self, tmp_root: str, stats: Dict[str, Dict]) -> None:
+        """Write meta into a fully built tmp_root and swap it in place of the store"""
+        meta = {'tickers': stats, 'updated': datetime.now().isoformat()}
+        with open(os.path.join(tmp_root, '_meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        if os.path.exists(self.tickers_file):
+            shutil.copy2(self.tickers_file, os.path.join(tmp_root, '_tickers.parquet'))
+
+        old_root = self.root + '.old'
+        if os.path.exists(self.root):
+            if os.path.exists(old_root):
+                shutil.rmtree(old_root)
+            os.rename(self.root, old_root)
+        os.rename(tmp_root, self.root)
+        if os.path.exists(old_root):
+            shutil.rmtree(old_root)
+
+    @staticmethod
+    def _chunk_rows(csv_path: str, memory_mb: int) -> int:
+        """CSV rows per chunk that keep MIGRATION_COPIES in-flight copies under memory_mb"""
+        sample = pd.read_csv(csv_path, nrows=10_000)
+        if sample.empty:
+            return 10_000
+        row_bytes = sample.memory_usage(deep=True, index=False).sum() / len(sample)
+        return max(1_000, int(memory_mb * 1024 ** 2 / (row_bytes * MIGRATION_COPIES)))
+
+    def _spill_csv(self, csv_path: str, spill_dir: str, chunk_rows: int):
+        """
+        Pass 1: stream the CSV into one spill file per year (unsorted, one row
+        group per chunk). Rows carry their CSV position (_seq) so later rows
+        still win on duplicate (ticker, date) after re-sorting.
+        Returns (rows per year and ticker, {ticker: (name, market)}, rows read, invalid rows).
+        """
+        writers: Dict[int, pq.ParquetWriter] = {}
+        spilled: Dict[int, Dict[str, int]] = {}
+        dimension: Dict[str, tuple] = {}
+        rows_read = rows_invalid = 0
+        try:
+            for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+                if 'name' in chunk.columns:
+                    dims = chunk.drop_duplicates('ticker', keep='last')
+                    market = dims['market'] if 'market' in dims.columns else pd.Series('N/A', index=dims.index)
+                    dimension.update(zip(dims['ticker'].astype(str), zip(dims['name'], market)))
+
+                df = chunk[[c for c in PRICE_COLUMNS if c in chunk.columns]].copy()
+                df['_seq'] = np.arange(rows_read, rows_read + len(df), dtype='int64')
+                rows_read += len(chunk)
+                df = df[df['ticker'].notna()]
+                df['date'] = normalize_dates(df['date'])
+                df = enforce_schema(df[df['date'].notna()])
+                df['ticker'] = df['ticker'].astype(str)
+                rows_invalid += len(chunk) - len(df)
+
+                for year, part in df.groupby(df['date'].dt.year, sort=False):
+                    year = int(year)
+                    table = pa.Table.from_pandas(part, preserve_index=False).replace_schema_metadata(None)
+                    if year not in writers:
+                        writers[year] = pq.ParquetWriter(os.path.join(spill_dir, f'{year}.parquet'),
+                                                         table.schema, compression='zstd')
+                    writers[year].write_table(table)
+                    counts = spilled.setdefault(year, {})
+                    for ticker, n in part['ticker'].value_counts().items():
+                        counts[ticker] = counts.get(ticker, 0) + int(n)
+                logger.info(f"   📥 {rows_read} rows read")
+        finally:
+            for writer in writers.values():
+                writer.close()
+        return spilled, dimension, rows_read, rows_invalid
+
+    def _merge_spill(self, spill_path: str, out_path: str, counts: Dict[str, int], batch_rows: int) -> Dict[str, Dict]:
+        """
+        Pass 2: sort and de-duplicate one year's spill file in ticker batches
+        of at most batch_rows spilled rows, streaming each batch into out_path.
+        Returns per-ticker stats for the rows written.
+        """
+        spill = pq.ParquetFile(spill_path)
+        batches, batch, size = [], [], 0
+        for ticker in sorted(counts):
+            if batch and size + counts[ticker] > batch_rows:
+                batches.append(batch)
+                batch, size = [], 0
+            batch.append(ticker)
+            size += counts[ticker]
+        if batch:
+            batches.append(batch)
+
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        stats: Dict[str, Dict] = {}
+        writer = None
+        try:
+            for batch in batches:
+                # Scan one row group at a time so only the matching rows are ever held
+                wanted = pa.array(batch, type=pa.string())
+                df = pa.concat_tables(
+                    group.filter(pc.is_in(group.column('ticker'), value_set=wanted))
+                    for group in map(spill.read_row_group, range(spill.num_row_groups))
+                ).to_pandas()
+                expected = sum(counts[t] for t in batch)
+                if len(df) != expected:
+                    raise ValueError(f"Row count mismatch in {spill_path}: expected {expected}, read {len(df)}")
+                df = df.sort_values(['ticker', 'date', '_seq'], kind='mergesort')
+                df = df.drop_duplicates(subset=['ticker', 'date'], keep='last').drop(columns='_seq')
+                df['ticker'] = df['ticker'].astype(str)
+
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(out_path, table.schema, compression='zstd')
+                writer.write_table(table, row_group_size=50_000)
+                stats.update(self._ticker_stats(df))
+        finally:
+            if writer is not None:
+                writer.close()
+        return stats
+
+    @classmethod
+    def _prepare(cls, df: pd.DataFrame) -> pd.DataFrame:
+        df = df[[c for c in cls.COLUMNS if c in df.columns]].copy()
+        df['date'] = normalize_dates(df['date'])
+        df = enforce_schema(df, cls.DTYPES)
+        df['ticker'] = df['ticker'].astype(str)  # plain strings on disk; Parquet dictionary-encodes them
+        df = df.drop_duplicates(subset=cls.KEY, keep='last')
+        return df.sort_values(cls.KEY).reset_index(drop=True)
+
+    @staticmethod
+    def _write_file(df: pd.DataFrame, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        pq.write_table(table, path, row_group_size=50_000, compression='zstd')
+
+    @staticmethod
+    def _merge_stats(stats: Dict[str, Dict], new_stats: Dict[str, Dict]) -> None:
+        """Fold per-ticker stats of newly written rows into stats (in place)"""
+        for ticker, new in new_stats.items():
+            if ticker in stats:
+                old = stats[ticker]
+                new = {
+                    'first': min(old['first'], new['first']),
+                    'last': max(old['last'], new['last']),
+                    'rows': old['rows'] + new['rows'],
+                    'rev': old.get('rev', 0)
+                }
+            stats[ticker] = new
+
+    @staticmethod
+    def _ticker_stats(df: pd.DataFrame) -> Dict[str, Dict]:
+        grouped = df.groupby('ticker')['date'].agg(['min', 'max', 'count'])
+        return {
+            t: {'first': r['min'].strftime('%Y-%m-%d'), 'last': r['max'].strftime('%Y-%m-%d'), 'rows': int(r['count'])}
+            for t, r in grouped.iterrows()
+        }
+
+
+def _download_histories(provider, tickers: List[str], period: str) -> Dict[str, pd.DataFrame]:
+    """One batched provider download split into per-ticker frames (rows without a close dropped)"""
+    try:
+        data = provider.download(tickers, period=period, group_by='ticker', threads=False)
+    except Exception as e:
+        logger.warning(f"⚠️ Batched download of {len(tickers)} symbols failed: {e}")
+        return {}
+    if data is None or data.empty:
+        return {}
+
+    out = {}
+    for ticker in tickers:
+        if isinstance(data.columns, pd.MultiIndex):
+            if ticker not in data.columns.get_level_values(0):
+                continue
+            hist = data[ticker]
+        else:
+            hist = data
+        hist = hist.dropna(subset=['Close'])
+        if not hist.empty:
+            out[ticker] = hist
+    logger.info(f"📡 Downloaded {len(out)}/{len(tickers)} symbols not in the price store (1 batched request)")
+    return out
+
+
+def main():
+    """Main execution"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='US Stock Columnar Price Store')
+    parser.add_argument('--dir', default=os.getenv('DATA_DIR', '.'), help='Data directory')
+    parser.add_argument('--migrate', action='store_true', help='Migrate us_daily_prices.csv into the store')
+    parser.add_argument('--memory-mb', type=int, default=MIGRATION_MEMORY_MB,
+                        help='Peak memory cap for --migrate (default: PRICE_MIGRATION_MEMORY_MB or 256)')
+    parser.add_argument('--compact', action='store_true', help='Merge append-only segments')
+    parser.add_argument('--memory-report', action='store_true', help='Compare legacy vs compact in-memory size')
+    args = parser.parse_args()
+
+    store = PriceStore(os.path.join(args.dir, 'price_store'))
+
+    if args.migrate:
+        csv_path = os.path.join(args.dir, 'us_daily_prices.csv')
+        if not os.path.exists(csv_path):
+            print(f"❌ CSV not found: {csv_path}")
+            return
+        rows = store.migrate_from_csv(csv_path, memory_mb=args.memory_mb)
+        print(f"\n🎉 Migrated {rows} rows into {store.root}")
+
+    if args.compact:
+        merged = store.compact()
+        print(f"\n🗜️ Compacted {merged} segments")
+
+    if args.memory_report:
+        report = memory_report(store.read(), store.read_tickers())
+        print(f"\n🧠 Memory ({report['rows']} rows): legacy {report['legacy_mb']} MB → "
+              f"compact {report['compact_mb']} MB ({report['saved_pct']}% saved)")
+
+    tickers = store.tickers()
+    print(f"📊 Store: {store.root} | {len(tickers)} tickers | "
+          f"{store.total_rows()} rows | {store.segment_count()} segments")
+
+
+if __name__ == "__main__":
+    main()
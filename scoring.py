@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Table-Driven Scoring Engine
+Stage scores (supply/demand, institutional, ETF flow, technical,
+fundamental, analyst, relative strength, composite) are declared as rule
+tables and evaluated over whole columns at once.
+
+A scorecard:
+    base      starting points (default 50)
+    rules     list of ladders; each ladder is [[condition, points], ...] and
+              works like an if/elif chain: the first matching condition adds
+              its points, no match adds 0. Conditions are DataFrame.eval
+              expressions over the frame's columns, evaluated with np.select.
+    weights   {column: weight} - a weighted sum instead of base + rules
+    score     output column (base + rules is clipped to 0..100)
+    labels    {column: [[condition, label], ..., ['else', label]]}, evaluated
+              after the score column exists
+    inputs    raw per-ticker features only the rules read; coerced to float
+              (missing = NaN, so no condition matches) and dropped afterwards
+
+Rules can be tuned without code changes: point SCORING_RULES at a JSON file
+whose top-level keys replace fields of the named scorecards, e.g.
+    {"supply_demand": {"rules": [[["obv_change > 15", 15]]]}}
+Dump the defaults with: python scoring.py --dump
+"""
+
+import os
+import json
+import copy
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+# Logging Configuration
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SCORECARDS = {
+    'supply_demand': {
+        'base': 50,
+        'inputs': ['obv_change', 'ad_change', 'vol_ratio', 'mfi_value'],
+        'rules': [
+            # OBV trend (20-day)
+            [['obv_change > 10', 15], ['obv_change > 5', 10], ['obv_change < -10', -15], ['obv_change < -5', -10]],
+            # A/D trend (20-day)
+            [['ad_change > 10', 15], ['ad_change > 5', 10], ['ad_change < -10', -15], ['ad_change < -5', -10]],
+            # Volume ratio (5-day avg vs 20-day avg)
+            [['vol_ratio > 1.5', 10], ['vol_ratio > 1.2', 5], ['vol_ratio < 0.7', -5]],
+            # MFI: overbought but with buying pressure / oversold, possible capitulation
+            [['mfi_value > 70', 5], ['mfi_value < 30', -5]],
+        ],
+        'score': 'supply_demand_score',
+        'labels': {
+            'supply_demand_stage': [
+                ['supply_demand_score >= 70', 'Strong Accumulation'],
+                ['supply_demand_score >= 55', 'Accumulation'],
+                ['supply_demand_score >= 45', 'Neutral'],
+                ['supply_demand_score >= 30', 'Distribution'],
+                ['else', 'Strong Distribution'],
+            ],
+        },
+    },
+    'institutional': {
+        'base': 50,
+        'inputs': ['inst_ratio', 'short_ratio'],
+        'rules': [
+            # High institutional ownership is generally positive
+            [['inst_ratio > 0.8', 15], ['inst_ratio > 0.6', 10], ['inst_ratio < 0.3', -10]],
+            # Insider activity
+            [['insider_buys > insider_sells', 15], ['insider_sells > insider_buys', -10]],
+            # Low short interest is positive
+            [['short_ratio < 0.03', 5], ['short_ratio > 0.1', -10], ['short_ratio > 0.2', -20]],
+            # 13F: tracked institutions adding vs trimming last quarter (no filings = no points)
+            [['filers_buying > filers_selling', 10], ['filers_selling > filers_buying', -10]],
+        ],
+        'score': 'institutional_score',
+        'labels': {
+            'institutional_stage': [
+                ['institutional_score >= 70', 'Strong Institutional Support'],
+                ['institutional_score >= 55', 'Institutional Support'],
+                ['institutional_score >= 45', 'Neutral'],
+                ['institutional_score >= 30', 'Institutional Concern'],
+                ['else', 'Strong Institutional Selling'],
+            ],
+        },
+    },
+    'etf_flow': {
+        'base': 50,
+        'inputs': ['volume_ratio', 'momentum_5d', 'obv_change'],
+        'rules': [
+            # Volume
+            [['volume_ratio > 1.5', 20], ['volume_ratio > 1.2', 10], ['volume_ratio < 0.8', -10]],
+            # Price momentum (5-day %)
+            [['momentum_5d > 3', 15], ['momentum_5d > 1', 8], ['momentum_5d < -3', -15], ['momentum_5d < -1', -8]],
+            # OBV trend
+            [['obv_change > 10', 15], ['obv_change > 0', 5], ['obv_change < -10', -15]],
+        ],
+        'score': 'flow_score',
+        'labels': {
+            'flow_direction': [
+                ['flow_score >= 65', 'Strong Inflow'],
+                ['flow_score >= 55', 'Inflow'],
+                ['flow_score >= 45', 'Neutral'],
+                ['flow_score >= 35', 'Outflow'],
+                ['else', 'Strong Outflow'],
+            ],
+        },
+    },
+    'technical': {
+        'base': 50,
+        'inputs': ['rsi_value', 'macd_hist_value', 'macd_hist_prev'],
+        'rules': [
+            # RSI: neutral zone (room to move) / oversold (potential bounce) / overbought
+            [['40 <= rsi_value <= 60', 10], ['rsi_value < 30', 15], ['rsi_value > 70', -5]],
+            # MACD histogram: bullish crossover / positive / negative
+            [['macd_hist_value > 0 and macd_hist_prev < 0', 15], ['macd_hist_value > 0', 8],
+             ['macd_hist_value < 0', -5]],
+            # MA arrangement
+            [["ma_signal == 'Bullish'", 15], ["ma_signal == 'Bearish'", -10]],
+            [["cross_signal == 'Golden Cross'", 10], ["cross_signal == 'Death Cross'", -15]],
+        ],
+        'score': 'technical_score',
+    },
+    'fundamental': {
+        'base': 50,
+        'inputs': ['pe_value', 'revenue_growth_value', 'roe_value', 'market_cap'],
+        'rules': [
+            # P/E (lower is better, but not too low; negative = losses)
+            [['0 < pe_value < 15', 15], ['15 <= pe_value < 25', 10], ['pe_value > 40', -10], ['pe_value < 0', -15]],
+            # Revenue growth
+            [['revenue_growth_value > 0.2', 15], ['revenue_growth_value > 0.1', 10],
+             ['revenue_growth_value > 0', 5], ['revenue_growth_value < 0', -10]],
+            # ROE
+            [['roe_value > 0.2', 10], ['roe_value > 0.1', 5], ['roe_value < 0', -10]],
+        ],
+        'score': 'fundamental_score',
+        'labels': {
+            'size': [
+                ['market_cap > 200e9', 'Mega Cap'],
+                ['market_cap > 10e9', 'Large Cap'],
+                ['market_cap > 2e9', 'Mid Cap'],
+                ['market_cap > 300e6', 'Small Cap'],
+                ['market_cap >= 0', 'Micro Cap'],
+                ['else', 'Unknown'],
+            ],
+        },
+    },
+    'analyst': {
+        'base': 50,
+        'inputs': ['upside_value'],
+        'rules': [
+            # Consensus recommendation
+            [["recommendation == 'strongBuy'", 25], ["recommendation == 'buy'", 20],
+             ["recommendation == 'sell'", -15], ["recommendation == 'strongSell'", -25]],
+            # Upside to mean target (%)
+            [['upside_value > 30', 20], ['upside_value > 20', 15], ['upside_value > 10', 10],
+             ['upside_value > 0', 5], ['upside_value < -10', -15]],
+        ],
+        'score': 'analyst_score',
+    },
+    'relative_strength': {
+        'base': 50,
+        'inputs': ['rs_20d_value', 'rs_60d_value'],
+        'rules': [
+            [['rs_20d_value > 10', 25], ['rs_20d_value > 5', 15], ['rs_20d_value > 0', 8],
+             ['rs_20d_value < -10', -20], ['rs_20d_value < -5', -10]],
+            [['rs_60d_value > 15', 15], ['rs_60d_value > 5', 8], ['rs_60d_value < -15', -15]],
+        ],
+        'score': 'rs_score',
+    },
+    'composite': {
+        'weights': {
+            'sd_score': 0.25,
+            'inst_score': 0.20,
+            'tech_score': 0.20,
+            'fund_score': 0.15,
+            'analyst_score': 0.10,
+            'rs_score': 0.10,
+        },
+        'score': 'composite_score',
+        'labels': {
+            'grade': [
+                ['composite_score >= 80', '🔥 S급 (즉시 매수)'],
+                ['composite_score >= 70', '🌟 A급 (적극 매수)'],
+                ['composite_score >= 60', '📈 B급 (매수 고려)'],
+                ['composite_score >= 50', '📊 C급 (관망)'],
+                ['composite_score >= 40', '⚠️ D급 (주의)'],
+                ['else', '🚫 F급 (회피)'],
+            ],
+        },
+    },
+}
+
+_loaded: Optional[Dict[str, Dict]] = None
+
+
+def load_scorecards(path: Optional[str] = None) -> Dict[str, Dict]:
+    """Default scorecards with the fields of any SCORING_RULES JSON overrides applied"""
+    cards = copy.deepcopy(SCORECARDS)
+    path = path or os.getenv('SCORING_RULES')
+    if path and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            overrides = json.load(f)
+        for name, fields in overrides.items():
+            cards.setdefault(name, {}).update(fields)
+        logger.info(f"⚖️ Scoring rules overridden from {path}: {', '.join(overrides)}")
+    return cards
+
+
+def get_scorecard(name: str) -> Dict:
+    global _loaded
+    if _loaded is None:
+        _loaded = load_scorecards()
+    return _loaded[name]
+
+
+def _condition(frame: pd.DataFrame, expr: str) -> np.ndarray:
+    result = frame.eval(expr, engine='python')
+    return np.asarray(result, dtype=bool)
+
+
+def _ladder(frame: pd.DataFrame, ladder: List[List], default):
+    """First matching condition's value per row (an if/elif chain over whole columns)"""
+    conditions, values = [], []
+    for expr, value in ladder:
+        if expr == 'else':
+            default = value
+            break
+        conditions.append(_condition(frame, expr))
+        values.append(value)
+    if not conditions:
+        return np.full(len(frame), default)
+    return np.select(conditions, values, default=default)
+
+
+def apply_scorecard(df: pd.DataFrame, name: str, card: Optional[Dict] = None) -> pd.DataFrame:
+    """
+    Add the scorecard's score and label columns to a per-ticker frame (one
+    row per ticker) and drop its raw input columns.
+    """
+    card = card or get_scorecard(name)
+    inputs = card.get('inputs', [])
+    frame = df.copy()
+    for col in inputs:
+        frame[col] = pd.to_numeric(frame[col], errors='coerce') if col in frame.columns else np.nan
+
+    if frame.empty:
+        for col in [card['score']] + list(card.get('labels', {})):
+            frame[col] = pd.Series(dtype=object)
+        return frame.drop(columns=inputs)
+
+    if 'weights' in card:
+        score = None
+        for col, weight in card['weights'].items():
+            term = frame[col].to_numpy(dtype='float64') * weight
+            score = term if score is None else score + term
+    else:
+        score = np.full(len(frame), card.get('base', 50))
+        for ladder in card.get('rules', []):
+            score = score + _ladder(frame, ladder, 0)
+        score = np.clip(score, 0, 100)
+    frame[card['score']] = score
+
+    for col, ladder in card.get('labels', {}).items():
+        frame[col] = _ladder(frame, ladder, None)
+    return frame.drop(columns=inputs)
+
+
+def main():
+    """Main execution"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Table-driven scoring rules')
+    parser.add_argument('--dump', action='store_true', help='Print the active scorecards as JSON')
+    parser.add_argument('--rules', default=None, help='Override file (default: SCORING_RULES)')
+    args = parser.parse_args()
+
+    cards = load_scorecards(args.rules)
+    if args.dump:
+        print(json.dumps(cards, indent=2, ensure_ascii=False))
+        return
+    for name, card in cards.items():
+        kind = 'weighted' if 'weights' in card else f"{len(card.get('rules', []))} ladders"
+        print(f"   {name:<20} {card['score']:<22} {kind:<12} labels: {', '.join(card.get('labels', {})) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
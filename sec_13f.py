@@ -0,0 +1,838 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SEC EDGAR 13F Holdings Ingestion
+Form 13F-HR information tables of the tracked institutions, stored per
+quarter and diffed quarter over quarter.
+
+Sources:
+    EDGAR filings   data.sec.gov/submissions/CIK##########.json lists a filer's
+                    13F-HR(/A) filings; each filing's information table XML
+                    is streamed with iterparse (elements are cleared as read)
+    bulk data sets  SEC "Form 13F data sets" zips (SUBMISSION / COVERPAGE /
+                    INFOTABLE.tsv) read in chunks, keeping only tracked filers
+
+Amendments: per filer and quarter the latest original or RESTATEMENT filing
+is used, plus any NEW HOLDINGS amendments filed after it. Values filed
+before 2023-01-03 were reported in thousands and are scaled to dollars.
+Positions are common-share lines (SH, no put/call) summed per CUSIP.
+
+Store layout:
+    holdings_13f/
+        _meta.json                       filings used per quarter and filer
+        quarter=2024Q3/part.parquet      cik, cusip, issuer, shares, value
+
+Filings only change in the window after each quarter (45-day deadline), so
+RefreshPolicy decides which filers' filing lists are worth checking on a
+given day; _meta.json records when each filer was last checked.
+
+CUSIPs are mapped to tickers at read time (cusip_tickers.csv, falling back
+to issuer-name matching), so a better index never needs a re-download.
+
+Network modes (SEC_EDGAR_MODE):
+    live     - fetch from EDGAR (default; SEC_USER_AGENT identifies you to the SEC)
+    record   - fetch and save every response under SEC_FIXTURE_DIR
+    replay   - fixtures only, fully offline (misses raise CacheMissError)
+    off      - no ingestion, analyze what is already stored
+
+Offline demo against the synthetic universe:
+    python sec_13f.py --synthetic-fixtures && SEC_EDGAR_MODE=replay python sec_13f.py --update
+"""
+
+import os
+import re
+import json
+import shutil
+import hashlib
+import zipfile
+import logging
+import numpy as np
+import pandas as pd
+import requests
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+from xml.sax.saxutils import escape
+from typing import BinaryIO, Dict, Iterable, List, Optional, Set, Tuple
+from fetch_engine import FetchEngine, ThrottledError
+
+# Logging Configuration
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+MODES = ('off', 'live', 'record', 'replay')
+
+SUBMISSIONS_URL = 'https://data.sec.gov/submissions/CIK{cik}.json'
+ARCHIVES_URL = 'https://www.sec.gov/Archives/edgar/data/{cik}/{accession}'
+
+FORMS = ('13F-HR', '13F-HR/A')
+# Form 13F is due 45 days after each calendar quarter
+FILING_DEADLINE_DAYS = 45
+# First filing date with VALUE reported in dollars instead of thousands
+DOLLAR_VALUES_FROM = pd.Timestamp('2023-01-03')
+
+POSITION_COLUMNS = ['cik', 'cusip', 'issuer', 'shares', 'value']
+LINE_FIELDS = {
+    'nameOfIssuer': 'issuer',
+    'titleOfClass': 'title',
+    'cusip': 'cusip',
+    'value': 'value',
+    'sshPrnamt': 'shares',
+    'sshPrnamtType': 'share_type',
+    'putCall': 'put_call',
+}
+
+# Trailing words dropped before matching issuer names to company names
+NAME_SUFFIXES = {
+    'INC', 'INCORPORATED', 'CORP', 'CORPORATION', 'CO', 'COMPANY', 'LTD', 'LIMITED', 'PLC',
+    'HOLDINGS', 'HLDGS', 'HOLDING', 'GROUP', 'GRP', 'THE', 'SA', 'NV', 'AG', 'LP', 'LLC',
+    'CL', 'CLASS', 'A', 'B', 'C', 'COM', 'NEW', 'DEL', 'SHS', 'ORD',
+}
+
+
+class CacheMissError(LookupError):
+    """Raised in replay mode when a response was never recorded"""
+
+
+def edgar_mode() -> str:
+    mode = os.getenv('SEC_EDGAR_MODE', 'live').lower()
+    if mode not in MODES:
+        raise ValueError(f"SEC_EDGAR_MODE must be one of {MODES}, got {mode!r}")
+    return mode
+
+
+def fixture_dir() -> str:
+    return os.getenv('SEC_FIXTURE_DIR', os.path.join(os.getenv('DATA_DIR', '.'), '.sec_fixtures'))
+
+
+def quarter_label(day) -> str:
+    """Report period -> '2024Q3'"""
+    day = pd.Timestamp(day)
+    return f'{day.year}Q{(day.month - 1) // 3 + 1}'
+
+
+def previous_quarter(label: str) -> str:
+    year, q = int(label[:4]), int(label[-1])
+    return f'{year - 1}Q4' if q == 1 else f'{year}Q{q - 1}'
+
+
+def quarter_end(label: str) -> pd.Timestamp:
+    return pd.Period(label, freq='Q').end_time.normalize()
+
+
+def normalize_name(name) -> str:
+    """'APPLE INC COM' / 'Apple Inc.' -> 'APPLE'"""
+    words = re.sub(r'[^A-Z0-9 ]', ' ', str(name).upper().replace('&', ' AND ')).split()
+    while len(words) > 1 and words[-1] in NAME_SUFFIXES:
+        words.pop()
+    return ' '.join(words)
+
+
+def cusip_check_digit(base: str) -> str:
+    """Check digit of an 8-character CUSIP base (modulus 10, double-add-double)"""
+    total = 0
+    for i, ch in enumerate(base.upper()):
+        if ch.isdigit():
+            v = int(ch)
+        elif ch.isalpha():
+            v = ord(ch) - ord('A') + 10
+        else:
+            v = {'*': 36, '@': 37, '#': 38}[ch]
+        if i % 2:
+            v *= 2
+        total += v // 10 + v % 10
+    return str((10 - total % 10) % 10)
+
+
+# ----------------------------------------------------------------------
+# Parsers
+# ----------------------------------------------------------------------
+def _local(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1].split(':')[-1]
+
+
+def parse_information_table(source: BinaryIO) -> pd.DataFrame:
+    """
+    Stream a 13F information table XML into one row per holding line
+    (issuer, title, cusip, value, shares, share_type, put_call).
+    Only the current infoTable element is held in memory.
+    """
+    columns = {col: [] for col in LINE_FIELDS.values()}
+    line: Dict[str, str] = {}
+    for event, elem in ET.iterparse(source, events=('end',)):
+        tag = _local(elem.tag)
+        if tag in LINE_FIELDS:
+            line[LINE_FIELDS[tag]] = (elem.text or '').strip()
+        elif tag == 'infoTable':
+            for col, values in columns.items():
+                values.append(line.get(col, ''))
+            line = {}
+            elem.clear()
+    df = pd.DataFrame(columns)
+    df['value'] = pd.to_numeric(df['value'], errors='coerce').fillna(0).astype('int64')
+    df['shares'] = pd.to_numeric(df['shares'], errors='coerce').fillna(0).astype('int64')
+    return df
+
+
+def parse_cover_page(source: BinaryIO) -> Dict[str, str]:
+    """Filing manager name and amendment type from a 13F primary_doc.xml"""
+    fields = {'name': '', 'amendment_type': ''}
+    in_manager = False
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        tag = _local(elem.tag)
+        if tag == 'filingManager':
+            in_manager = event == 'start'
+        elif event == 'end' and tag == 'name' and in_manager and not fields['name']:
+            fields['name'] = (elem.text or '').strip()
+        elif event == 'end' and tag == 'amendmentType':
+            fields['amendment_type'] = (elem.text or '').strip().upper()
+    return fields
+
+
+def select_filings(filings: pd.DataFrame, quarters: int) -> pd.DataFrame:
+    """
+    Filings that make up each filer's holdings in its latest `quarters`
+    report periods: the latest original/RESTATEMENT filing per quarter plus
+    NEW HOLDINGS amendments filed after it
+    """
+    if filings.empty:
+        return filings.assign(quarter=pd.Series(dtype=str))
+    f = filings.copy()
+    f['quarter'] = f['period'].map(quarter_label)
+    ranks = f[['cik', 'quarter']].drop_duplicates().sort_values(['cik', 'quarter'], ascending=[True, False])
+    ranks = ranks[ranks.groupby('cik').cumcount() < quarters]
+    f = f.merge(ranks, on=['cik', 'quarter']).sort_values(['cik', 'quarter', 'filed', 'accession'])
+
+    keys = [f['cik'], f['quarter']]
+    replaces = f['amendment_type'] != 'NEW HOLDINGS'
+    rank = f.groupby(keys).cumcount()
+    base_rank = rank.where(replaces).groupby(keys).transform('max')
+    base = rank == base_rank
+    additions = ~replaces & ((rank > base_rank) | base_rank.isna())
+    return f[base | additions].reset_index(drop=True)
+
+
+def filing_positions(lines: pd.DataFrame, filed: pd.Timestamp) -> pd.DataFrame:
+    """Common-share positions per CUSIP from a filing's holding lines (value in dollars)"""
+    keep = (lines['share_type'].str.upper() == 'SH') & (lines['put_call'] == '')
+    lines = lines[keep]
+    if pd.Timestamp(filed) < DOLLAR_VALUES_FROM:
+        lines = lines.assign(value=lines['value'] * 1000)
+    lines = lines.assign(cusip=lines['cusip'].str.upper())
+    return lines.groupby('cusip', sort=True).agg(
+        issuer=('issuer', 'first'), shares=('shares', 'sum'), value=('value', 'sum')
+    ).reset_index()
+
+
+# ----------------------------------------------------------------------
+# EDGAR client
+# ----------------------------------------------------------------------
+class EdgarClient:
+    """EDGAR HTTP access with fixture record/replay (see SEC_EDGAR_MODE)"""
+
+    def __init__(self, user_agent: Optional[str] = None, mode: Optional[str] = None,
+                 fixtures: Optional[str] = None):
+        self.mode = mode or edgar_mode()
+        self.fixtures = fixtures or fixture_dir()
+        self.user_agent = user_agent or os.getenv('SEC_USER_AGENT', 'StockAnalysis/1.0 (contact@example.com)')
+        self.session = requests.Session()
+
+    @property
+    def rate_limited(self) -> bool:
+        return self.mode in ('live', 'record')
+
+    def fixture_path(self, url: str) -> str:
+        host, path = re.match(r'https?://([^/]+)/(.*)', url).groups()
+        return os.path.join(self.fixtures, host, *path.split('/'))
+
+    def _fetch(self, url: str) -> requests.Response:
+        response = self.session.get(url, headers={'User-Agent': self.user_agent,
+                                                  'Accept-Encoding': 'gzip, deflate'},
+                                    stream=True, timeout=60)
+        if response.status_code == 429:
+            raise ThrottledError(f"SEC rate limit: {url}")
+        response.raise_for_status()
+        response.raw.decode_content = True
+        return response
+
+    def open(self, url: str) -> BinaryIO:
+        """Binary stream of a response (caller closes it)"""
+        path = self.fixture_path(url)
+        if self.mode == 'replay':
+            if not os.path.exists(path):
+                raise CacheMissError(f"No recorded fixture for {url}")
+            return open(path, 'rb')
+        if self.mode == 'record':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_file = f'{path}.{os.getpid()}.tmp'
+            with self._fetch(url) as response, open(tmp_file, 'wb') as f:
+                shutil.copyfileobj(response.raw, f, 1 << 20)
+            os.replace(tmp_file, path)
+            return open(path, 'rb')
+        return self._fetch(url).raw
+
+    def get_json(self, url: str) -> Dict:
+        with self.open(url) as f:
+            return json.load(f)
+
+
+# ----------------------------------------------------------------------
+# CUSIP index
+# ----------------------------------------------------------------------
+class CusipIndex:
+    """CUSIP -> ticker from cusip_tickers.csv, with issuer-name matching as fallback"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.by_cusip: Dict[str, str] = {}
+        self.by_name: Dict[str, str] = {}
+        if path and os.path.exists(path):
+            df = pd.read_csv(path, dtype=str).dropna(subset=['cusip', 'ticker'])
+            self.by_cusip = dict(zip(df['cusip'].str.upper().str.strip(), df['ticker'].str.strip()))
+
+    def __len__(self) -> int:
+        return len(self.by_cusip)
+
+    def add_names(self, names: Dict[str, str]) -> None:
+        """Register company names per ticker for name matching (ambiguous names are ignored)"""
+        seen: Dict[str, Set[str]] = {}
+        for ticker, name in names.items():
+            if name:
+                seen.setdefault(normalize_name(name), set()).add(ticker)
+        self.by_name = {key: next(iter(t)) for key, t in seen.items() if len(t) == 1 and key}
+
+    def lookup(self, cusips: pd.Series, issuers: Optional[pd.Series] = None) -> pd.Series:
+        """Ticker per row (NaN when neither the CUSIP nor the issuer name is known)"""
+        tickers = cusips.str.upper().map(self.by_cusip)
+        if issuers is not None and self.by_name:
+            missing = tickers.isna()
+            tickers[missing] = issuers[missing].map(normalize_name).map(self.by_name)
+        return tickers
+
+
+# ----------------------------------------------------------------------
+# Holdings store
+# ----------------------------------------------------------------------
+class HoldingsStore:
+    """Per-quarter Parquet files of 13F positions plus the filings they came from"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.meta_file = os.path.join(root, '_meta.json')
+
+    def exists(self) -> bool:
+        return os.path.exists(self.meta_file)
+
+    def _path(self, quarter: str) -> str:
+        return os.path.join(self.root, f'quarter={quarter}', 'part.parquet')
+
+    def load_meta(self) -> Dict:
+        try:
+            with open(self.meta_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'filings': {}}
+
+    def _save_meta(self, meta: Dict) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        tmp_file = f'{self.meta_file}.{os.getpid()}.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2, sort_keys=True)
+        os.replace(tmp_file, self.meta_file)
+
+    def filings(self) -> Dict[str, Dict[str, Dict]]:
+        """{quarter: {cik: {'name', 'accessions', 'filed'}}} of everything stored"""
+        return self.load_meta().get('filings', {})
+
+    def quarters(self) -> List[str]:
+        return sorted(self.filings())
+
+    def read(self, quarters: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Positions of the given quarters (default all) with a quarter column"""
+        frames = []
+        for quarter in (quarters or self.quarters()):
+            path = self._path(quarter)
+            if os.path.exists(path):
+                frames.append(pd.read_parquet(path).assign(quarter=quarter))
+        if not frames:
+            return pd.DataFrame(columns=POSITION_COLUMNS + ['quarter'])
+        return pd.concat(frames, ignore_index=True)
+
+    def replace_filers(self, quarter: str, positions: Dict[str, pd.DataFrame], filings: Dict[str, Dict]) -> None:
+        """Swap in the positions of the given filers for one quarter (other filers are kept)"""
+        path = self._path(quarter)
+        frames = [pd.read_parquet(path)] if os.path.exists(path) else []
+        if frames:
+            frames[0] = frames[0][~frames[0]['cik'].isin(list(positions))]
+        frames += [df.assign(cik=cik)[POSITION_COLUMNS] for cik, df in positions.items()]
+        df = pd.concat(frames, ignore_index=True).sort_values(['cik', 'cusip']).reset_index(drop=True)
+        df = df.astype({'cik': str, 'cusip': str, 'issuer': str, 'shares': 'int64', 'value': 'int64'})
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_file = f'{path}.{os.getpid()}.tmp'
+        df.to_parquet(tmp_file, index=False)
+        os.replace(tmp_file, path)
+
+        now = datetime.now().isoformat()
+        meta = self.load_meta()
+        meta.setdefault('filings', {}).setdefault(quarter, {}).update(
+            {cik: dict(f, ingested=now) for cik, f in filings.items()}
+        )
+        meta['updated'] = now
+        self._save_meta(meta)
+
+    def checked(self) -> Dict[str, str]:
+        """Last time each filer's filing list was checked (ISO timestamps)"""
+        return self.load_meta().get('checked', {})
+
+    def mark_checked(self, ciks: Iterable[str], when: Optional[datetime] = None) -> None:
+        meta = self.load_meta()
+        stamp = (when or datetime.now()).isoformat()
+        meta.setdefault('checked', {}).update({cik: stamp for cik in ciks})
+        self._save_meta(meta)
+
+    def last_ingested(self) -> Dict[str, pd.Timestamp]:
+        """Latest time any filing of each filer was ingested"""
+        out: Dict[str, pd.Timestamp] = {}
+        for filers in self.filings().values():
+            for cik, f in filers.items():
+                if f.get('ingested'):
+                    out[cik] = max(out.get(cik, pd.Timestamp.min), pd.Timestamp(f['ingested']))
+        return out
+
+
+# ----------------------------------------------------------------------
+# Position deltas
+# ----------------------------------------------------------------------
+def position_deltas(positions: pd.DataFrame, filed: Dict[str, Dict[str, Dict]]) -> pd.DataFrame:
+    """
+    Quarter-over-quarter change of every position of every filer, for each
+    filer's latest quarter against the quarter before (filers that did not
+    file both are left out). One outer join over all filers at once.
+    """
+    pairs = pd.DataFrame([(cik, q) for q, ciks in filed.items() for cik in ciks], columns=['cik', 'quarter'])
+    if pairs.empty:
+        return pd.DataFrame(columns=['cik', 'cusip', 'issuer', 'quarter', 'shares_prev', 'shares',
+                                     'value', 'delta', 'action'])
+    pairs = pairs.sort_values('quarter').groupby('cik').tail(1)
+    pairs['prev_quarter'] = pairs['quarter'].map(previous_quarter)
+    pairs = pairs[[cik in filed.get(prev, {}) for cik, prev in zip(pairs['cik'], pairs['prev_quarter'])]]
+
+    cur = positions.merge(pairs[['cik', 'quarter']], on=['cik', 'quarter'])
+    prev = positions.merge(pairs[['cik', 'prev_quarter']].rename(columns={'prev_quarter': 'quarter'}),
+                           on=['cik', 'quarter'])
+    m = cur[['cik', 'cusip', 'issuer', 'shares', 'value']].merge(
+        prev[['cik', 'cusip', 'issuer', 'shares']], on=['cik', 'cusip'], how='outer', suffixes=('', '_prev')
+    )
+    m['issuer'] = m['issuer'].fillna(m.pop('issuer_prev'))
+    m['quarter'] = m['cik'].map(dict(zip(pairs['cik'], pairs['quarter'])))
+    m['shares'] = m['shares'].fillna(0).astype('int64')
+    m['shares_prev'] = m['shares_prev'].fillna(0).astype('int64')
+    m['value'] = m['value'].fillna(0).astype('int64')
+    m['delta'] = m['shares'] - m['shares_prev']
+    m['action'] = np.select(
+        [(m['shares_prev'] == 0) & (m['shares'] > 0), (m['shares'] == 0) & (m['shares_prev'] > 0),
+         m['delta'] > 0, m['delta'] < 0],
+        ['new', 'exit', 'add', 'reduce'], default='hold'
+    )
+    return m[['cik', 'cusip', 'issuer', 'quarter', 'shares_prev', 'shares', 'value', 'delta', 'action']]
+
+
+def ticker_flows(deltas: pd.DataFrame, index: CusipIndex) -> pd.DataFrame:
+    """Per-ticker summary of the tracked institutions' latest quarterly moves"""
+    columns = ['ticker', 'quarter_13f', 'filers_13f', 'filers_buying', 'filers_selling',
+               'net_shares_13f', 'value_13f_m']
+    if deltas.empty:
+        return pd.DataFrame(columns=columns)
+    d = deltas.assign(ticker=index.lookup(deltas['cusip'], deltas['issuer'])).dropna(subset=['ticker'])
+    d = d.assign(holding=d['shares'] > 0,
+                 buying=d['action'].isin(['new', 'add']),
+                 selling=d['action'].isin(['reduce', 'exit']))
+    flows = d.groupby('ticker', sort=True).agg(
+        quarter_13f=('quarter', 'max'),
+        filers_13f=('holding', 'sum'),
+        filers_buying=('buying', 'sum'),
+        filers_selling=('selling', 'sum'),
+        net_shares_13f=('delta', 'sum'),
+        value_13f_m=('value', 'sum'),
+    ).reset_index()
+    flows['value_13f_m'] = (flows['value_13f_m'] / 1e6).round(1)
+    return flows[columns]
+
+
+# ----------------------------------------------------------------------
+# Refresh policy
+# ----------------------------------------------------------------------
+def filing_window(quarter: str, grace_days: Optional[int] = None) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """
+    (opens, closes) of a report quarter's 13F filing window: the day after
+    quarter end through the 45-day deadline plus SEC_13F_GRACE_DAYS for late
+    filers and deadline-day amendments (closes is exclusive)
+    """
+    if grace_days is None:
+        grace_days = int(os.getenv('SEC_13F_GRACE_DAYS', '5'))
+    end = quarter_end(quarter)
+    return end + timedelta(days=1), end + timedelta(days=FILING_DEADLINE_DAYS + grace_days + 1)
+
+
+def window_quarter(day) -> Optional[str]:
+    """Report quarter whose filing window contains day (None between windows)"""
+    quarter = previous_quarter(quarter_label(day))
+    opens, closes = filing_window(quarter)
+    return quarter if opens <= pd.Timestamp(day) < closes else None
+
+
+def due_quarter(day) -> str:
+    """Latest report quarter whose filing window has closed by day"""
+    quarter = previous_quarter(quarter_label(day))
+    return quarter if filing_window(quarter)[1] <= pd.Timestamp(day) else previous_quarter(quarter)
+
+
+class RefreshPolicy:
+    """
+    When a filer's EDGAR filing list is worth checking. Inside a filing
+    window, filers that have not filed for the window's quarter are checked
+    daily and the rest every SEC_13F_RECHECK_DAYS (amendments). Between
+    windows only late filers are rechecked, on the same interval; everyone
+    else waits for the next window to open.
+    """
+
+    def __init__(self, store: HoldingsStore, now: Optional[datetime] = None, recheck_days: Optional[int] = None):
+        self.store = store
+        self.now = pd.Timestamp(now or datetime.now())
+        self.recheck = timedelta(days=recheck_days or int(os.getenv('SEC_13F_RECHECK_DAYS', '7')))
+        self.in_window = window_quarter(self.now) is not None
+        self.target = window_quarter(self.now) or due_quarter(self.now)
+
+    def next_boundary(self) -> pd.Timestamp:
+        """Next time a filing window opens or closes"""
+        quarter = previous_quarter(quarter_label(self.now))
+        opens, closes = filing_window(quarter)
+        if self.now < closes:
+            return closes
+        return filing_window(quarter_label(self.now))[0]
+
+    def next_check(self, cik: str) -> pd.Timestamp:
+        """When cik's filing list is next due for a check"""
+        cik = str(cik).zfill(10)
+        checked = self.store.checked().get(cik)
+        if checked is None:
+            return self.now
+        checked = pd.Timestamp(checked)
+        has_target = cik in self.store.filings().get(self.target, {})
+        if self.in_window and not has_target:
+            return checked.normalize() + timedelta(days=1)
+        if self.in_window or not has_target:
+            return checked + self.recheck
+        return self.next_boundary()
+
+    def filers_to_check(self, ciks: Iterable[str]) -> List[str]:
+        return [str(c).zfill(10) for c in ciks if self.next_check(c) <= self.now]
+
+    def valid_until(self, ciks: Iterable[str]) -> pd.Timestamp:
+        """Until when stored holdings are as current as this policy needs them"""
+        return min([self.next_boundary()] + [self.next_check(c) for c in ciks])
+
+
+# ----------------------------------------------------------------------
+# Ingestion
+# ----------------------------------------------------------------------
+class ThirteenFIngestor:
+    """Download (or replay) the tracked filers' 13F filings into a HoldingsStore"""
+
+    def __init__(self, store: HoldingsStore, client: Optional[EdgarClient] = None,
+                 quarters: int = None, workers: Optional[int] = None):
+        self.store = store
+        self.client = client or EdgarClient()
+        self.quarters = quarters or int(os.getenv('SEC_13F_QUARTERS', '2'))
+        # SEC fair access: at most 10 requests per second
+        self.engine = FetchEngine(workers=workers or 4,
+                                  rate=float(os.getenv('SEC_RATE', '8')) if self.client.rate_limited else None)
+
+    def filer_filings(self, cik: str) -> Tuple[str, pd.DataFrame]:
+        """(filer name, 13F-HR filings with cik/accession/form/filed/period/amendment_type)"""
+        data = self.client.get_json(SUBMISSIONS_URL.format(cik=cik))
+        recent = data.get('filings', {}).get('recent', {})
+        f = pd.DataFrame({
+            'accession': recent.get('accessionNumber', []),
+            'form': recent.get('form', []),
+            'filed': pd.to_datetime(recent.get('filingDate', [])),
+            'period': pd.to_datetime(recent.get('reportDate', [])),
+        })
+        f = f[f['form'].isin(FORMS) & f['period'].notna()].assign(cik=cik, amendment_type='')
+        return data.get('name', ''), f.reset_index(drop=True)
+
+    def _archive(self, cik: str, accession: str) -> str:
+        return ARCHIVES_URL.format(cik=int(cik), accession=accession.replace('-', ''))
+
+    def filing_lines(self, cik: str, accession: str) -> pd.DataFrame:
+        """Holding lines of one filing (information table XML found through the filing index)"""
+        base = self._archive(cik, accession)
+        items = self.client.get_json(f'{base}/index.json')['directory']['item']
+        tables = [i['name'] for i in items if i['name'].lower().endswith('.xml') and i['name'] != 'primary_doc.xml']
+        if not tables:
+            return pd.DataFrame(columns=list(LINE_FIELDS.values()))
+        with self.client.open(f'{base}/{tables[0]}') as f:
+            return parse_information_table(f)
+
+    def amendment_type(self, cik: str, accession: str) -> str:
+        with self.client.open(f'{self._archive(cik, accession)}/primary_doc.xml') as f:
+            return parse_cover_page(f)['amendment_type']
+
+    def fetch_filer(self, cik: str) -> Dict[str, Tuple[pd.DataFrame, Dict]]:
+        """{quarter: (positions, filing meta)} for quarters whose filings changed since the last update"""
+        name, filings = self.filer_filings(cik)
+        quarters = filings['period'].map(quarter_label)
+        latest = sorted(set(quarters), reverse=True)[:self.quarters]
+        for idx in filings.index[(filings['form'] == '13F-HR/A') & quarters.isin(latest)]:
+            filings.at[idx, 'amendment_type'] = self.amendment_type(cik, filings.at[idx, 'accession'])
+
+        stored = self.store.filings()
+        updates = {}
+        for quarter, group in select_filings(filings, self.quarters).groupby('quarter'):
+            accessions = sorted(group['accession'])
+            if stored.get(quarter, {}).get(cik, {}).get('accessions') == accessions:
+                continue
+            positions = [filing_positions(self.filing_lines(cik, row.accession), row.filed)
+                         for row in group.itertuples()]
+            merged = pd.concat(positions, ignore_index=True).groupby('cusip', sort=True).agg(
+                issuer=('issuer', 'first'), shares=('shares', 'sum'), value=('value', 'sum')
+            ).reset_index()
+            updates[quarter] = (merged, {'name': name, 'accessions': accessions,
+                                         'filed': group['filed'].max().strftime('%Y-%m-%d')})
+        return updates
+
+    def update(self, ciks: Iterable[str]) -> int:
+        """Refresh the store for the given filers; returns the number of (filer, quarter) updates"""
+        ciks = [str(c).zfill(10) for c in ciks]
+        results = self.engine.map(self.fetch_filer, ciks, desc="Fetching 13F filings",
+                                  cost=lambda c: 1 + 2 * self.quarters)
+        by_quarter: Dict[str, Dict[str, Tuple[pd.DataFrame, Dict]]] = {}
+        for idx, (cik, updates) in enumerate(zip(ciks, results)):
+            if updates is None:
+                logger.warning(f"⚠️ 13F filings of CIK {cik} unavailable: {self.engine.failures.get(idx)}")
+                continue
+            for quarter, update in updates.items():
+                by_quarter.setdefault(quarter, {})[cik] = update
+
+        for quarter, updates in sorted(by_quarter.items()):
+            self.store.replace_filers(quarter, {c: u[0] for c, u in updates.items()},
+                                      {c: u[1] for c, u in updates.items()})
+        self.store.mark_checked([c for c, r in zip(ciks, results) if r is not None])
+        count = sum(len(u) for u in by_quarter.values())
+        logger.info(f"🏦 13F holdings: {count} filer-quarters updated for {len(ciks)} filers")
+        return count
+
+    def load_dataset(self, path: str, ciks: Iterable[str], chunksize: int = 500_000) -> int:
+        """
+        Ingest an SEC Form 13F data set (zip or extracted directory of
+        SUBMISSION/COVERPAGE/INFOTABLE.tsv). INFOTABLE is streamed in chunks
+        and only rows of the tracked filers' selected filings are kept.
+        """
+        ciks = {str(c).zfill(10) for c in ciks}
+
+        def table(name):
+            if os.path.isdir(path):
+                return open(os.path.join(path, name), 'rb')
+            # The member stream keeps the archive's file open after the ZipFile closes
+            with zipfile.ZipFile(path) as archive:
+                member = next(n for n in archive.namelist() if n.upper().endswith(name.upper()))
+                return archive.open(member)
+
+        with table('SUBMISSION.tsv') as f:
+            subs = pd.read_csv(f, sep='\t', dtype=str)
+        subs['CIK'] = subs['CIK'].str.zfill(10)
+        subs = subs[subs['CIK'].isin(ciks) & subs['SUBMISSIONTYPE'].isin(FORMS)]
+        with table('COVERPAGE.tsv') as f:
+            cover = pd.read_csv(f, sep='\t', dtype=str,
+                                usecols=['ACCESSION_NUMBER', 'AMENDMENTTYPE', 'FILINGMANAGER_NAME'])
+        subs = subs.merge(cover, on='ACCESSION_NUMBER', how='left')
+        filings = pd.DataFrame({
+            'accession': subs['ACCESSION_NUMBER'],
+            'form': subs['SUBMISSIONTYPE'],
+            'filed': pd.to_datetime(subs['FILING_DATE'], format='%d-%b-%Y'),
+            'period': pd.to_datetime(subs['PERIODOFREPORT'], format='%d-%b-%Y'),
+            'cik': subs['CIK'],
+            'amendment_type': subs['AMENDMENTTYPE'].fillna('').str.upper(),
+        })
+        names = dict(zip(subs['CIK'], subs['FILINGMANAGER_NAME'].fillna('')))
+        selected = select_filings(filings, self.quarters)
+        wanted = set(selected['accession'])
+
+        lines = []
+        usecols = ['ACCESSION_NUMBER', 'NAMEOFISSUER', 'TITLEOFCLASS', 'CUSIP', 'VALUE',
+                   'SSHPRNAMT', 'SSHPRNAMTTYPE', 'PUTCALL']
+        with table('INFOTABLE.tsv') as f:
+            for chunk in pd.read_csv(f, sep='\t', dtype=str, usecols=usecols, chunksize=chunksize):
+                chunk = chunk[chunk['ACCESSION_NUMBER'].isin(wanted)]
+                if not chunk.empty:
+                    lines.append(chunk)
+        infotable = pd.concat(lines, ignore_index=True) if lines else pd.DataFrame(columns=usecols)
+        infotable = pd.DataFrame({
+            'accession': infotable['ACCESSION_NUMBER'],
+            'issuer': infotable['NAMEOFISSUER'].fillna(''),
+            'title': infotable['TITLEOFCLASS'].fillna(''),
+            'cusip': infotable['CUSIP'].fillna(''),
+            'value': pd.to_numeric(infotable['VALUE'], errors='coerce').fillna(0).astype('int64'),
+            'shares': pd.to_numeric(infotable['SSHPRNAMT'], errors='coerce').fillna(0).astype('int64'),
+            'share_type': infotable['SSHPRNAMTTYPE'].fillna(''),
+            'put_call': infotable['PUTCALL'].fillna(''),
+        })
+
+        by_accession = dict(list(infotable.groupby('accession')))
+        empty = infotable.iloc[:0]
+        count = 0
+        for quarter, group in selected.groupby('quarter'):
+            positions, meta = {}, {}
+            for cik, filer in group.groupby('cik'):
+                parts = [filing_positions(by_accession.get(row.accession, empty), row.filed)
+                         for row in filer.itertuples()]
+                positions[cik] = pd.concat(parts, ignore_index=True).groupby('cusip', sort=True).agg(
+                    issuer=('issuer', 'first'), shares=('shares', 'sum'), value=('value', 'sum')
+                ).reset_index()
+                meta[cik] = {'name': names.get(cik, ''), 'accessions': sorted(filer['accession']),
+                             'filed': filer['filed'].max().strftime('%Y-%m-%d')}
+            self.store.replace_filers(quarter, positions, meta)
+            count += len(positions)
+        logger.info(f"🏦 13F data set {os.path.basename(path)}: {count} filer-quarters ingested")
+        return count
+
+
+# ----------------------------------------------------------------------
+# Synthetic fixtures
+# ----------------------------------------------------------------------
+def synthetic_cusip(ticker: str) -> str:
+    digest = hashlib.sha256(ticker.encode('utf-8')).hexdigest().upper()
+    base = ''.join(c for c in digest if c.isalnum())[:6] + '10'
+    return base + cusip_check_digit(base)
+
+
+def write_synthetic_fixtures(data_dir: str, ciks: Dict[str, str], quarters: int = 4,
+                             fixtures: Optional[str] = None, unmapped: float = 0.1, seed: int = 42) -> str:
+    """
+    Record EDGAR-shaped fixtures (submissions JSON, filing indexes, cover
+    pages, information tables) for the tickers in us_stocks_list.csv, plus a
+    cusip_tickers.csv that leaves `unmapped` of them to issuer-name matching.
+    Positions drift between quarters with entries and exits; the first filer
+    also files a NEW HOLDINGS amendment for the latest quarter.
+    """
+    fixtures = fixtures or os.path.join(data_dir, '.sec_fixtures')
+    tickers = pd.read_csv(os.path.join(data_dir, 'us_stocks_list.csv'))['ticker'].tolist()
+    end = pd.Timestamp(os.getenv('SYNTHETIC_END', datetime.now().strftime('%Y-%m-%d'))).normalize()
+    labels = [quarter_label(end - pd.DateOffset(months=3 * i)) for i in range(quarters + 2)]
+    # Only quarters whose filing deadline has passed
+    labels = sorted(q for q in labels if quarter_end(q) + timedelta(days=FILING_DEADLINE_DAYS) <= end)[-quarters:]
+
+    rng = np.random.default_rng(seed)
+    cusips = {t: synthetic_cusip(t) for t in tickers}
+    prices = dict(zip(tickers, rng.uniform(20, 400, len(tickers))))
+    mapped = [t for t in tickers if rng.random() >= unmapped]
+    client = EdgarClient(mode='replay', fixtures=fixtures)
+
+    def put(url, text):
+        path = client.fixture_path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def info_table(holdings):
+        rows = ''.join(
+            f"<infoTable><nameOfIssuer>{escape(t)} CORP</nameOfIssuer><titleOfClass>COM</titleOfClass>"
+            f"<cusip>{cusips[t]}</cusip><value>{int(s * prices[t])}</value>"
+            f"<shrsOrPrnAmt><sshPrnamt>{s}</sshPrnamt><sshPrnamtType>SH</sshPrnamtType></shrsOrPrnAmt>"
+            f"<investmentDiscretion>SOLE</investmentDiscretion></infoTable>"
+            for t, s in holdings.items()
+        )
+        return ('<?xml version="1.0" encoding="UTF-8"?>\n<informationTable '
+                f'xmlns="http://www.sec.gov/edgar/document/thirteenf/informationtable">{rows}</informationTable>\n')
+
+    def cover(name, quarter, amendment_type):
+        amendment = (f'<isAmendment>true</isAmendment><amendmentInfo><amendmentType>{amendment_type}'
+                     '</amendmentType></amendmentInfo>') if amendment_type else '<isAmendment>false</isAmendment>'
+        return ('<?xml version="1.0" encoding="UTF-8"?>\n<edgarSubmission xmlns="http://www.sec.gov/edgar/thirteenffiler">'
+                f'<formData><coverPage><reportCalendarOrQuarter>{quarter_end(quarter).strftime("%m-%d-%Y")}'
+                f'</reportCalendarOrQuarter>{amendment}<filingManager><name>{escape(name)}</name></filingManager>'
+                '</coverPage></formData></edgarSubmission>\n')
+
+    for n, (cik, name) in enumerate(sorted(ciks.items())):
+        cik = str(cik).zfill(10)
+        held = {t: int(rng.lognormal(13, 1.5)) for t in tickers if rng.random() < 0.4}
+        recent = {'accessionNumber': [], 'filingDate': [], 'reportDate': [], 'form': [], 'primaryDocument': []}
+        filings = []
+        for i, quarter in enumerate(labels):
+            if i:
+                held = {t: max(1, int(s * rng.lognormal(0, 0.2))) for t, s in held.items() if rng.random() >= 0.1}
+                held.update({t: int(rng.lognormal(13, 1.5)) for t in tickers if t not in held and rng.random() < 0.05})
+            filed = quarter_end(quarter) + timedelta(days=int(rng.integers(20, 46)))
+            filings.append(('13F-HR', quarter, filed, dict(held), ''))
+            if n == 0 and quarter == labels[-1]:
+                extra = {t: int(rng.lognormal(12, 1)) for t in tickers if t not in held}
+                extra = dict(list(extra.items())[:2])
+                filings.append(('13F-HR/A', quarter, min(filed + timedelta(days=7), end), extra, 'NEW HOLDINGS'))
+
+        for seq, (form, quarter, filed, holdings, amendment_type) in enumerate(filings, 1):
+            accession = f'{cik}-{filed.strftime("%y")}-{seq:06d}'
+            archive = ARCHIVES_URL.format(cik=int(cik), accession=accession.replace('-', ''))
+            put(f'{archive}/index.json', json.dumps({'directory': {'name': archive, 'item': [
+                {'name': 'primary_doc.xml', 'type': 'text/xml'}, {'name': 'infotable.xml', 'type': 'text/xml'}
+            ]}}))
+            put(f'{archive}/primary_doc.xml', cover(name, quarter, amendment_type))
+            put(f'{archive}/infotable.xml', info_table(holdings))
+            recent['accessionNumber'].insert(0, accession)
+            recent['filingDate'].insert(0, filed.strftime('%Y-%m-%d'))
+            recent['reportDate'].insert(0, quarter_end(quarter).strftime('%Y-%m-%d'))
+            recent['form'].insert(0, form)
+            recent['primaryDocument'].insert(0, 'xslForm13F_X02/primary_doc.xml')
+        put(SUBMISSIONS_URL.format(cik=cik), json.dumps({'cik': str(int(cik)), 'name': name,
+                                                          'filings': {'recent': recent}}))
+
+    pd.DataFrame({'cusip': [cusips[t] for t in mapped], 'ticker': mapped}).to_csv(
+        os.path.join(data_dir, 'cusip_tickers.csv'), index=False)
+    logger.info(f"🧪 Synthetic 13F fixtures for {len(ciks)} filers x {len(labels)} quarters in {fixtures}")
+    return fixtures
+
+
+def main():
+    """Main execution"""
+    import argparse
+    from analyze_13f import SEC13FAnalyzer
+
+    parser = argparse.ArgumentParser(description='SEC 13F holdings ingestion')
+    parser.add_argument('--dir', default=os.getenv('DATA_DIR', '.'), help='Data directory')
+    parser.add_argument('--update', action='store_true', help='Fetch new filings of the tracked institutions')
+    parser.add_argument('--dataset', default=None, help='Ingest a Form 13F data set (zip or directory)')
+    parser.add_argument('--quarters', type=int, default=None, help='Report periods kept per filer (default: SEC_13F_QUARTERS or 2)')
+    parser.add_argument('--synthetic-fixtures', action='store_true',
+                        help='Write replayable fixtures for the synthetic universe in --dir')
+    args = parser.parse_args()
+
+    analyzer = SEC13FAnalyzer(data_dir=args.dir)
+    institutions = analyzer.major_institutions
+    if args.synthetic_fixtures:
+        write_synthetic_fixtures(args.dir, institutions, quarters=max(args.quarters or 4, 2))
+        return
+
+    ingestor = ThirteenFIngestor(analyzer.holdings, quarters=args.quarters)
+    if args.dataset:
+        ingestor.load_dataset(args.dataset, institutions)
+    if args.update:
+        ingestor.update(institutions)
+
+    filed = analyzer.holdings.filings()
+    print(f"🏦 {analyzer.holdings.root}: quarters {', '.join(sorted(filed)) or '-'}")
+    for quarter in sorted(filed):
+        for cik, meta in sorted(filed[quarter].items()):
+            print(f"   {quarter} {cik} {meta['name'][:36]:<36} filed {meta['filed']} ({len(meta['accessions'])} filings)")
+
+    flows = analyzer.thirteenf_flows()
+    if not flows.empty:
+        print("\n📈 Most institutions adding (latest quarter over quarter):")
+        for _, row in flows.sort_values(['filers_buying', 'net_shares_13f'], ascending=False).head(10).iterrows():
+            print(f"   {row['ticker']:<6} {row['quarter_13f']} +{row['filers_buying']} / -{row['filers_selling']} "
+                  f"of {row['filers_13f']} holders, net {row['net_shares_13f']:+,} shares")
+
+
+if __name__ == "__main__":
+    main()
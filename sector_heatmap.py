@@ -7,10 +7,13 @@ Sector Performance Heatmap Data Collector
 import os
 import json
 import pandas as pd
-import yfinance as yf
 from datetime import datetime
 from typing import Dict, List
 import logging
+from market_data import get_provider
+from price_store import PriceStore
+from price_panel import PricePanel
+from artifacts import ArtifactManifest
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -19,7 +22,12 @@ logger = logging.getLogger(__name__)
 class SectorHeatmapCollector:
     """Collect sector ETF performance data for heatmap visualization"""
     
-    def __init__(self):
+    def __init__(self, data_dir: str = '.'):
+        self.provider = get_provider()
+        # Daily bars come from the shared price store (stocks and sector ETFs)
+        self.store = PriceStore(os.path.join(data_dir, 'price_store'))
+        self.panel = PricePanel(os.path.join(data_dir, 'price_panel'))
+        
         # Sector ETFs with full names
         self.sector_etfs = {
             'XLK': {'name': 'Technology', 'color': '#4A90A4'},
@@ -62,16 +70,18 @@ class SectorHeatmapCollector:
                 ticker_to_sector[stock] = sector
                 
         try:
-            data = yf.download(all_tickers, period=period, progress=False)
+            # Store copy; tickers it does not hold come in one batched download
+            histories = self.panel.histories(self.store, all_tickers, period, provider=self.provider)
             
-            if data.empty: return {'error': 'No data'}
+            if not histories: return {'error': 'No data'}
             
             market_map = {name: [] for name in self.sector_stocks.keys()}
             
             for ticker in all_tickers:
                 try:
-                    if ticker not in data['Close'].columns: continue
-                    prices = data['Close'][ticker].dropna()
+                    if ticker not in histories: continue
+                    hist = histories[ticker]
+                    prices = hist['Close'].dropna()
                     if len(prices) < 2: continue
                     
                     current = prices.iloc[-1]
@@ -79,7 +89,7 @@ class SectorHeatmapCollector:
                     change = ((current / prev) - 1) * 100
                     
                     # Weight by Volume * Price (Activity proxy)
-                    vol = data['Volume'][ticker].iloc[-1] if 'Volume' in data.columns else 100000
+                    vol = hist['Volume'].iloc[-1] if 'Volume' in hist.columns else 100000
                     weight = current * vol
                     
                     sector = ticker_to_sector.get(ticker, 'Unknown')
@@ -122,8 +132,8 @@ class SectorHeatmapCollector:
     def save_data(self, output_dir: str = '.'):
         data = self.get_full_market_map('5d')
         output_file = os.path.join(output_dir, 'sector_heatmap.json')
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        ArtifactManifest(output_dir).write_json(data, output_file, stage='sector_heatmap',
+                                                inputs=[self.store.meta_file], ensure_ascii=False)
         logger.info(f"✅ Saved to {output_file}")
 
 
@@ -13,11 +13,16 @@ Comprehensive analysis combining:
 import os
 import pandas as pd
 import numpy as np
-import yfinance as yf
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
-from tqdm import tqdm
+from fetch_engine import default_engine, is_throttled
+from market_data import get_provider
+from ticker_info import get_ticker_info_cache
+from artifacts import ArtifactManifest
+from scoring import apply_scorecard
+from price_store import PriceStore
+from price_panel import PricePanel
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -28,6 +33,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Trading sessions each per-ticker analysis reads (the provider periods they
+# replace: 6mo / 3mo). The price store read is limited to the longest window.
+LOOKBACK_BARS = {'technical': 126, 'relative_strength': 63}
+PROVIDER_PERIODS = {'technical': '6mo', 'relative_strength': '3mo'}
+
 
 class EnhancedSmartMoneyScreener:
     """
@@ -39,15 +49,22 @@ class EnhancedSmartMoneyScreener:
     5. Relative Strength
     """
     
-    def __init__(self, data_dir: str = '.'):
+    def __init__(self, data_dir: str = '.', workers: Optional[int] = None):
         self.data_dir = data_dir
+        self.provider = get_provider()
+        self.info_cache = get_ticker_info_cache()
+        self.engine = default_engine(workers, rate_limited=self.provider.rate_limited)
         self.output_file = os.path.join(data_dir, 'smart_money_picks_v2.csv')
+        self.manifest = ArtifactManifest(data_dir)
+        self.store = PriceStore(os.path.join(data_dir, 'price_store'))
+        self.panel = PricePanel(os.path.join(data_dir, 'price_panel'))
         
         # Load analysis data
         self.volume_df = None
         self.holdings_df = None
         self.etf_df = None
         self.prices_df = None
+        self.price_history: Dict[str, pd.DataFrame] = {}
         
         # Cache for yfinance data
         self.yf_cache = {}
@@ -81,10 +98,9 @@ class EnhancedSmartMoneyScreener:
             if os.path.exists(etf_file):
                 self.etf_df = pd.read_csv(etf_file)
             
-            # Load SPY for relative strength
+            # Load SPY for relative strength (reference ETF in the shared price store)
             logger.info("📈 Loading SPY benchmark data...")
-            spy = yf.Ticker("SPY")
-            self.spy_data = spy.history(period="3mo")
+            self.spy_data = self.panel.histories(self.store, ['SPY'], '3mo', provider=self.provider).get('SPY')
             
             return True
             
@@ -92,11 +108,30 @@ class EnhancedSmartMoneyScreener:
             logger.error(f"❌ Error loading data: {e}")
             return False
     
+    def load_prices(self, tickers: List[str]) -> None:
+        """Preload the declared lookback window of the candidates from the price store (one windowed read)"""
+        if not self.store.exists():
+            return
+        bars = max(LOOKBACK_BARS.values())
+        self.prices_df = self.store.read(tickers=tickers, lookback=bars, columns=['current_price', 'volume'])
+        self.price_history = {
+            ticker: pd.DataFrame({'Close': g['current_price'].to_numpy(dtype='float64'),
+                                  'Volume': g['volume'].to_numpy()}, index=pd.DatetimeIndex(g['date']))
+            for ticker, g in self.prices_df.groupby('ticker', observed=True, sort=False)
+        }
+        logger.info(f"📂 Loaded last {bars} sessions for {len(self.price_history)} tickers from {self.store.root}")
+    
+    def get_history(self, ticker: str, analysis: str) -> pd.DataFrame:
+        """Last LOOKBACK_BARS[analysis] bars from the price store, or the provider for tickers not stored"""
+        stored = self.price_history.get(ticker)
+        if stored is not None:
+            return stored.tail(LOOKBACK_BARS[analysis])
+        return self.provider.history(ticker, period=PROVIDER_PERIODS[analysis])
+    
     def get_technical_analysis(self, ticker: str) -> Dict:
         """Calculate technical indicators"""
         try:
-            stock = yf.Ticker(ticker)
-            hist = stock.history(period="6mo")
+            hist = self.get_history(ticker, 'technical')
             
             if len(hist) < 50:
                 return self._default_technical()
@@ -147,38 +182,6 @@ class EnhancedSmartMoneyScreener:
             else:
                 cross_signal = "None"
             
-            # Technical Score (0-100)
-            tech_score = 50
-            
-            # RSI contribution
-            if 40 <= current_rsi <= 60:
-                tech_score += 10  # Neutral zone - room to move
-            elif current_rsi < 30:
-                tech_score += 15  # Oversold - potential bounce
-            elif current_rsi > 70:
-                tech_score -= 5   # Overbought
-            
-            # MACD contribution
-            if macd_hist_current > 0 and macd_histogram.iloc[-2] < 0:
-                tech_score += 15  # Bullish crossover
-            elif macd_hist_current > 0:
-                tech_score += 8
-            elif macd_hist_current < 0:
-                tech_score -= 5
-            
-            # MA contribution
-            if ma_signal == "Bullish":
-                tech_score += 15
-            elif ma_signal == "Bearish":
-                tech_score -= 10
-            
-            if cross_signal == "Golden Cross":
-                tech_score += 10
-            elif cross_signal == "Death Cross":
-                tech_score -= 15
-            
-            tech_score = max(0, min(100, tech_score))
-            
             return {
                 'rsi': round(current_rsi, 1),
                 'macd': round(macd_current, 3),
@@ -188,24 +191,27 @@ class EnhancedSmartMoneyScreener:
                 'ma50': round(ma50, 2),
                 'ma_signal': ma_signal,
                 'cross_signal': cross_signal,
-                'technical_score': tech_score
+                # Raw inputs of the technical scorecard (see scoring.py)
+                'rsi_value': current_rsi,
+                'macd_hist_value': macd_hist_current,
+                'macd_hist_prev': macd_histogram.iloc[-2]
             }
             
         except Exception as e:
+            if is_throttled(e):
+                raise
             return self._default_technical()
     
     def _default_technical(self) -> Dict:
         return {
             'rsi': 50, 'macd': 0, 'macd_signal': 0, 'macd_histogram': 0,
-            'ma20': 0, 'ma50': 0, 'ma_signal': 'Unknown', 'cross_signal': 'None',
-            'technical_score': 50
+            'ma20': 0, 'ma50': 0, 'ma_signal': 'Unknown', 'cross_signal': 'None'
         }
     
     def get_fundamental_analysis(self, ticker: str) -> Dict:
         """Get fundamental/valuation metrics"""
         try:
-            stock = yf.Ticker(ticker)
-            info = stock.info
+            info = self.info_cache.info(ticker, ['fundamentals'])
             
             # Valuation
             pe_ratio = info.get('trailingPE', 0) or 0
@@ -226,51 +232,6 @@ class EnhancedSmartMoneyScreener:
             # Dividend
             dividend_yield = info.get('dividendYield', 0) or 0
             
-            # Fundamental Score (0-100)
-            fund_score = 50
-            
-            # P/E contribution (lower is better, but not too low)
-            if 0 < pe_ratio < 15:
-                fund_score += 15
-            elif 15 <= pe_ratio < 25:
-                fund_score += 10
-            elif pe_ratio > 40:
-                fund_score -= 10
-            elif pe_ratio < 0:  # Negative earnings
-                fund_score -= 15
-            
-            # Growth contribution
-            if revenue_growth > 0.2:
-                fund_score += 15
-            elif revenue_growth > 0.1:
-                fund_score += 10
-            elif revenue_growth > 0:
-                fund_score += 5
-            elif revenue_growth < 0:
-                fund_score -= 10
-            
-            # ROE contribution
-            if roe > 0.2:
-                fund_score += 10
-            elif roe > 0.1:
-                fund_score += 5
-            elif roe < 0:
-                fund_score -= 10
-            
-            fund_score = max(0, min(100, fund_score))
-            
-            # Size category
-            if market_cap > 200e9:
-                size = "Mega Cap"
-            elif market_cap > 10e9:
-                size = "Large Cap"
-            elif market_cap > 2e9:
-                size = "Mid Cap"
-            elif market_cap > 300e6:
-                size = "Small Cap"
-            else:
-                size = "Micro Cap"
-            
             return {
                 'pe_ratio': round(pe_ratio, 2) if pe_ratio else 'N/A',
                 'forward_pe': round(forward_pe, 2) if forward_pe else 'N/A',
@@ -280,27 +241,30 @@ class EnhancedSmartMoneyScreener:
                 'profit_margin': round(profit_margin * 100, 1) if profit_margin else 0,
                 'roe': round(roe * 100, 1) if roe else 0,
                 'market_cap_b': round(market_cap / 1e9, 1),
-                'size': size,
                 'dividend_yield': round(dividend_yield * 100, 2) if dividend_yield else 0,
-                'fundamental_score': fund_score
+                # Raw inputs of the fundamental scorecard (see scoring.py)
+                'pe_value': pe_ratio,
+                'revenue_growth_value': revenue_growth,
+                'roe_value': roe,
+                'market_cap': market_cap
             }
             
         except Exception as e:
+            if is_throttled(e):
+                raise
             return self._default_fundamental()
     
     def _default_fundamental(self) -> Dict:
         return {
             'pe_ratio': 'N/A', 'forward_pe': 'N/A', 'pb_ratio': 'N/A',
             'revenue_growth': 0, 'earnings_growth': 0, 'profit_margin': 0,
-            'roe': 0, 'market_cap_b': 0, 'size': 'Unknown', 'dividend_yield': 0,
-            'fundamental_score': 50
+            'roe': 0, 'market_cap_b': 0, 'dividend_yield': 0
         }
     
     def get_analyst_ratings(self, ticker: str) -> Dict:
         """Get analyst consensus and target price"""
         try:
-            stock = yf.Ticker(ticker)
-            info = stock.info
+            info = self.info_cache.info(ticker, ['profile', 'analyst'])
             
             # Get company name
             company_name = info.get('longName', '') or info.get('shortName', '') or ticker
@@ -318,54 +282,37 @@ class EnhancedSmartMoneyScreener:
             else:
                 upside = 0
             
-            # Analyst Score (0-100)
-            analyst_score = 50
-            
-            # Recommendation contribution
-            rec_map = {
-                'strongBuy': 25, 'buy': 20, 'hold': 0,
-                'sell': -15, 'strongSell': -25
-            }
-            analyst_score += rec_map.get(recommendation, 0)
-            
-            # Upside contribution
-            if upside > 30: analyst_score += 20
-            elif upside > 20: analyst_score += 15
-            elif upside > 10: analyst_score += 10
-            elif upside > 0: analyst_score += 5
-            elif upside < -10: analyst_score -= 15
-            
-            analyst_score = max(0, min(100, analyst_score))
-            
             return {
                 'company_name': company_name,
                 'current_price': round(current_price, 2),
                 'target_price': round(target_price, 2) if target_price else 'N/A',
                 'upside_pct': round(upside, 1),
                 'recommendation': recommendation,
-                'analyst_score': analyst_score
+                # Raw input of the analyst scorecard (see scoring.py)
+                'upside_value': upside
             }
             
         except Exception as e:
+            if is_throttled(e):
+                raise
             return self._default_analyst()
             
     def _default_analyst(self) -> Dict:
         return {
             'company_name': '', 'current_price': 0, 'target_price': 'N/A',
-            'upside_pct': 0, 'recommendation': 'none', 'analyst_score': 50
+            'upside_pct': 0, 'recommendation': 'none'
         }
     
     def get_relative_strength(self, ticker: str) -> Dict:
         """Calculate relative strength vs S&P 500"""
         try:
             if self.spy_data is None or len(self.spy_data) < 20:
-                return {'rs_20d': 0, 'rs_60d': 0, 'rs_score': 50}
+                return self._default_relative_strength()
             
-            stock = yf.Ticker(ticker)
-            hist = stock.history(period="3mo")
+            hist = self.get_history(ticker, 'relative_strength')
             
             if len(hist) < 20:
-                return {'rs_20d': 0, 'rs_60d': 0, 'rs_score': 50}
+                return self._default_relative_strength()
             
             # Calculate returns
             stock_return_20d = (hist['Close'].iloc[-1] / hist['Close'].iloc[-21] - 1) * 100 if len(hist) >= 21 else 0
@@ -377,50 +324,39 @@ class EnhancedSmartMoneyScreener:
             rs_20d = stock_return_20d - spy_return_20d
             rs_60d = stock_return_60d - spy_return_60d
             
-            # RS Score (0-100)
-            rs_score = 50
-            if rs_20d > 10: rs_score += 25
-            elif rs_20d > 5: rs_score += 15
-            elif rs_20d > 0: rs_score += 8
-            elif rs_20d < -10: rs_score -= 20
-            elif rs_20d < -5: rs_score -= 10
-            
-            if rs_60d > 15: rs_score += 15
-            elif rs_60d > 5: rs_score += 8
-            elif rs_60d < -15: rs_score -= 15
-            
-            rs_score = max(0, min(100, rs_score))
-            
             return {
                 'rs_20d': round(rs_20d, 1),
                 'rs_60d': round(rs_60d, 1),
-                'rs_score': rs_score
+                # Raw inputs of the relative_strength scorecard (see scoring.py)
+                'rs_20d_value': rs_20d,
+                'rs_60d_value': rs_60d
             }
             
         except Exception as e:
-            return {'rs_20d': 0, 'rs_60d': 0, 'rs_score': 50}
+            if is_throttled(e):
+                raise
+            return self._default_relative_strength()
     
-    def calculate_composite_score(self, row: pd.Series, tech: Dict, fund: Dict, analyst: Dict, rs: Dict) -> Tuple[float, str]:
-        """Calculate final composite score"""
-        # Weighted composite
-        composite = (
-            row.get('supply_demand_score', 50) * 0.25 +
-            row.get('institutional_score', 50) * 0.20 +
-            tech.get('technical_score', 50) * 0.20 +
-            fund.get('fundamental_score', 50) * 0.15 +
-            analyst.get('analyst_score', 50) * 0.10 +
-            rs.get('rs_score', 50) * 0.10
+    def _default_relative_strength(self) -> Dict:
+        return {'rs_20d': 0, 'rs_60d': 0}
+    
+    def fetch_ticker_analyses(self, ticker: str) -> Tuple[Dict, Dict, Dict, Dict]:
+        """Technical, fundamental, analyst and relative-strength analyses for one ticker"""
+        return (
+            self.get_technical_analysis(ticker),
+            self.get_fundamental_analysis(ticker),
+            self.get_analyst_ratings(ticker),
+            self.get_relative_strength(ticker)
         )
-        
-        # Determine grade
-        if composite >= 80: grade = "🔥 S급 (즉시 매수)"
-        elif composite >= 70: grade = "🌟 A급 (적극 매수)"
-        elif composite >= 60: grade = "📈 B급 (매수 고려)"
-        elif composite >= 50: grade = "📊 C급 (관망)"
-        elif composite >= 40: grade = "⚠️ D급 (주의)"
-        else: grade = "🚫 F급 (회피)"
-        
-        return round(composite, 1), grade
+    
+    def upstream_calls(self, ticker: str) -> int:
+        """
+        Provider calls fetch_ticker_analyses will make: two histories unless
+        the prices are stored, plus one info call unless the shared info cache
+        still holds fresh fundamentals, profile and analyst fields
+        """
+        calls = 0 if ticker in self.price_history else 2
+        return calls + (0 if self.info_cache.is_fresh(ticker) else 1)
     
     def run_screening(self, top_n: int = 50) -> pd.DataFrame:
         """Run enhanced screening"""
@@ -439,39 +375,57 @@ class EnhancedSmartMoneyScreener:
         filtered = merged_df[merged_df['supply_demand_score'] >= 50]
         
         logger.info(f"📊 Pre-filtered to {len(filtered)} candidates")
+        self.load_prices(filtered['ticker'].tolist())
         
-        results = []
+        # Fetch per-ticker analyses concurrently (see upstream_calls for the rate-limit cost)
+        rows = [row for _, row in filtered.iterrows()]
+        analyses = self.engine.map(
+            lambda r: self.fetch_ticker_analyses(r['ticker']),
+            rows, desc="Enhanced Screening", cost=lambda r: self.upstream_calls(r['ticker'])
+        )
         
-        for idx, row in tqdm(filtered.iterrows(), total=len(filtered), desc="Enhanced Screening"):
-            ticker = row['ticker']
-            
-            # Get all analyses
-            tech = self.get_technical_analysis(ticker)
-            fund = self.get_fundamental_analysis(ticker)
-            analyst = self.get_analyst_ratings(ticker)
-            rs = self.get_relative_strength(ticker)
-            
-            # Calculate composite score
-            composite_score, grade = self.calculate_composite_score(row, tech, fund, analyst, rs)
-            
-            result = {
-                'ticker': ticker,
-                'name': analyst.get('company_name', ticker),
-                'composite_score': composite_score,
-                'grade': grade,
-                'sd_score': row.get('supply_demand_score', 50),
-                'inst_score': row.get('institutional_score', 50),
-                'tech_score': tech['technical_score'],
-                'fund_score': fund['fundamental_score'],
-                'analyst_score': analyst['analyst_score'],
-                'rs_score': rs['rs_score'],
-                'current_price': analyst['current_price'],
-                'target_upside': analyst['upside_pct']
-            }
-            results.append(result)
+        skipped = set(self.engine.skipped)
+        scored_rows, techs, funds, analysts, rss = [], [], [], [], []
+        for idx, (row, fetched) in enumerate(zip(rows, analyses)):
+            # Out of time budget: leave unscored rather than score on defaults
+            if idx in skipped:
+                continue
+            tech, fund, analyst, rs = fetched or (
+                self._default_technical(), self._default_fundamental(), self._default_analyst(),
+                self._default_relative_strength()
+            )
+            scored_rows.append(row)
+            techs.append(tech)
+            funds.append(fund)
+            analysts.append(analyst)
+            rss.append(rs)
+        
+        # Score every stage for all candidates at once (rule tables in scoring.py)
+        tech_df = apply_scorecard(pd.DataFrame(techs), 'technical')
+        fund_df = apply_scorecard(pd.DataFrame(funds), 'fundamental')
+        analyst_df = apply_scorecard(pd.DataFrame(analysts), 'analyst')
+        rs_df = apply_scorecard(pd.DataFrame(rss), 'relative_strength')
+        
+        results_df = pd.DataFrame({
+            'ticker': [row['ticker'] for row in scored_rows],
+            'name': [a.get('company_name', row['ticker']) for row, a in zip(scored_rows, analysts)],
+            'sd_score': [row.get('supply_demand_score', 50) for row in scored_rows],
+            'inst_score': [row.get('institutional_score', 50) for row in scored_rows],
+            'tech_score': tech_df['technical_score'].to_numpy(),
+            'fund_score': fund_df['fundamental_score'].to_numpy(),
+            'analyst_score': analyst_df['analyst_score'].to_numpy(),
+            'rs_score': rs_df['rs_score'].to_numpy(),
+            'current_price': analyst_df['current_price'].to_numpy() if analysts else [],
+            'target_upside': analyst_df['upside_pct'].to_numpy() if analysts else []
+        })
+        
+        # Weighted composite and grade
+        results_df = apply_scorecard(results_df, 'composite')
+        results_df['composite_score'] = results_df['composite_score'].map(lambda v: round(v, 1))
+        results_df = results_df[['ticker', 'name', 'composite_score', 'grade', 'sd_score', 'inst_score', 'tech_score',
+                                 'fund_score', 'analyst_score', 'rs_score', 'current_price', 'target_upside']]
         
-        # Create DataFrame and sort
-        results_df = pd.DataFrame(results)
+        # Sort
         results_df = results_df.sort_values('composite_score', ascending=False)
         results_df['rank'] = range(1, len(results_df) + 1)
         
@@ -488,7 +442,9 @@ class EnhancedSmartMoneyScreener:
         results_df = self.run_screening(top_n)
         
         # Save results
-        results_df.to_csv(self.output_file, index=False)
+        self.manifest.write_csv(results_df, self.output_file, stage='smart_money_screener_v2', inputs=[
+            os.path.join(self.data_dir, f) for f in ('us_volume_analysis.csv', 'us_13f_holdings.csv', 'us_etf_flows.csv')
+        ])
         logger.info(f"✅ Saved to {self.output_file}")
         
         return results_df
@@ -499,9 +455,10 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--dir', default='.')
     parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=None, help='Concurrent download workers')
     args = parser.parse_args()
     
-    screener = EnhancedSmartMoneyScreener(data_dir=args.dir)
+    screener = EnhancedSmartMoneyScreener(data_dir=args.dir, workers=args.workers)
     results = screener.run(top_n=args.top)
     
     if not results.empty:
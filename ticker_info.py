@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ticker Info Cache
+Shared, disk-backed cache of provider `info` dicts (yfinance quote summary)
+used by the 13F analyzer, the screener and the Flask sector lookup, so one
+upstream call serves every consumer until its fields go stale.
+
+Fields are stored per group, each with its own time-to-live:
+    profile       name, sector, industry, ...        TICKER_INFO_TTL_PROFILE  (default 90 days)
+    analyst       price, targets, recommendation     TICKER_INFO_TTL_ANALYST  (default 4 hours)
+    fundamentals  everything else (valuation,        TICKER_INFO_TTL_FUNDAMENTALS (default 1 day)
+                  growth, ownership, short interest)
+TTLs are in seconds. A lookup only hits the provider when one of the groups
+it asks for is missing or stale; the response then refreshes every group.
+
+Storage is SQLite in WAL mode (<DATA_DIR>/ticker_info.db, TICKER_INFO_DB),
+so pipeline processes and gunicorn workers read concurrently while one
+writer commits. TICKER_INFO_CACHE=off bypasses the cache entirely.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, Iterable, Optional
+from market_data import MarketDataProvider, get_provider
+
+# Logging Configuration
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DAY = 86400
+
+FIELD_GROUPS = {
+    'profile': {
+        'ttl': 90 * DAY,
+        'keys': ['symbol', 'shortName', 'longName', 'sector', 'sectorKey', 'industry', 'industryKey',
+                 'country', 'exchange', 'quoteType', 'currency', 'website', 'longBusinessSummary',
+                 'fullTimeEmployees'],
+    },
+    'analyst': {
+        'ttl': 4 * 3600,
+        'keys': ['currentPrice', 'regularMarketPrice', 'targetMeanPrice', 'targetMedianPrice',
+                 'targetHighPrice', 'targetLowPrice', 'recommendationKey', 'recommendationMean',
+                 'numberOfAnalystOpinions'],
+    },
+    # Every key not listed in another group
+    'fundamentals': {
+        'ttl': DAY,
+        'keys': [],
+    },
+}
+DEFAULT_GROUP = 'fundamentals'
+
+_KEY_GROUP = {key: group for group, spec in FIELD_GROUPS.items() for key in spec['keys']}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ticker_info (
+    provider   TEXT NOT NULL,
+    ticker     TEXT NOT NULL,
+    grp        TEXT NOT NULL,
+    fields     TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (provider, ticker, grp)
+)
+"""
+
+
+def group_ttl(group: str) -> float:
+    return float(os.getenv(f'TICKER_INFO_TTL_{group.upper()}', FIELD_GROUPS[group]['ttl']))
+
+
+def split_groups(info: Dict) -> Dict[str, Dict]:
+    """Partition an info dict into its field groups (every group present, possibly empty)"""
+    groups = {group: {} for group in FIELD_GROUPS}
+    for key, value in info.items():
+        groups[_KEY_GROUP.get(key, DEFAULT_GROUP)][key] = value
+    return groups
+
+
+def _json_default(value):
+    # numpy scalars and other stragglers from provider responses
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+class TickerInfoCache:
+    """Per-field-group TTL cache of provider info dicts in a shared SQLite database"""
+
+    def __init__(self, path: Optional[str] = None, provider: Optional[MarketDataProvider] = None):
+        self.path = path or os.getenv('TICKER_INFO_DB',
+                                      os.path.join(os.getenv('DATA_DIR', '.'), 'ticker_info.db'))
+        self.provider = provider or get_provider()
+        self.enabled = os.getenv('TICKER_INFO_CACHE', 'on').lower() != 'off'
+        self._local = threading.local()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread and process (sqlite3 connections are not shared across either)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=30000')
+        conn.execute(SCHEMA)
+        self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _lock(self, ticker: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    def _read(self, ticker: str) -> Dict[str, tuple]:
+        """{group: (fields, fetched_at)} stored for a ticker"""
+        rows = self._connect().execute(
+            'SELECT grp, fields, fetched_at FROM ticker_info WHERE provider = ? AND ticker = ?',
+            (self.provider.name, ticker)
+        ).fetchall()
+        return {grp: (json.loads(fields), fetched_at) for grp, fields, fetched_at in rows if grp in FIELD_GROUPS}
+
+    def _write(self, ticker: str, info: Dict) -> None:
+        now = time.time()
+        rows = [(self.provider.name, ticker, group, json.dumps(fields, default=_json_default), now)
+                for group, fields in split_groups(info).items()]
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany('INSERT OR REPLACE INTO ticker_info VALUES (?, ?, ?, ?, ?)', rows)
+
+    @staticmethod
+    def _stale(stored: Dict[str, tuple], groups: Iterable[str], now: float) -> bool:
+        return any(group not in stored or now - stored[group][1] > group_ttl(group) for group in groups)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def is_fresh(self, ticker: str, groups: Optional[Iterable[str]] = None) -> bool:
+        """Whether info(ticker, groups) would be served without an upstream call"""
+        if not self.enabled:
+            return False
+        return not self._stale(self._read(ticker), groups or FIELD_GROUPS, time.time())
+
+    def info(self, ticker: str, groups: Optional[Iterable[str]] = None) -> Dict:
+        """
+        The provider's info dict restricted to the given field groups (default
+        all). Fetches once from the provider if any of them is missing or stale.
+        """
+        groups = list(groups or FIELD_GROUPS)
+        if not self.enabled:
+            info = self.provider.info(ticker)
+            return {k: v for k, v in info.items() if _KEY_GROUP.get(k, DEFAULT_GROUP) in groups}
+
+        # Threads asking for the same ticker wait for one fetch instead of each making it
+        with self._lock(ticker):
+            stored = self._read(ticker)
+            if self._stale(stored, groups, time.time()):
+                info = self.provider.info(ticker)
+                self._write(ticker, info)
+                stored = {group: (fields, None) for group, fields in split_groups(info).items()}
+
+        merged = {}
+        for group in groups:
+            merged.update(stored[group][0])
+        return merged
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+    def stats(self) -> Dict[str, Dict]:
+        """Per-group entry counts and how many are within their TTL"""
+        now = time.time()
+        rows = self._connect().execute(
+            'SELECT grp, fetched_at FROM ticker_info WHERE provider = ?', (self.provider.name,)
+        ).fetchall()
+        out = {group: {'entries': 0, 'fresh': 0} for group in FIELD_GROUPS}
+        for grp, fetched_at in rows:
+            if grp in out:
+                out[grp]['entries'] += 1
+                out[grp]['fresh'] += now - fetched_at <= group_ttl(grp)
+        return out
+
+    def clear(self, groups: Optional[Iterable[str]] = None, tickers: Optional[Iterable[str]] = None) -> int:
+        """Delete entries (all, or only the given groups / tickers); returns rows removed"""
+        sql = 'DELETE FROM ticker_info WHERE provider = ?'
+        params = [self.provider.name]
+        for column, values in (('grp', groups), ('ticker', tickers)):
+            if values:
+                values = list(values)
+                sql += f" AND {column} IN ({', '.join('?' * len(values))})"
+                params += values
+        conn = self._connect()
+        with conn:
+            removed = conn.execute(sql, params).rowcount
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        return removed
+
+
+_cache: Optional[TickerInfoCache] = None
+_cache_guard = threading.Lock()
+
+
+def get_ticker_info_cache() -> TickerInfoCache:
+    """Cache for the current provider (shared per process)"""
+    global _cache
+    with _cache_guard:
+        provider = get_provider()
+        if _cache is None or _cache.provider is not provider:
+            _cache = TickerInfoCache(provider=provider)
+        return _cache
+
+
+def main():
+    """Main execution"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Shared ticker info cache')
+    parser.add_argument('--db', default=None, help='Database path (default: TICKER_INFO_DB or DATA_DIR/ticker_info.db)')
+    parser.add_argument('--clear', action='store_true', help='Delete cached entries')
+    parser.add_argument('--groups', nargs='+', choices=list(FIELD_GROUPS), help='Only these field groups')
+    parser.add_argument('--tickers', nargs='+', help='Only these tickers')
+    args = parser.parse_args()
+
+    cache = TickerInfoCache(args.db)
+    if args.clear:
+        removed = cache.clear(args.groups, args.tickers)
+        print(f"🗑️ Removed {removed} entries from {cache.path}")
+        return
+
+    print(f"🗄️ {cache.path} ({cache.provider.name})")
+    for group, s in cache.stats().items():
+        print(f"   {group:<14} ttl {group_ttl(group) / 3600:>7.1f}h  {s['entries']:>6} entries  {s['fresh']:>6} fresh")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Universe Registry
+Versioned ticker universes stored as universes/<name>/<YYYY-MM-DD>.csv
+(S&P 500, NASDAQ-100, Russell, custom watchlists). Tickers are normalized
+to Yahoo symbols (BRK.B -> BRK-B) and de-duplicated when universes are combined.
+
+Specs:
+    sp500                     latest version
+    sp500@2024-12-31          pinned version
+    sp500,nasdaq100           union (first universe wins on duplicates)
+    synthetic:5000            generated universe for the synthetic provider
+
+Reference ETFs (market and sector benchmarks, rates, commodities) are not
+part of any stock universe; the price collector stores them next to the
+stocks so the ETF, heatmap and macro stages read one shared copy.
+"""
+
+import os
+import re
+import json
+import logging
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Logging Configuration
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+UNIVERSE_DIR = os.getenv('UNIVERSE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'universes'))
+DEFAULT_UNIVERSE = os.getenv('UNIVERSE', 'sp500,nasdaq100')
+STOCK_LIST_COLUMNS = ['ticker', 'name', 'sector', 'industry', 'market']
+
+# Market label of reference ETFs in the price store's ticker dimension
+ETF_MARKET = 'ETF'
+REFERENCE_ETFS = {
+    # Market Cap
+    'SPY': {'name': 'S&P 500', 'category': 'Broad Market'},
+    'QQQ': {'name': 'NASDAQ 100', 'category': 'Broad Market'},
+    'IWM': {'name': 'Russell 2000', 'category': 'Broad Market'},
+    'DIA': {'name': 'Dow Jones', 'category': 'Broad Market'},
+
+    # Sector ETFs
+    'XLK': {'name': 'Technology', 'category': 'Sector'},
+    'XLF': {'name': 'Financials', 'category': 'Sector'},
+    'XLV': {'name': 'Healthcare', 'category': 'Sector'},
+    'XLE': {'name': 'Energy', 'category': 'Sector'},
+    'XLY': {'name': 'Consumer Discretionary', 'category': 'Sector'},
+    'XLP': {'name': 'Consumer Staples', 'category': 'Sector'},
+    'XLI': {'name': 'Industrials', 'category': 'Sector'},
+    'XLB': {'name': 'Materials', 'category': 'Sector'},
+    'XLU': {'name': 'Utilities', 'category': 'Sector'},
+    'XLRE': {'name': 'Real Estate', 'category': 'Sector'},
+    'XLC': {'name': 'Communication Services', 'category': 'Sector'},
+
+    # Thematic
+    'VTI': {'name': 'Total Market', 'category': 'Broad Market'},
+    'VOO': {'name': 'S&P 500 (Vanguard)', 'category': 'Broad Market'},
+    'GLD': {'name': 'Gold', 'category': 'Thematic'},
+    'SLV': {'name': 'Silver', 'category': 'Thematic'},
+    'USO': {'name': 'Oil', 'category': 'Thematic'},
+    'TLT': {'name': 'Long-Term Treasury', 'category': 'Thematic'},
+    'IEF': {'name': 'Mid-Term Treasury', 'category': 'Thematic'},
+    'HYG': {'name': 'High Yield Bonds', 'category': 'Thematic'},
+    'LQD': {'name': 'Investment Grade Bonds', 'category': 'Thematic'},
+}
+
+
+def normalize_ticker(ticker: str) -> str:
+    """
+    Canonical Yahoo symbol: upper case, no whitespace or '$', share classes
+    with a dash (BRK.B, BRK/B, 'BRK B' -> BRK-B). Index (^GSPC), futures
+    (GC=F) and exchange-suffixed (DX-Y.NYB) symbols pass through.
+    """
+    t = str(ticker).strip().upper().lstrip('$')
+    t = re.sub(r'\s+([A-Z]{1,2})$', r'-\1', t)
+    t = re.sub(r'\s+', '', t)
+    return re.sub(r'[./](?=[A-Z]{1,2}$)', '-', t)
+
+
+def normalize_tickers(tickers: List[str]) -> List[str]:
+    """Normalize and de-duplicate, keeping first-seen order"""
+    return list(dict.fromkeys(normalize_ticker(t) for t in tickers if str(t).strip()))
+
+
+class UniverseRegistry:
+    """Versioned universe files plus registry.json metadata (market label, description)"""
+
+    def __init__(self, root: str = UNIVERSE_DIR):
+        self.root = root
+        self.registry_file = os.path.join(root, 'registry.json')
+
+    def _registry(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.registry_file):
+            return {}
+        with open(self.registry_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def names(self) -> List[str]:
+        on_disk = [d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d))] \
+            if os.path.isdir(self.root) else []
+        return sorted(set(self._registry()) | set(on_disk))
+
+    def versions(self, name: str) -> List[str]:
+        path = os.path.join(self.root, name)
+        if not os.path.isdir(path):
+            return []
+        return sorted(f[:-4] for f in os.listdir(path) if f.endswith('.csv'))
+
+    def market(self, name: str) -> str:
+        return self._registry().get(name, {}).get('market', name.upper())
+
+    def load(self, spec: str) -> pd.DataFrame:
+        """One universe in the us_stocks_list.csv format"""
+        name, _, version = spec.strip().partition('@')
+        name = name.lower()
+
+        if name.startswith('synthetic:'):
+            from market_data import SyntheticProvider
+            return SyntheticProvider().universe(int(name.split(':', 1)[1]))
+
+        versions = self.versions(name)
+        if not versions:
+            raise FileNotFoundError(f"Universe not found: {name} (available: {', '.join(self.names())})")
+        version = version or versions[-1]
+        if version not in versions:
+            raise FileNotFoundError(f"Universe {name} has no version {version} (available: {', '.join(versions)})")
+
+        df = pd.read_csv(os.path.join(self.root, name, f'{version}.csv'), dtype=str).fillna('')
+        df['ticker'] = df['ticker'].map(normalize_ticker)
+        df = df[df['ticker'] != ''].drop_duplicates(subset=['ticker'], keep='first')
+
+        for col in ('name', 'sector', 'industry'):
+            if col not in df.columns:
+                df[col] = ''
+        df['name'] = df['name'].where(df['name'] != '', df['ticker'])
+        df['sector'] = df['sector'].replace('', 'N/A')
+        df['industry'] = df['industry'].replace('', 'N/A')
+        df['market'] = self.market(name)
+
+        logger.info(f"📋 Universe {name}@{version}: {len(df)} tickers")
+        return df[STOCK_LIST_COLUMNS].reset_index(drop=True)
+
+    def resolve(self, specs: str) -> pd.DataFrame:
+        """Union of comma-separated universe specs, de-duplicated on the normalized ticker"""
+        frames = [self.load(spec) for spec in specs.split(',') if spec.strip()]
+        if not frames:
+            return pd.DataFrame(columns=STOCK_LIST_COLUMNS)
+        combined = pd.concat(frames, ignore_index=True)
+        deduped = combined.drop_duplicates(subset=['ticker'], keep='first').reset_index(drop=True)
+        if len(frames) > 1:
+            logger.info(f"📋 {specs}: {len(deduped)} unique tickers ({len(combined) - len(deduped)} duplicates removed)")
+        return deduped
+
+    def save(self, name: str, df: pd.DataFrame, version: Optional[str] = None) -> str:
+        """Write a new version of a universe (ticker, name, sector, industry)"""
+        version = version or datetime.now().strftime('%Y-%m-%d')
+        out = df.copy()
+        out['ticker'] = out['ticker'].map(normalize_ticker)
+        out = out[out['ticker'] != ''].drop_duplicates(subset=['ticker'], keep='first')
+        for col in ('name', 'sector', 'industry'):
+            if col not in out.columns:
+                out[col] = ''
+
+        os.makedirs(os.path.join(self.root, name), exist_ok=True)
+        path = os.path.join(self.root, name, f'{version}.csv')
+        out[['ticker', 'name', 'sector', 'industry']].to_csv(path, index=False)
+        logger.info(f"✅ Saved {len(out)} tickers to {path}")
+        return path
+
+    def import_holdings(self, name: str, path: str, version: Optional[str] = None) -> str:
+        """Create a universe version from an ETF holdings export (iShares IWB/IWV CSV layout)"""
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            lines = f.readlines()
+        header = next((i for i, line in enumerate(lines) if line.split(',')[0].strip('" ') == 'Ticker'), None)
+        if header is None:
+            raise ValueError(f"No 'Ticker' header row found in {path}")
+
+        holdings = pd.read_csv(path, skiprows=header, dtype=str, encoding='utf-8-sig').fillna('')
+        if 'Asset Class' in holdings.columns:
+            holdings = holdings[holdings['Asset Class'] == 'Equity']
+        holdings = holdings[holdings['Ticker'].str.match(r'^[A-Za-z]')]
+
+        df = pd.DataFrame({
+            'ticker': holdings['Ticker'],
+            'name': holdings.get('Name', ''),
+            'sector': holdings.get('Sector', ''),
+            'industry': '',
+        })
+        return self.save(name, df, version)
+
+
+_registry = UniverseRegistry()
+
+
+def load_universe(spec: str) -> pd.DataFrame:
+    return _registry.load(spec)
+
+
+def resolve_universe(specs: Optional[str] = None) -> pd.DataFrame:
+    return _registry.resolve(specs or DEFAULT_UNIVERSE)
+
+
+def reference_etfs() -> pd.DataFrame:
+    """Reference ETFs as price store dimension rows (ticker, name, market)"""
+    return pd.DataFrame([{'ticker': t, 'name': e['name'], 'market': ETF_MARKET} for t, e in REFERENCE_ETFS.items()])
+
+
+def main():
+    """Main execution"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Ticker universe registry')
+    sub = parser.add_subparsers(dest='command')
+    sub.add_parser('list', help='List universes and versions')
+    show = sub.add_parser('show', help='Resolve a universe spec (e.g. sp500,nasdaq100)')
+    show.add_argument('spec')
+    imp = sub.add_parser('import', help='Import an ETF holdings CSV as a new universe version')
+    imp.add_argument('name')
+    imp.add_argument('path')
+    imp.add_argument('--version', default=None, help='Version date (default: today)')
+    add = sub.add_parser('add', help='Add tickers to a universe as a new version')
+    add.add_argument('name')
+    add.add_argument('tickers', nargs='+')
+    args = parser.parse_args()
+
+    registry = UniverseRegistry()
+
+    if args.command == 'show':
+        df = registry.resolve(args.spec)
+        print(df.groupby('market').size().to_string())
+        print(f"Total: {len(df)}")
+    elif args.command == 'import':
+        registry.import_holdings(args.name, args.path, args.version)
+    elif args.command == 'add':
+        current = registry.load(args.name)[['ticker', 'name', 'sector', 'industry']] \
+            if registry.versions(args.name) else pd.DataFrame(columns=['ticker'])
+        added = pd.DataFrame({'ticker': normalize_tickers(args.tickers)})
+        registry.save(args.name, pd.concat([current, added], ignore_index=True))
+    else:
+        for name in registry.names():
+            versions = registry.versions(name)
+            print(f"{name:<14} {registry.market(name):<14} {', '.join(versions) or '(no versions)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import os, sys, subprocess, time, argparse
+from artifacts import ArtifactManifest, STAGES
 
 scripts = [
     ("create_us_daily_prices.py", "Data Collection", 600),
@@ -17,30 +18,67 @@ scripts = [
     ("economic_calendar.py", "Calendar", 300)
 ]
 
-def run_script(name, desc, timeout):
+def run_script(name, desc, timeout, env=None, args=()):
     print(f"\n{'='*60}")
     print(f"Running {desc}...")
     print(f"{'='*60}")
+    start = time.time()
+    # Fetch loops stop starting new work at 80% of the stage timeout, so a
+    # large universe finishes with partial results instead of being killed
+    env = dict(env or os.environ)
+    env.setdefault('FETCH_TIME_BUDGET', str(int(timeout * 0.8)))
     try:
-        subprocess.run([sys.executable, name], timeout=timeout, check=True)
+        subprocess.run([sys.executable, name, *args], timeout=timeout, check=True, env=env)
         print("✅ Done")
+        ok = True
     except Exception as e:
         print(f"❌ Failed: {e}")
+        ok = False
+    return time.time() - start, ok
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--quick', action='store_true', help='Skip AI analysis (faster)')
+    parser.add_argument('--record', action='store_true', help='Record all yfinance responses to the cache')
+    parser.add_argument('--offline', action='store_true', help='Replay yfinance responses from the cache only')
+    parser.add_argument('--cache-ttl', type=float, help='Serve cached yfinance responses younger than N seconds')
+    parser.add_argument('--force', action='store_true', help='Run every stage even if its inputs are unchanged')
     args = parser.parse_args()
+
+    # Child scripts pick the cache mode up from the environment (see yf_cache.py)
+    env = os.environ.copy()
+    if args.offline:
+        env['YF_CACHE_MODE'] = 'replay'
+    elif args.record:
+        env['YF_CACHE_MODE'] = 'record'
+    elif args.cache_ttl is not None:
+        env['YF_CACHE_MODE'] = 'auto'
+    if args.cache_ttl is not None:
+        env['YF_CACHE_TTL'] = str(args.cache_ttl)
+    print(f"yfinance cache mode: {env.get('YF_CACHE_MODE', 'off')}")
+
+    # Deterministic stages are skipped when their outputs were computed from the current inputs
+    manifest = ArtifactManifest()
     
     start = time.time()
+    timings = []
     for name, desc, timeout in scripts:
         if args.quick and "AI" in desc: 
             print(f"⏭️  Skipping {desc}")
             continue
-        run_script(name, desc, timeout)
+        if not args.force and manifest.stage_fresh(name[:-3]):
+            print(f"⏭️  {desc}: inputs unchanged, outputs current")
+            timings.append((desc, 0.0, True))
+            continue
+        # Deterministic stages repeat the freshness check themselves, so --force is passed on
+        child_args = ['--force'] if args.force and name[:-3] in STAGES else []
+        timings.append((desc,) + run_script(name, desc, timeout, env, child_args))
         
     elapsed = (time.time()-start)/60
     print(f"\n{'='*60}")
+    for desc, seconds, ok in timings:
+        print(f"{'✅' if ok else '❌'} {desc:<20} {seconds:>8.1f}s")
+    print(f"{'='*60}")
     print(f"✅ Total time: {elapsed:.1f} minutes")
     print(f"{'='*60}")
 
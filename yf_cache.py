@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+yfinance Record/Replay Cache
+Drop-in replacement for the `yfinance` module (`import yf_cache as yf`) that
+records Ticker/download responses to disk and replays them offline.
+
+Modes (YF_CACHE_MODE):
+    off     - always live, nothing recorded (default)
+    record  - always live, every response written to the cache
+    auto    - serve entries younger than YF_CACHE_TTL seconds, otherwise live + record
+    replay  - cache only, never touches the network (misses raise CacheMissError)
+"""
+
+import os
+import json
+import time
+import pickle
+import hashlib
+import logging
+import threading
+from collections import namedtuple
+from datetime import date, datetime
+from typing import Any, Callable, Optional
+import pandas as pd
+import yfinance
+from yfinance import shared  # re-exported so callers can keep using yf.shared._ERRORS
+
+# Logging Configuration
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+MODES = ('off', 'record', 'auto', 'replay')
+
+# yfinance's own namedtuple is built inside option_chain() and cannot be pickled
+OptionChain = namedtuple('OptionChain', ['calls', 'puts', 'underlying'])
+
+
+class CacheMissError(LookupError):
+    """Raised in replay mode when a request was never recorded"""
+
+
+def cache_mode() -> str:
+    mode = os.getenv('YF_CACHE_MODE', 'off').lower()
+    if mode not in MODES:
+        raise ValueError(f"YF_CACHE_MODE must be one of {MODES}, got {mode!r}")
+    return mode
+
+
+def cache_dir() -> str:
+    return os.getenv('YF_CACHE_DIR', os.path.join(os.getenv('DATA_DIR', '.'), '.yf_cache'))
+
+
+def cache_ttl() -> float:
+    return float(os.getenv('YF_CACHE_TTL', '3600'))
+
+
+def _normalize(value: Any) -> Any:
+    """Make request arguments stable across runs (end=datetime.now() keys by day)"""
+    if isinstance(value, (datetime, pd.Timestamp)):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    return value
+
+
+def request_key(kind: str, symbol: str, args: tuple = (), kwargs: Optional[dict] = None) -> str:
+    payload = json.dumps([kind, symbol, _normalize(list(args)), _normalize(kwargs or {})],
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _path(kind: str, key: str) -> str:
+    return os.path.join(cache_dir(), kind, key[:2], f'{key}.pkl')
+
+
+def _load(path: str) -> Optional[dict]:
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def _save(path: str, entry: dict) -> None:
+    """Atomic write so concurrent fetch workers never see a partial entry"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Per process and thread: engine workers can save the same key at once
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def cached(kind: str, symbol: str, args: tuple, kwargs: dict, fetch: Callable[[], Any]) -> Any:
+    """Serve a request from the cache or the network according to the current mode"""
+    mode = cache_mode()
+    if mode == 'off':
+        return fetch()
+
+    key = request_key(kind, symbol, args, kwargs)
+    path = _path(kind, key)
+
+    if mode in ('auto', 'replay'):
+        entry = _load(path)
+        if entry is not None and (mode == 'replay' or time.time() - entry['created'] < cache_ttl()):
+            return entry['value']
+        if mode == 'replay':
+            raise CacheMissError(f"No recorded response for {kind} {symbol} {args} {kwargs}")
+
+    value = fetch()
+    _save(path, {'created': time.time(), 'request': [kind, symbol, args, kwargs], 'value': value})
+    return value
+
+
+class Ticker:
+    """yfinance.Ticker with cached history/info/options/holder endpoints"""
+
+    def __init__(self, ticker: str, session=None):
+        self.ticker = ticker.upper() if isinstance(ticker, str) else ticker
+        self._session = session
+        self._live = None
+
+    @property
+    def live(self) -> yfinance.Ticker:
+        # Created lazily so replay mode never builds a network session
+        if self._live is None:
+            self._live = yfinance.Ticker(self.ticker, session=self._session)
+        return self._live
+
+    def history(self, *args, **kwargs) -> pd.DataFrame:
+        return cached('history', self.ticker, args, kwargs, lambda: self.live.history(*args, **kwargs))
+
+    @property
+    def info(self) -> dict:
+        return cached('info', self.ticker, (), {}, lambda: self.live.info)
+
+    @property
+    def options(self) -> tuple:
+        return cached('options', self.ticker, (), {}, lambda: tuple(self.live.options))
+
+    def option_chain(self, date: Optional[str] = None, tz=None) -> OptionChain:
+        def fetch():
+            chain = self.live.option_chain(date, tz)
+            return OptionChain(chain.calls, chain.puts, chain.underlying)
+        return cached('option_chain', self.ticker, (date,), {'tz': tz}, fetch)
+
+    @property
+    def insider_transactions(self) -> pd.DataFrame:
+        return cached('insider_transactions', self.ticker, (), {}, lambda: self.live.insider_transactions)
+
+    @property
+    def institutional_holders(self) -> pd.DataFrame:
+        return cached('institutional_holders', self.ticker, (), {}, lambda: self.live.institutional_holders)
+
+    def __getattr__(self, name: str) -> Any:
+        # Anything not recorded above goes straight to yfinance
+        return getattr(self.live, name)
+
+
+def download(tickers, *args, **kwargs) -> pd.DataFrame:
+    """yfinance.download with caching (one entry per ticker set + arguments)"""
+    symbols = tickers.split() if isinstance(tickers, str) else list(tickers)
+    key_kwargs = {k: v for k, v in kwargs.items() if k not in ('progress', 'threads')}
+    return cached('download', ' '.join(symbols), args, key_kwargs,
+                  lambda: yfinance.download(tickers, *args, **kwargs))
+
+
+def clear(kind: Optional[str] = None, older_than: Optional[float] = None) -> int:
+    """Delete cache entries (optionally one kind, optionally only entries older than N seconds)"""
+    root = os.path.join(cache_dir(), kind) if kind else cache_dir()
+    removed = 0
+    now = time.time()
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            if older_than is None or now - os.path.getmtime(path) > older_than:
+                os.remove(path)
+                removed += 1
+    return removed
+
+
+def main():
+    """Main execution"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='yfinance record/replay cache')
+    parser.add_argument('--stats', action='store_true', help='Show entries per request kind')
+    parser.add_argument('--clear', action='store_true', help='Delete cached responses')
+    parser.add_argument('--kind', help='Limit --clear to one request kind (history, download, ...)')
+    parser.add_argument('--older-than', type=float, help='Limit --clear to entries older than N hours')
+    args = parser.parse_args()
+
+    if args.clear:
+        older = args.older_than * 3600 if args.older_than is not None else None
+        print(f"🗑️ Removed {clear(args.kind, older)} cached responses from {cache_dir()}")
+        return
+
+    root = cache_dir()
+    print(f"📦 Cache: {root} | mode={cache_mode()} ttl={cache_ttl():.0f}s")
+    if not os.path.isdir(root):
+        return
+    for kind in sorted(os.listdir(root)):
+        count = size = 0
+        for dirpath, _, files in os.walk(os.path.join(root, kind)):
+            count += len(files)
+            size += sum(os.path.getsize(os.path.join(dirpath, f)) for f in files)
+        print(f"   {kind:<24} {count:>6} entries {size / 1024 ** 2:>8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()